@@ -0,0 +1,90 @@
+"""
+Connection benchmark: how fast EchoServer / AsyncEchoServer complete username
+handshakes while some clients connect and never send one.
+
+--connections clients connect from --concurrency threads; a
+--silent fraction of them, spread through the run, stay silent and
+are held open until the rest are done. Every other connection is
+timed from connect() until the server confirms the framed handshake.
+A server that reads usernames in its accept loop stalls behind the
+first silent client, which shows up here as failed handshakes.
+
+Reported (JSON, to stdout or --json PATH):
+    - completed / failed handshakes and the run's wall time
+    - handshakes_per_s over the whole run
+    - handshake_ms: p50/p95/p99/max connect-to-confirmation time
+
+Usage:
+    python bench_connect.py [--server threaded|async]
+                            [--connections N] [--silent FRACTION]
+                            [--concurrency N] [--handshake-timeout S]
+                            [--json PATH]
+"""
+import os
+import sys
+from typing import List
+
+from loadgen import (
+    connect_storm, free_port, git_commit, parse_args, raise_fd_limit,
+    start_subprocess, write_json
+)
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SERVER_SCRIPT = """
+import sys
+from server_logic import EchoServer, AsyncEchoServer
+
+def log(msg):
+    if msg.startswith("[SERVER]: Listening"):
+        print(msg, flush=True)
+
+options = {"log_sample": 0, "handshake_timeout": float(sys.argv[3])}
+if sys.argv[1] == "async":
+    server = AsyncEchoServer(port=int(sys.argv[2]), **options)
+else:
+    server = EchoServer(port=int(sys.argv[2]), backlog=1024, **options)
+server.start(log)
+"""
+
+DEFAULTS = {
+    "server": "threaded",
+    "connections": 500,
+    "silent": 0.1,
+    "concurrency": 16,
+    "handshake_timeout": 5.0,
+    "json": None,
+}
+
+
+def main(argv: List[str]) -> None:
+    opts = parse_args(argv, DEFAULTS)
+    raise_fd_limit()
+    port = free_port()
+
+    proc = start_subprocess(
+        SERVER_SCRIPT, HERE, opts["server"], str(port),
+        str(opts["handshake_timeout"])
+    )
+    try:
+        result = connect_storm(
+            "127.0.0.1", port, opts["connections"],
+            opts["silent"], opts["concurrency"]
+        )
+    finally:
+        proc.kill()
+        proc.wait()
+
+    write_json({
+        "bench": "echo_connect",
+        "commit": git_commit(HERE),
+        "server": opts["server"],
+        "concurrency": opts["concurrency"],
+        "handshake_timeout": opts["handshake_timeout"],
+        **result,
+    }, opts["json"])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
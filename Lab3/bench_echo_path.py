@@ -0,0 +1,179 @@
+"""
+Benchmark: EchoServer's echo_mode paths: decode, raw (recv_into) and
+splice (Linux, kernel only; runs as raw where splice is unavailable).
+
+For every message size and echo_mode an in-process EchoServer is
+started and --clients framed clients, run from a subprocess so their
+own work is not counted, stream --megabytes each (at most
+--max-messages messages) through it while a reader thread counts the
+echoed bytes.
+
+Each combination runs twice:
+    - throughput pass: messages and MB echoed per second
+    - tracemalloc pass: the same load with tracemalloc on, reporting
+      the server's peak heap above its starting point, which is what
+      the per-message bytes/str/bytes copies of the decode path cost
+      (tracemalloc slows every allocation, so that pass is not timed)
+
+Usage:
+    python bench_echo_path.py [--sizes 64,4096,65536] [--clients N]
+                              [--megabytes MB] [--max-messages N]
+                              [--log-sample N] [--pool-size N]
+                              [--json PATH]
+"""
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+import tracemalloc
+from typing import Dict, List
+
+from loadgen import free_port, git_commit, parse_args, raise_fd_limit, write_json
+from server_logic import ECHO_MODES, EchoServer
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CLIENT_SCRIPT = """
+import sys, json, time, socket, threading
+from protocol import client_handshake, encode
+
+port, clients, count, size = map(int, sys.argv[1:5])
+message = encode("x" * size, framed=True)
+batch = message * max(1, 65536 // len(message))
+per_batch = len(batch) // len(message)
+batches = max(1, count // per_batch)
+expected = batches * len(batch)
+
+socks = []
+for i in range(clients):
+    sock = socket.create_connection(("127.0.0.1", port))
+    client_handshake(sock, f"bench{i}")
+    socks.append(sock)
+
+def send(sock):
+    for _ in range(batches):
+        sock.sendall(batch)
+
+def receive(sock):
+    buf = memoryview(bytearray(1 << 20))
+    got = 0
+    while got < expected:
+        n = sock.recv_into(buf)
+        if not n:
+            break
+        got += n
+    received.append(got)
+
+received = []
+t0 = time.perf_counter()
+threads = []
+for sock in socks:
+    threads.append(threading.Thread(target=send, args=(sock,)))
+    threads.append(threading.Thread(target=receive, args=(sock,)))
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+seconds = time.perf_counter() - t0
+print(json.dumps({
+    "seconds": seconds,
+    "messages": batches * per_batch * clients,
+    "bytes": sum(received),
+    "complete": sum(received) == expected * clients,
+}))
+"""
+
+DEFAULTS = {
+    "sizes": "64,4096,65536",
+    "clients": 4,
+    "megabytes": 16,
+    "max_messages": 50000,
+    "log_sample": 0,
+    "pool_size": 0,
+    "json": None,
+}
+
+
+def run_clients(port: int, clients: int, count: int, size: int) -> Dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", CLIENT_SCRIPT,
+         str(port), str(clients), str(count), str(size)],
+        cwd=HERE, capture_output=True, text=True, timeout=600
+    )
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return json.loads(proc.stdout)
+
+
+def measure(opts: Dict, mode: str, size: int, count: int, traced: bool) -> Dict:
+    port = free_port()
+    server = EchoServer(
+        port=port, log_sample=opts["log_sample"], echo_mode=mode,
+        pool_size=opts["pool_size"] or None
+    )
+    serve = threading.Thread(
+        target=server.start, args=(lambda msg: None,), daemon=True
+    )
+    serve.start()
+    time.sleep(0.3)
+
+    if traced:
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    try:
+        result = run_clients(port, opts["clients"], count, size)
+        if traced:
+            current, peak = tracemalloc.get_traced_memory()
+            result["peak_kb"] = round((peak - base) / 1024, 1)
+            result["retained_kb"] = round((current - base) / 1024, 1)
+    finally:
+        if traced:
+            tracemalloc.stop()
+        server.stop()
+        serve.join(5.0)
+    return result
+
+
+def main(argv: List[str]) -> None:
+    opts = parse_args(argv, DEFAULTS)
+    raise_fd_limit()
+    sizes = [int(size) for size in opts["sizes"].split(",")]
+
+    results: List[Dict] = []
+    for size in sizes:
+        count = min(opts["max_messages"], opts["megabytes"] * (1 << 20) // size)
+        for mode in ECHO_MODES:
+            timed = measure(opts, mode, size, count, traced=False)
+            traced = measure(opts, mode, size, count, traced=True)
+            seconds = max(timed["seconds"], 1e-9)
+            results.append({
+                "mode": mode,
+                "size": size,
+                "messages": timed["messages"],
+                "complete": timed["complete"] and traced["complete"],
+                "throughput": {
+                    "msgs_per_s": round(timed["messages"] / seconds, 1),
+                    "mb_per_s": round(timed["bytes"] / seconds / (1 << 20), 1),
+                },
+                "tracemalloc": {
+                    "peak_kb": traced["peak_kb"],
+                    "retained_kb": traced["retained_kb"],
+                },
+            })
+
+    write_json({
+        "bench": "echo_path",
+        "commit": git_commit(HERE),
+        "clients": opts["clients"],
+        "log_sample": opts["log_sample"],
+        "pool_size": opts["pool_size"],
+        "results": results,
+    }, opts["json"])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
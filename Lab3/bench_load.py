@@ -0,0 +1,149 @@
+"""
+Load benchmark: echo round-trip latency of EchoServer / AsyncEchoServer.
+
+N framed clients perform the username handshake, then together send
+--rate messages per second of --size bytes for --seconds, round-robin,
+and time each echo from send to receive.
+
+Reported (JSON, to stdout or --json PATH):
+    - throughput: echoes and echoed bytes per second
+    - rtt_ms: p50/p95/p99/max round-trip time
+    - server_usage: CPU seconds and % of one core, RSS, threads
+      (in-process runs measure the whole process, load generator included)
+
+--transport unix runs the same load over the server's Unix domain
+socket instead of loopback TCP.
+
+Usage:
+    python bench_load.py [--server threaded|async]
+                         [--mode subprocess|inprocess] [--clients N]
+                         [--transport tcp|unix]
+                         [--rate MSGS_PER_S] [--size BYTES]
+                         [--seconds S] [--json PATH]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from typing import List
+
+from latency import percentiles
+from loadgen import (
+    LoadDriver, free_port, git_commit, parse_args, parse_body,
+    process_usage, raise_fd_limit, start_subprocess, write_json
+)
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SERVER_SCRIPT = """
+import sys
+from server_logic import EchoServer, AsyncEchoServer
+
+def log(msg):
+    if msg.startswith("[SERVER]: Listening"):
+        print(msg, flush=True)
+
+cls = AsyncEchoServer if sys.argv[1] == "async" else EchoServer
+cls(port=int(sys.argv[2]), log_sample=0, unix_path=sys.argv[3] or None).start(log)
+"""
+
+DEFAULTS = {
+    "server": "threaded",
+    "mode": "subprocess",
+    "clients": 50,
+    "transport": "tcp",
+    "rate": 2000.0,
+    "size": 64,
+    "seconds": 5.0,
+    "json": None,
+}
+
+
+def main(argv: List[str]) -> None:
+    opts = parse_args(argv, DEFAULTS)
+    raise_fd_limit()
+    port = free_port()
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "echo.sock") if opts["transport"] == "unix" else ""
+    host = f"unix:{path}" if path else "127.0.0.1"
+
+    server = proc = None
+    if opts["mode"] == "inprocess":
+        from server_logic import EchoServer, AsyncEchoServer
+        cls = AsyncEchoServer if opts["server"] == "async" else EchoServer
+        server = cls(port=port, log_sample=0, unix_path=path or None)
+        threading.Thread(
+            target=server.start, args=(lambda msg: None,), daemon=True
+        ).start()
+        time.sleep(0.3)
+        pid = os.getpid()
+    else:
+        proc = start_subprocess(
+            SERVER_SCRIPT, HERE, opts["server"], str(port), path
+        )
+        pid = proc.pid
+
+    rtts: List[float] = []
+    echoed_bytes = [0]
+
+    def on_message(index: int, text: str, recv_ns: int) -> None:
+        parsed = parse_body(text)
+        if not parsed:
+            return
+        rtts.append((recv_ns - parsed[1]) / 1e6)
+        echoed_bytes[0] += len(text)
+
+    driver = LoadDriver(host, port, opts["clients"], on_message)
+    try:
+        connect_s = driver.connect()
+        driver.wait_quiet(0.2)
+
+        before = process_usage(pid)
+        t0 = time.perf_counter()
+        driver.run(opts["rate"], opts["size"], opts["seconds"])
+        driver.wait_quiet(0.2)
+        elapsed = max(driver.last_rx - t0, 1e-9)
+        after = process_usage(pid)
+    finally:
+        driver.close()
+        if server:
+            server.stop()
+        if proc:
+            proc.kill()
+            proc.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    cpu_s = after["cpu_s"] - before["cpu_s"]
+    write_json({
+        "bench": "echo_rtt",
+        "commit": git_commit(HERE),
+        "server": opts["server"],
+        "mode": opts["mode"],
+        "transport": opts["transport"],
+        "clients": opts["clients"],
+        "rate": opts["rate"],
+        "size": opts["size"],
+        "seconds": opts["seconds"],
+        "connect_s": round(connect_s, 3),
+        "sent": driver.sent,
+        "echoed": len(rtts),
+        "throughput": {
+            "msgs_per_s": round(len(rtts) / elapsed, 1),
+            "bytes_per_s": round(echoed_bytes[0] / elapsed, 1),
+        },
+        "rtt_ms": percentiles(rtts),
+        "server_usage": {
+            "scope": "process" if server else "server",
+            "cpu_s": round(cpu_s, 3),
+            "cpu_pct": round(100 * cpu_s / elapsed, 1),
+            "rss_kb": after["rss_kb"],
+            "threads": after["threads"],
+        },
+    }, opts["json"])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,100 @@
+"""
+Idle and shutdown check for EchoServer.
+
+Connects --clients framed clients that then stay silent and checks that:
+    - the server process burns (almost) no CPU while they idle
+    - stop() returns within --max-stop-s and joins every client thread
+    - every client sees __SERVER_SHUTDOWN__ or EOF
+
+The server runs in this process, so the CPU figure also covers the
+idle client sockets (which use no threads) and this script sleeping.
+
+Exits non-zero on the first failed check.
+
+Usage:
+    python check_idle.py [--clients N] [--seconds S]
+                         [--max-cpu-pct P] [--max-stop-s S]
+"""
+import os
+import sys
+import time
+import socket
+import threading
+from typing import List
+
+from checks import fail, ok
+from loadgen import free_port, parse_args, process_usage, raise_fd_limit
+from protocol import client_handshake
+from server_logic import EchoServer
+
+
+DEFAULTS = {
+    "clients": 1000,
+    "seconds": 3.0,
+    "max_cpu_pct": 1.0,
+    "max_stop_s": 2.0,
+}
+
+
+def main(argv: List[str]) -> None:
+    opts = parse_args(argv, DEFAULTS)
+    raise_fd_limit()
+    port = free_port()
+
+    # The admin endpoint runs too: its thread must sleep as well
+    server = EchoServer(port=port, log_sample=0, admin_port=free_port())
+    serve = threading.Thread(
+        target=server.start, args=(lambda msg: None,), daemon=True
+    )
+    serve.start()
+    time.sleep(0.3)
+
+    socks: List[socket.socket] = []
+    for i in range(opts["clients"]):
+        sock = socket.create_connection(("127.0.0.1", port))
+        client_handshake(sock, f"idle{i}")
+        socks.append(sock)
+
+    deadline = time.monotonic() + 5.0
+    while (len(server.client_threads) < len(socks)
+           and time.monotonic() < deadline):
+        time.sleep(0.05)
+    if len(server.client_threads) != len(socks):
+        fail(f"{len(server.client_threads)} client threads for {len(socks)} clients")
+    ok(f"{len(socks)} idle clients connected")
+
+    time.sleep(0.5)  # let connection setup settle
+    before = process_usage(os.getpid())
+    time.sleep(opts["seconds"])
+    after = process_usage(os.getpid())
+    cpu_pct = 100 * (after["cpu_s"] - before["cpu_s"]) / opts["seconds"]
+    if cpu_pct > opts["max_cpu_pct"]:
+        fail(f"idle CPU {cpu_pct:.2f}% of a core > {opts['max_cpu_pct']}%")
+    ok(f"idle CPU {cpu_pct:.2f}% of a core over {opts['seconds']:g}s")
+
+    threads = list(server.client_threads)
+    t0 = time.perf_counter()
+    server.stop()
+    stop_s = time.perf_counter() - t0
+    serve.join(opts["max_stop_s"])
+    if stop_s > opts["max_stop_s"]:
+        fail(f"stop() took {stop_s:.2f}s > {opts['max_stop_s']}s")
+    alive = sum(t.is_alive() for t in threads)
+    if alive or serve.is_alive():
+        fail(f"{alive} client threads still running after stop()")
+    ok(f"stop() took {stop_s * 1000:.0f} ms and joined {len(threads)} threads")
+
+    for sock in socks:
+        sock.settimeout(2.0)
+        try:
+            while sock.recv(65536):
+                pass
+        except OSError as e:
+            fail(f"client did not see the shutdown: {e}")
+        sock.close()
+    ok("every client saw the shutdown")
+    print("All checks passed")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,88 @@
+"""
+Registry cleanup check for EchoServer and AsyncEchoServer.
+
+Connects --clients framed clients to each server, then closes them with
+an RST (SO_LINGER 0) instead of a FIN. Once the server has seen the
+resets, checks that:
+    - server.clients is empty
+    - the metrics report 0 connections
+
+An RST close is what used to leak registry entries: by the time the
+session removed itself, the asyncio transport reported fd -1 (or a
+reused fd), so the lookup by fd missed.
+
+Exits non-zero on the first failed check.
+
+Usage:
+    python check_registry.py [--clients N] [--wait-s S]
+"""
+import sys
+import time
+import socket
+import struct
+import threading
+from typing import List
+
+from checks import fail, ok, wait_for
+from loadgen import free_port, parse_args, raise_fd_limit
+from protocol import client_handshake
+from server_logic import AsyncEchoServer, EchoServer
+
+
+DEFAULTS = {
+    "clients": 200,
+    "wait_s": 5.0,
+}
+
+
+def reset(sock: socket.socket) -> None:
+    sock.setsockopt(
+        socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+    )
+    sock.close()
+
+
+def check(name: str, server, port: int, opts: dict) -> None:
+    serve = threading.Thread(
+        target=server.start, args=(lambda msg: None,), daemon=True
+    )
+    serve.start()
+    time.sleep(0.3)
+
+    socks: List[socket.socket] = []
+    for i in range(opts["clients"]):
+        sock = socket.create_connection(("127.0.0.1", port))
+        client_handshake(sock, f"rst{i}")
+        socks.append(sock)
+
+    if not wait_for(lambda: len(server.clients) == len(socks), opts["wait_s"]):
+        fail(f"{name}: {len(server.clients)} registered for {len(socks)} clients")
+    ok(f"{name}: {len(socks)} clients registered")
+
+    for sock in socks:
+        reset(sock)
+
+    if not wait_for(lambda: len(server.clients) == 0, opts["wait_s"]):
+        fail(f"{name}: {len(server.clients)} registry entries left after RST")
+    connections = server.metrics.snapshot()["connections"]
+    if connections:
+        fail(f"{name}: metrics still report {connections} connections")
+    ok(f"{name}: registry empty after {len(socks)} RST closes")
+
+    server.stop()
+    serve.join(2.0)
+
+
+def main(argv: List[str]) -> None:
+    opts = parse_args(argv, DEFAULTS)
+    raise_fd_limit()
+
+    port = free_port()
+    check("EchoServer", EchoServer(port=port, log_sample=0), port, opts)
+    port = free_port()
+    check("AsyncEchoServer", AsyncEchoServer(port=port, log_sample=0), port, opts)
+    print("All checks passed")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
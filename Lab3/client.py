@@ -2,21 +2,55 @@ from typing import Type
 from client_gui import ClientGUI
 
 
-mode: str = input("Choose mode (gui/cli): ").strip().lower()
+mode: str = input("Choose mode (gui/cli/pipeline/udp): ").strip().lower()
 
 if mode == "gui":
     client_class: Type = __import__("client_logic").EchoClient
     gui: ClientGUI = ClientGUI(client_class=client_class)
     gui.start()
 
+elif mode == "udp":
+    # Latency probing against a UDP echo server: no username, no connection
+    from client_logic import UDPEchoClient
+
+    server_ip: str = input("Enter server IP: ")
+    try:
+        server_port: int = int(input("Enter server port: "))
+        burst: int = int(input("Probes per burst [100]: ") or "100")
+        bursts: int = int(input("Bursts [10]: ") or "10")
+        gap: float = float(input("Seconds between bursts [0.1]: ") or "0.1")
+        size: int = int(input("Probe size in bytes [64]: ") or "64")
+    except ValueError:
+        print("[client]: Invalid number")
+        raise SystemExit(1)
+
+    udp: UDPEchoClient = UDPEchoClient()
+    udp.connect(server_ip, server_port)
+    result = udp.probe(burst * bursts, size, burst, gap)
+    udp.close()
+
+    rtt = result["rtt_ms"]
+    print(
+        f"[client]: {result['received']}/{result['sent']} probes echoed, "
+        f"{result['loss_pct']}% lost, {result['duplicates']} duplicated, "
+        f"{result['reordered']} reordered"
+    )
+    print(
+        f"[client]: rtt ms p50={rtt['p50']} p95={rtt['p95']} "
+        f"p99={rtt['p99']} max={rtt['max']}"
+    )
+
 else:
-    from client_logic import EchoClient
+    from client_logic import EchoClient, run_pipeline
 
     username: str = input("Enter username: ")
-    server_ip: str = input("Enter server IP: ")
+    server_ip: str = input("Enter server IP (or unix:/path): ")
 
     try:
-        server_port: int = int(input("Enter server port: "))
+        # A Unix domain socket address needs no port
+        server_port: int = 0 if server_ip.startswith("unix:") else int(
+            input("Enter server port: ")
+        )
     except ValueError:
         print("[server]: Invalid port number")
         raise SystemExit(1)
@@ -30,6 +64,31 @@ else:
         print("[server]: Could not connect")
         raise SystemExit(1)
 
+    if mode == "pipeline":
+        # Throughput mode: a fixed window of requests kept in flight
+        try:
+            window: int = int(input("Window (outstanding messages) [64]: ") or "64")
+            count: int = int(input("Messages to send [10000]: ") or "10000")
+            size: int = int(input("Message size in bytes [64]: ") or "64")
+        except ValueError:
+            print("[client]: Invalid number")
+            client.close()
+            raise SystemExit(1)
+
+        result = run_pipeline(client, window, count, size)
+        latency = result["latency_ms"]
+        print(
+            f"[client]: {result['messages']} replies in {result['seconds']}s, "
+            f"window {window}: {result['msgs_per_s']} msg/s, "
+            f"{result['errors']} errors"
+        )
+        print(
+            f"[client]: latency ms p50={latency['p50']} p95={latency['p95']} "
+            f"p99={latency['p99']} max={latency['max']}"
+        )
+        client.close()
+        raise SystemExit(0)
+
     try:
         while True:
             msg: str = input("Enter message (exit to quit): ")
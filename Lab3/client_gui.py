@@ -2,6 +2,11 @@ import tkinter as tk
 from tkinter import messagebox
 import threading
 from typing import Type, Optional
+from logview import LogView, session_log_path
+
+
+# How often the outbound queue depth is shown
+SEND_STATUS_MS: int = 250
 
 
 class ClientGUI:
@@ -26,6 +31,7 @@ class ClientGUI:
         self.root: tk.Tk = tk.Tk()
         self.root.title("Echo Client")
         self.root.configure(bg=BG)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # ---- Connection frame ----
         frame = tk.Frame(self.root, bg=PANEL)
@@ -87,6 +93,11 @@ class ClientGUI:
         )
         self.send_btn.pack(pady=4)
 
+        # ---- Outbound queue status ----
+        self.queue_label = tk.Label(self.root, bg=BG, fg=FG)
+        self.queue_label.pack()
+        self.root.after(SEND_STATUS_MS, self.update_send_status)
+
         self.output = tk.Text(
             self.root,
             height=15,
@@ -109,27 +120,64 @@ class ClientGUI:
         )
 
         self.output.pack(padx=10, pady=6)
+        self.output_view = LogView(
+            self.root, self.output, spill_path=session_log_path("echo_client")
+        )
+        self.output_view.toolbar(self.root, BG, FG, BTN).pack(
+            fill="x", padx=10, pady=(0, 6)
+        )
 
     def write_log(self, msg: str, tag: str = "system") -> None:
-        self.output.insert("end", msg + "\n", tag)
-        self.output.see("end")
+        self.output_view.write(msg, tag)
+
+    def update_send_status(self) -> None:
+        """
+        Shows the outbound queue depth, in red while the server
+        is not keeping up, so a slow server never freezes the UI.
+        """
+        client = self.client if self.connected else None
+        depth = client.queue_depth() if client else 0
+        if client and client.congested:
+            self.queue_label.config(
+                text=f"Server is slow: {depth} messages waiting", fg="#B00020"
+            )
+        else:
+            self.queue_label.config(
+                text=f"Queued: {depth}" if depth else "", fg="#4A3F2A"
+            )
+        self.root.after(SEND_STATUS_MS, self.update_send_status)
 
     # ---------------- LISTENER ----------------
 
     def listen_loop(self) -> None:
+        """
+        Background thread: no Tk calls here. Messages are queued on
+        the output view and rendered in batches by the Tk timer.
+        """
+        client = self.client
+        write = self.output_view.write
         while self.connected and self.client:
-            msg = self.client.receive()
-            if msg is None:
+            messages = client.receive_batch()
+            if messages is None:
                 break
-            self.write_log(f"[SERVER] : {msg}", "system")
+            for msg in messages:
+                write(f"[SERVER] : {msg}", "system")
+
+        self.output_view.call_soon(lambda: self._listener_done(client))
 
-        self.on_disconnect()
+    def _listener_done(self, client) -> None:
+        # Ignore a listener from an earlier connection
+        if self.client is client:
+            self.on_disconnect()
 
     def on_disconnect(self) -> None:
         if not self.connected:
             return
 
         self.connected = False
+        if self.client:
+            # Don't wait for the writer on the Tk thread
+            self.client.close(timeout=None)
         self.entry.config(state="disabled")
         self.send_btn.config(state="disabled")
         self.connect_btn.config(text="Connect")
@@ -169,8 +217,6 @@ class ClientGUI:
             self.write_log(f"[SYSTEM] : Connected to {ip}:{port}", "system")
 
         else:
-            if self.client:
-                self.client.close()
             self.on_disconnect()
 
     # ---------------- SEND ----------------
@@ -187,9 +233,19 @@ class ClientGUI:
         self.write_log(f"[{self.client.username}] : {msg}", "user")
 
         try:
-            self.client.send(msg)
+            if not self.client.send(msg):
+                self.write_log("[SYSTEM] : Send queue full, message not sent")
         except Exception:
             self.on_disconnect()
 
+    def on_close(self) -> None:
+        """
+        Window closed: shut down and delete this session's spill file.
+        """
+        if self.client:
+            self.client.close(timeout=None)
+        self.output_view.close(remove_spill=True)
+        self.root.destroy()
+
     def start(self) -> None:
         self.root.mainloop()
@@ -1,46 +1,238 @@
+import time
 import socket
-from typing import Optional
+import asyncio
+import itertools
+import selectors
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import (
+    Callable, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+)
+from latency import percentiles
+from outbound import OutboundQueue, flatten, sendall_buffers
+from protocol import (
+    MAGIC, ProtocolError, RawDecoder, FrameDecoder, StreamDecoder,
+    encode, client_handshake
+)
+from transport import close_stream, connect_stream, unix_path
+
+
+# Pipelined requests travel as "#<seq> <text>"; the server echoes the
+# message unchanged, so the sequence id comes back with the reply
+SEQ_TAG: str = "#"
+
+
+class Echo(NamedTuple):
+    """
+    Reply to one pipelined request.
+    """
+    seq: int
+    text: str
+    rtt: float  # seconds, from request() to the reply being read
 
 
 class EchoClient:
     """
     Handles all networking for the client.
     No GUI code here. Just pure business logic.
+
+    send()/receive() are the one-at-a-time interface. request() is the
+    pipelined one: any number of messages may be outstanding, each
+    tagged with a sequence id and answered through a Future. The first
+    request() starts a dispatcher thread that owns the read side from
+    then on; untagged messages go to on_message.
     """
 
-    def __init__(self, username: str) -> None:
+    def __init__(
+        self,
+        username: str,
+        framed: bool = True,
+        queue_size: int = 4096,
+        high_water: int = 64
+    ) -> None:
         """
         username is the name through which client joins
         sock is the socket to which client connects
         connected is status flag that validates the connection
+        framed selects the length-prefixed protocol (False for old servers)
+        queue_size caps the outbound queue drained by the writer thread
+        high_water is the queue depth above which congested is True
         """
         self.username: str = username
         self.sock: Optional[socket.socket] = None
         self.connected: bool = False
+        self.framed: bool = framed
+        self.decoder: StreamDecoder = RawDecoder()
+        self.pending: Deque[str] = deque()
+        self.queue_size: int = queue_size
+        self.high_water: int = high_water
+        self.outbox: Optional[OutboundQueue] = None
+        self._writer: Optional[threading.Thread] = None
+
+        # ---- pipelining ----
+        self.on_message: Optional[Callable[[str], None]] = None
+        self._seq = itertools.count(1)
+        self._inflight: Dict[int, Tuple[Future, float]] = {}
+        self._inflight_lock = threading.Lock()
+        self._dispatcher: Optional[threading.Thread] = None
 
     def connect(self, host: str, port: int) -> None:
         """
         Connect to the server and send username once.
         This function only connects. It does NOT listen.
+        host may be "unix:/path" for a server's Unix domain socket.
         """
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.connect((host, port))
-        self.sock.sendall(self.username.encode())
+        self.sock = connect_stream(host, port)
+        self.pending.clear()
+
+        if self.framed:
+            try:
+                self.decoder, messages = client_handshake(self.sock, self.username)
+            except (OSError, ProtocolError):
+                self.sock.close()
+                self.sock = None
+                raise
+            self.pending.extend(messages)
+        else:
+            self.sock.sendall(self.username.encode())
+            self.decoder = RawDecoder()
+
         self.connected = True
+        self._dispatcher = None
+
+        # "disconnect" policy: a full queue refuses new messages
+        # instead of dropping ones already accepted
+        self.outbox = OutboundQueue(self.queue_size, "disconnect")
+        self._writer = threading.Thread(
+            target=self._writer_loop,
+            args=(self.sock, self.outbox),
+            daemon=True
+        )
+        self._writer.start()
 
-    def send(self, msg: str) -> None:
+    def send(self, msg: str) -> bool:
         """
-        Send a message to the server.
-        IMPORTANT: does NOT wait for response (non-blocking design).
+        Queue a message for the writer thread.
+        IMPORTANT: never blocks on the network, nor waits for the echo.
+        Returns False if the queue is full and the message was not sent.
         """
-        if not self.connected or not self.sock:
+        if not self.connected or self.outbox is None:
             raise RuntimeError("Not connected to server")
 
-        try:
-            self.sock.sendall(msg.encode())
-        except OSError:
-            self.connected = False
-            raise
+        return self.outbox.put((encode(msg, self.framed),))
+
+    def request(
+        self,
+        msg: str,
+        callback: Optional[Callable[[Future], None]] = None
+    ) -> Future:
+        """
+        Pipelined send: returns at once with a Future that resolves to
+        an Echo once the tagged reply arrives. callback(future) runs on
+        the dispatcher thread when it does. The Future fails with
+        BlockingIOError if the send queue is full, and with
+        ConnectionError if the connection drops first.
+        Needs the framed protocol: raw mode has no message boundaries,
+        so queued requests would come back merged into one reply.
+        """
+        if not self.connected or self.outbox is None:
+            raise RuntimeError("Not connected to server")
+        if not self.framed:
+            raise RuntimeError("Pipelined requests need the framed protocol")
+
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_loop, daemon=True
+            )
+            self._dispatcher.start()
+
+        future: Future = Future()
+        if callback:
+            future.add_done_callback(callback)
+
+        seq = next(self._seq)
+        with self._inflight_lock:
+            self._inflight[seq] = (future, time.perf_counter())
+        if not self.send(f"{SEQ_TAG}{seq} {msg}"):
+            with self._inflight_lock:
+                self._inflight.pop(seq, None)
+            future.set_exception(BlockingIOError("Send queue full"))
+        return future
+
+    def outstanding(self) -> int:
+        """
+        Pipelined requests still waiting for their reply.
+        """
+        return len(self._inflight)
+
+    def _dispatch_loop(self) -> None:
+        """
+        Reads replies and resolves the matching Futures.
+        """
+        while True:
+            batch = self.receive_batch()
+            if batch is None:
+                break
+            now = time.perf_counter()
+            for text in batch:
+                seq, body = self._untag(text)
+                with self._inflight_lock:
+                    entry = self._inflight.pop(seq, None)
+                if entry:
+                    future, sent = entry
+                    future.set_result(Echo(seq, body, now - sent))
+                elif self.on_message:
+                    self.on_message(text)
+
+        with self._inflight_lock:
+            failed = list(self._inflight.values())
+            self._inflight.clear()
+        for future, _ in failed:
+            future.set_exception(ConnectionError("Disconnected from server"))
+
+    @staticmethod
+    def _untag(text: str) -> Tuple[int, str]:
+        """
+        (seq, text without the tag); seq is 0 for untagged messages.
+        """
+        if text.startswith(SEQ_TAG):
+            head, _, body = text[len(SEQ_TAG):].partition(" ")
+            if head.isdigit():
+                return int(head), body
+        return 0, text
+
+    def queue_depth(self) -> int:
+        """
+        Messages queued but not yet written to the socket.
+        """
+        return len(self.outbox) if self.outbox is not None else 0
+
+    @property
+    def congested(self) -> bool:
+        """
+        True while the server is not keeping up with our sends.
+        """
+        return self.queue_depth() > self.high_water
+
+    def _writer_loop(self, sock: socket.socket, outbox: OutboundQueue) -> None:
+        """
+        Drains the outbound queue; everything queued since the last
+        write is coalesced into one send.
+        """
+        while True:
+            batch = outbox.get_batch()
+            if batch is None:
+                break
+            try:
+                sendall_buffers(sock, flatten(batch))
+            except OSError:
+                self.connected = False
+                outbox.close()
+                return
+        if outbox.finishing:
+            # close() may not have waited for the queue to drain
+            close_stream(sock)
 
     def receive(self) -> Optional[str]:
         """
@@ -53,13 +245,15 @@ class EchoClient:
             return None
 
         try:
-            data: bytes = self.sock.recv(1024)
-            if not data:
-                # server closed connection cleanly
-                self.connected = False
-                return None
+            while not self.pending:
+                messages = self.decoder.recv_from(self.sock)
+                if messages is None:
+                    # server closed connection cleanly
+                    self.connected = False
+                    return None
+                self.pending.extend(messages)
 
-            msg = data.decode()
+            msg = self.pending.popleft()
 
             # control message → client should NOT echo this
             if msg == "__SERVER_SHUTDOWN__":
@@ -68,19 +262,370 @@ class EchoClient:
 
             return msg
 
-        except OSError:
+        except (OSError, ProtocolError):
             self.connected = False
             return None
 
-    def close(self) -> None:
+    def receive_batch(self) -> Optional[List[str]]:
+        """
+        Receive every message available after one read.
+        Returns:
+            - list of messages (at least one)
+            - None if server disconnected
+        """
+        if not self.connected or not self.sock:
+            return None
+
+        try:
+            while not self.pending:
+                messages = self.decoder.recv_from(self.sock)
+                if messages is None:
+                    self.connected = False
+                    return None
+                self.pending.extend(messages)
+
+            batch = list(self.pending)
+            self.pending.clear()
+
+            # control message → stop here, the next call returns None
+            if "__SERVER_SHUTDOWN__" in batch:
+                self.connected = False
+                batch = batch[:batch.index("__SERVER_SHUTDOWN__")]
+                return batch or None
+
+            return batch
+
+        except (OSError, ProtocolError):
+            self.connected = False
+            return None
+
+    def close(self, timeout: Optional[float] = 2.0) -> None:
         """
         Close socket safely.
+        Messages already accepted by send() are still written; the
+        writer gets up to timeout seconds to drain the queue.
+        With timeout=None close() returns at once (for GUI threads):
+        the writer drains in the background and closes the socket.
         """
         self.connected = False
+        if self.outbox is not None:
+            self.outbox.finish()
+            if timeout is None and self._writer is not None:
+                self._writer = None
+                self.outbox = None
+                self.sock = None
+                return
+            if self._writer is not None:
+                self._writer.join(timeout)
+                self._writer = None
+            self.outbox.close()
+            self.outbox = None
         if self.sock:
+            close_stream(self.sock)
+            self.sock = None
+
+
+def run_pipeline(
+    client: EchoClient,
+    window: int,
+    count: int,
+    size: int = 64,
+    timeout: float = 30.0
+) -> Dict:
+    """
+    Send count messages of size bytes keeping at most window of them
+    outstanding. Returns achieved msg/s and the latency distribution.
+    """
+    slots = threading.Semaphore(window)
+    latencies: List[float] = []
+    errors = [0]
+
+    def done(future: Future) -> None:
+        if future.exception():
+            errors[0] += 1
+        else:
+            latencies.append(future.result().rtt * 1000)
+        slots.release()
+
+    body = "x" * size
+    t0 = time.perf_counter()
+    for _ in range(count):
+        if not slots.acquire(timeout=timeout) or not client.connected:
+            break
+        client.request(body, done)
+
+    # Every slot back means every reply is in
+    deadline = time.perf_counter() + timeout
+    for _ in range(window):
+        slots.acquire(timeout=max(0.0, deadline - time.perf_counter()))
+    elapsed = max(time.perf_counter() - t0, 1e-9)
+
+    return {
+        "window": window,
+        "messages": len(latencies),
+        "errors": errors[0],
+        "seconds": round(elapsed, 3),
+        "msgs_per_s": round(len(latencies) / elapsed, 1),
+        "latency_ms": percentiles(latencies),
+    }
+
+
+class AsyncEchoClient:
+    """
+    asyncio counterpart of EchoClient.
+    Same handshake and shutdown semantics, so a single bot process
+    can drive thousands of sessions without one thread each.
+    """
+
+    def __init__(self, username: str, framed: bool = True) -> None:
+        self.username: str = username
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.connected: bool = False
+        self.framed: bool = framed
+        self.decoder: StreamDecoder = RawDecoder()
+        self.pending: Deque[str] = deque()
+
+    async def connect(self, host: str, port: int) -> None:
+        """
+        Connect to the server and send username once.
+        host may be "unix:/path" for a server's Unix domain socket.
+        """
+        path = unix_path(host)
+        if path is None:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+        else:
+            self.reader, self.writer = await asyncio.open_unix_connection(path)
+        self.pending.clear()
+
+        if not self.framed:
+            self.writer.write(self.username.encode())
+            await self.writer.drain()
+            self.decoder = RawDecoder()
+            self.connected = True
+            return
+
+        self.writer.write(MAGIC + encode(self.username, framed=True))
+        await self.writer.drain()
+        try:
+            reply = await asyncio.wait_for(
+                self.reader.readexactly(len(MAGIC)), timeout=5.0
+            )
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            reply = b""
+
+        if reply != MAGIC:
+            self.writer.close()
+            raise ConnectionError("Server does not support the framed protocol")
+
+        self.decoder = FrameDecoder()
+        self.connected = True
+
+    async def send(self, msg: str) -> None:
+        """
+        Send a message to the server. Waits only for the
+        write buffer to drain, not for the echo.
+        """
+        if not self.connected or not self.writer:
+            raise RuntimeError("Not connected to server")
+
+        try:
+            self.writer.write(encode(msg, self.framed))
+            await self.writer.drain()
+        except OSError:
+            self.connected = False
+            raise
+
+    async def receive(self) -> Optional[str]:
+        """
+        Receive ONE message from server.
+        Returns:
+            - string message
+            - None if server disconnected
+        """
+        if not self.connected or not self.reader:
+            return None
+
+        try:
+            while not self.pending:
+                data: bytes = await self.reader.read(self.decoder.bufsize)
+                if not data:
+                    self.connected = False
+                    return None
+                self.pending.extend(self.decoder.feed(data))
+
+            msg = self.pending.popleft()
+
+            if msg == "__SERVER_SHUTDOWN__":
+                self.connected = False
+                return None
+
+            return msg
+
+        except (OSError, ProtocolError):
+            self.connected = False
+            return None
+
+    async def close(self) -> None:
+        """
+        Close connection safely.
+        """
+        self.connected = False
+        if self.writer:
             try:
-                self.sock.shutdown(socket.SHUT_RDWR)
+                self.writer.close()
+                await self.writer.wait_closed()
             except OSError:
                 pass
+            self.writer = None
+            self.reader = None
+
+
+class UDPEchoClient:
+    """
+    Datagram counterpart of EchoClient, for UDPEchoServer.
+    One message is one datagram. There is no handshake and nothing is
+    retransmitted, so receive() can time out and probe() reports what
+    was lost. Replies land in one reused buffer.
+    """
+
+    def __init__(self, bufsize: int = 65535) -> None:
+        self.sock: Optional[socket.socket] = None
+        self.connected: bool = False
+        self._buf: memoryview = memoryview(bytearray(bufsize))
+
+    def connect(self, host: str, port: int) -> None:
+        """
+        Fix the server address; datagrams from anyone else are ignored.
+        Nothing is sent, so this succeeds even if no server listens.
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect((host, port))
+        self.connected = True
+
+    def send(self, msg: str) -> bool:
+        if not self.connected or not self.sock:
+            raise RuntimeError("Not connected to server")
+        try:
+            self.sock.send(msg.encode())
+            return True
+        except OSError:
+            return False
+
+    def receive(self, timeout: float = 1.0) -> Optional[str]:
+        """
+        Next datagram as text, or None if none arrives within timeout.
+        """
+        if not self.connected or not self.sock:
+            return None
+        self.sock.settimeout(timeout)
+        try:
+            n = self.sock.recv_into(self._buf)
+        except OSError:
+            return None
+        return bytes(self._buf[:n]).decode(errors="replace")
+
+    def probe(
+        self,
+        count: int,
+        size: int = 64,
+        burst: Optional[int] = None,
+        gap: float = 0.0,
+        timeout: float = 1.0
+    ) -> Dict:
+        """
+        Send count probes of size bytes, burst of them back to back with
+        gap seconds between bursts, then wait up to timeout for the last
+        replies. Each probe is "#<seq> " plus padding; replies are read
+        as they arrive, so an RTT is send to read time.
+        Returns loss, duplicates, reordering and the RTT distribution.
+        """
+        if not self.connected or not self.sock:
+            raise RuntimeError("Not connected to server")
+
+        sock = self.sock
+        buf = self._buf
+        burst = burst or count
+        pad = b"x" * size
+        sent_at: Dict[int, int] = {}
+        rtts: List[float] = []
+        seen: Set[int] = set()
+        counts = {"duplicates": 0, "reordered": 0, "highest": 0}
+
+        def drain() -> None:
+            while True:
+                try:
+                    n = sock.recv_into(buf)
+                except (BlockingIOError, InterruptedError):
+                    return
+                except OSError:
+                    return  # ICMP error from an earlier send
+                now = time.perf_counter_ns()
+                head = bytes(buf[1:min(n, 24)]).split(b" ", 1)[0]
+                if buf[0:1] != b"#" or not head.isdigit():
+                    continue
+                seq = int(head)
+                if seq not in sent_at:
+                    continue
+                if seq in seen:
+                    counts["duplicates"] += 1
+                    continue
+                seen.add(seq)
+                rtts.append((now - sent_at[seq]) / 1e6)
+                if seq < counts["highest"]:
+                    counts["reordered"] += 1
+                else:
+                    counts["highest"] = seq
+
+        def wait(seconds: float) -> None:
+            deadline = time.perf_counter() + seconds
+            while len(seen) < len(sent_at):
+                left = deadline - time.perf_counter()
+                if left <= 0:
+                    return
+                if selector.select(left):
+                    drain()
+
+        selector = selectors.DefaultSelector()
+        selector.register(sock, selectors.EVENT_READ)
+        sock.setblocking(False)
+        t0 = time.perf_counter()
+        try:
+            for seq in range(1, count + 1):
+                if seq > 1 and (seq - 1) % burst == 0 and gap:
+                    # Read replies during the gap, but keep its length
+                    resume = time.perf_counter() + gap
+                    wait(gap)
+                    time.sleep(max(0.0, resume - time.perf_counter()))
+                head = b"%s%d " % (SEQ_TAG.encode(), seq)
+                payload = head + pad[:max(0, size - len(head))]
+                sent_at[seq] = time.perf_counter_ns()
+                try:
+                    sock.send(payload)
+                except OSError:
+                    del sent_at[seq]
+                drain()
+            wait(timeout)
+        finally:
+            sock.setblocking(True)
+            selector.close()
+        elapsed = time.perf_counter() - t0
+
+        lost = len(sent_at) - len(seen)
+        return {
+            "sent": len(sent_at),
+            "send_errors": count - len(sent_at),
+            "received": len(seen),
+            "lost": lost,
+            "loss_pct": round(100 * lost / max(1, len(sent_at)), 2),
+            "duplicates": counts["duplicates"],
+            "reordered": counts["reordered"],
+            "seconds": round(elapsed, 3),
+            "rtt_ms": percentiles(rtts),
+        }
+
+    def close(self) -> None:
+        self.connected = False
+        if self.sock:
             self.sock.close()
             self.sock = None
@@ -0,0 +1,118 @@
+import time
+import tkinter as tk
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+
+# (title, metrics snapshot key, shown as a per-second rate)
+Series = Tuple[str, str, bool]
+
+
+class Dashboard:
+    """
+    Row of sparkline charts fed by a server's metrics snapshot.
+
+    Everything runs on the Tk thread: once per interval_ms sample()
+    is called (it returns a metrics.Metrics snapshot, or None while no
+    server runs), counters marked as rates are turned into per-second
+    deltas, and each chart moves one existing Canvas line item with
+    coords(), so a redraw costs a handful of Tcl calls whatever the
+    message rate. The last history samples are kept per chart.
+    """
+
+    def __init__(
+        self,
+        parent: tk.Misc,
+        sample: Callable[[], Optional[Dict]],
+        series: Sequence[Series],
+        bg: str,
+        fg: str,
+        line: str = "#4ec9b0",
+        interval_ms: int = 1000,
+        history: int = 60,
+        width: int = 150,
+        height: int = 36
+    ) -> None:
+        self.sample = sample
+        self.series: List[Series] = list(series)
+        self.interval_ms: int = interval_ms
+        self.width: int = width
+        self.height: int = height
+
+        self.values: List[Deque[float]] = [
+            deque(maxlen=history) for _ in self.series
+        ]
+        self._last: Optional[Dict] = None
+        self._last_time: float = 0.0
+
+        self.frame = tk.Frame(parent, bg=bg)
+        self._labels: List[tk.Label] = []
+        self._canvases: List[tk.Canvas] = []
+        self._lines: List[int] = []
+        for column, (title, _, _) in enumerate(self.series):
+            label = tk.Label(self.frame, text=title, bg=bg, fg=fg, anchor="w")
+            label.grid(row=0, column=column, sticky="w", padx=4)
+            canvas = tk.Canvas(
+                self.frame, width=width, height=height,
+                bg="#111111", highlightthickness=0
+            )
+            canvas.grid(row=1, column=column, padx=4, pady=(0, 4))
+            self._labels.append(label)
+            self._canvases.append(canvas)
+            self._lines.append(canvas.create_line(0, height, 0, height, fill=line))
+
+        self.frame.after(self.interval_ms, self._tick)
+
+    def _tick(self) -> None:
+        try:
+            self.update(self.sample(), time.monotonic())
+        finally:
+            self.frame.after(self.interval_ms, self._tick)
+
+    def update(self, snapshot: Optional[Dict], now: float) -> None:
+        """
+        Add one sample to every chart and redraw them.
+        """
+        if snapshot is None:
+            self._last = None
+            return
+
+        last, elapsed = self._last, now - self._last_time
+        self._last, self._last_time = snapshot, now
+        for i, (title, key, rate) in enumerate(self.series):
+            value = float(snapshot.get(key, 0))
+            if rate:
+                if last is None or elapsed <= 0:
+                    continue
+                # A restarted server starts counting from zero again
+                value = max(0.0, value - last.get(key, 0)) / elapsed
+            self.values[i].append(value)
+            self._draw(i, title)
+
+    def _draw(self, i: int, title: str) -> None:
+        values = self.values[i]
+        self._labels[i].config(text=f"{title}: {_short(values[-1])}")
+
+        peak = max(values) or 1.0
+        step = self.width / max(1, values.maxlen - 1)
+        top = self.height - 2
+        points: List[float] = []
+        for n, value in enumerate(values):
+            points.append(n * step)
+            points.append(self.height - 1 - top * value / peak)
+        if len(points) == 2:
+            points += points
+        self._canvases[i].coords(self._lines[i], *points)
+
+
+def _short(value: float) -> str:
+    """
+    Compact label text: 950, 12.5k, 340k, 1.2M
+    """
+    for unit in ("", "k", "M", "G"):
+        if abs(value) < 1000:
+            if unit and abs(value) < 100:
+                return f"{value:.1f}{unit}"
+            return f"{value:.0f}{unit}"
+        value /= 1000
+    return f"{value:.1f}T"
@@ -0,0 +1,20 @@
+"""
+Latency summaries shared by the clients and the bench_*.py scripts.
+"""
+from typing import Dict, Sequence
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    p50/p95/p99/max of samples, in the samples' unit, rounded.
+    """
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        "p50": round(ordered[int(last * 0.50)], 3),
+        "p95": round(ordered[int(last * 0.95)], 3),
+        "p99": round(ordered[int(last * 0.99)], 3),
+        "max": round(ordered[last], 3),
+    }
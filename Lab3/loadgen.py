@@ -0,0 +1,327 @@
+"""
+Load generator shared by the bench_*.py scripts.
+
+LoadDriver opens N framed clients with the real username handshake,
+paces messages at a fixed total rate from one sender thread and reads
+every reply on one selector thread. Each message body carries its send
+time, "<seq> <perf_counter_ns> <padding>", so the handler can compute
+latencies on arrival. connect_storm times connection setup alone.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import resource
+import selectors
+import threading
+import subprocess
+from typing import Callable, Dict, List, Optional
+
+from latency import percentiles
+from protocol import FrameDecoder, client_handshake, encode
+from transport import connect_stream, set_nodelay
+
+
+# ---------------- Helpers ----------------
+
+def raise_fd_limit() -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_usage(pid: int) -> Dict[str, float]:
+    """
+    CPU seconds (user + system), RSS in kB and thread count of pid.
+    Linux reads /proc; elsewhere only the current process is known.
+    """
+    usage = {"cpu_s": 0.0, "rss_kb": 0, "threads": 0}
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        usage["cpu_s"] = (int(fields[11]) + int(fields[12])) / ticks
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key == "VmRSS":
+                    usage["rss_kb"] = int(value.split()[0])
+                elif key == "Threads":
+                    usage["threads"] = int(value.split()[0])
+    except (OSError, ValueError, IndexError):
+        if pid == os.getpid():
+            ru = resource.getrusage(resource.RUSAGE_SELF)
+            usage["cpu_s"] = ru.ru_utime + ru.ru_stime
+            usage["rss_kb"] = ru.ru_maxrss
+            usage["threads"] = threading.active_count()
+    return usage
+
+
+def git_commit(path: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=path, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_json(result: Dict, path: Optional[str]) -> None:
+    text = json.dumps(result, indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def parse_args(argv: List[str], defaults: Dict) -> Dict:
+    """
+    --name value pairs overriding defaults, converted to the
+    default's type.
+    """
+    options = dict(defaults)
+    args = iter(argv)
+    for arg in args:
+        name = arg.lstrip("-").replace("-", "_")
+        if not arg.startswith("--") or name not in options:
+            print(f"Unknown option {arg}; known: "
+                  + " ".join(f"--{k.replace('_', '-')}" for k in options))
+            raise SystemExit(2)
+        kind = type(defaults[name]) if defaults[name] is not None else str
+        options[name] = kind(next(args))
+    return options
+
+
+# ---------------- Driver ----------------
+
+class LoadDriver:
+    """
+    N framed clients of one server.
+    on_message(index, text, recv_ns) runs on the receiver thread.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        clients: int,
+        on_message: Callable[[int, str, int], None],
+        prefix: str = "load"
+    ) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.on_message = on_message
+        self.prefix: str = prefix
+        self.count: int = clients
+        self.socks: List[socket.socket] = []
+        self.decoders: List[FrameDecoder] = []
+        self.sent: int = 0
+        self.received: int = 0
+        self.last_rx: float = time.perf_counter()
+        self.running: bool = False
+        self.selector = selectors.DefaultSelector()
+        self._receiver: Optional[threading.Thread] = None
+
+    def connect(self) -> float:
+        """
+        Connect and handshake every client; returns the seconds taken.
+        Messages that arrive before the run (join notices) are ignored.
+        """
+        t0 = time.perf_counter()
+        for i in range(self.count):
+            sock = connect_stream(self.host, self.port)
+            set_nodelay(sock)
+            decoder, _ = client_handshake(sock, f"{self.prefix}{i}")
+            self.socks.append(sock)
+            self.decoders.append(decoder)
+            self.selector.register(sock, selectors.EVENT_READ, i)
+        elapsed = time.perf_counter() - t0
+
+        self.running = True
+        self._receiver = threading.Thread(target=self._receive, daemon=True)
+        self._receiver.start()
+        return elapsed
+
+    def wait_quiet(self, quiet: float = 0.5, limit: float = 60.0) -> None:
+        """
+        Block until nothing has arrived for quiet seconds.
+        """
+        deadline = time.perf_counter() + limit
+        while (time.perf_counter() - self.last_rx < quiet
+               and time.perf_counter() < deadline):
+            time.sleep(0.05)
+
+    def run(
+        self,
+        rate: float,
+        size: int,
+        seconds: float,
+        target: Callable[[int], str] = lambda i: ""
+    ) -> float:
+        """
+        Send rate messages/s in total, round-robin over the clients,
+        for seconds; target(i) prefixes client i's messages (e.g.
+        "@user "). Returns the seconds actually spent sending.
+        """
+        self.received = 0
+        pad = "x" * max(0, size - 24)
+        t0 = time.perf_counter()
+        deadline = t0 + seconds
+        seq = 0
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            due = int((now - t0) * rate) - seq
+            if due <= 0:
+                time.sleep(min(0.001, deadline - now))
+                continue
+            for _ in range(due):
+                i = seq % self.count
+                body = f"{target(i)}{seq} {time.perf_counter_ns()} {pad}"
+                try:
+                    self.socks[i].sendall(encode(body, framed=True))
+                except OSError:
+                    pass
+                seq += 1
+
+        self.sent = seq
+        return time.perf_counter() - t0
+
+    def _receive(self) -> None:
+        while self.running:
+            for key, _ in self.selector.select(timeout=0.1):
+                i = key.data
+                try:
+                    data = key.fileobj.recv(65536)
+                except OSError:
+                    data = b""
+                if not data:
+                    self.selector.unregister(key.fileobj)
+                    continue
+
+                now = time.perf_counter_ns()
+                self.last_rx = time.perf_counter()
+                for text in self.decoders[i].feed(data):
+                    self.received += 1
+                    self.on_message(i, text, now)
+
+    def close(self) -> None:
+        self.running = False
+        if self._receiver:
+            self._receiver.join()
+        for sock in self.socks:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self.selector.close()
+
+
+# ---------------- Connection storm ----------------
+
+def connect_storm(
+    host: str,
+    port: int,
+    count: int,
+    silent_fraction: float = 0.0,
+    concurrency: int = 16,
+    prefix: str = "storm",
+    timeout: float = 10.0
+) -> Dict:
+    """
+    Open count connections from concurrency threads and time each
+    one from connect() to the server's handshake reply.
+
+    About silent_fraction of them (spread evenly through the run)
+    connect and then never send a username; they are held open until
+    every other client has finished, so a server that waits on one of
+    them in its accept path shows up as failed or slow handshakes.
+    """
+    latencies: List[float] = []
+    failed = [0]
+    held: List[socket.socket] = []
+    lock = threading.Lock()
+    order = iter(range(count))
+
+    def worker() -> None:
+        while True:
+            with lock:
+                i = next(order, None)
+            if i is None:
+                return
+            silent = int((i + 1) * silent_fraction) > int(i * silent_fraction)
+            t0 = time.perf_counter()
+            try:
+                sock = connect_stream(host, port, timeout)
+                if not silent:
+                    client_handshake(sock, f"{prefix}{i}", timeout)
+            except (OSError, ConnectionError):
+                with lock:
+                    failed[0] += 1
+                continue
+            elapsed = time.perf_counter() - t0
+            with lock:
+                held.append(sock)
+                if not silent:
+                    latencies.append(elapsed * 1000)
+
+    t0 = time.perf_counter()
+    threads = [
+        threading.Thread(target=worker, daemon=True)
+        for _ in range(max(1, concurrency))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - t0
+
+    for sock in held:
+        sock.close()
+    silent = int(count * silent_fraction)
+    return {
+        "connections": count,
+        "silent": silent,
+        "completed": len(latencies),
+        "failed": failed[0],
+        "seconds": round(seconds, 3),
+        "handshakes_per_s": round(len(latencies) / max(seconds, 1e-9), 1),
+        "handshake_ms": percentiles(latencies),
+    }
+
+
+def parse_body(text: str) -> Optional[tuple]:
+    """
+    (seq, send_ns) from a load message body, or None.
+    """
+    parts = text.split(" ", 2)
+    try:
+        return int(parts[0]), int(parts[1])
+    except (ValueError, IndexError):
+        return None
+
+
+def start_subprocess(script: str, cwd: str, *args: str) -> subprocess.Popen:
+    """
+    Run a server script and wait for its first output line (ready).
+    """
+    proc = subprocess.Popen(
+        [sys.executable, "-c", script, *args],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    proc.stdout.readline()
+    return proc
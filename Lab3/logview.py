@@ -0,0 +1,406 @@
+import os
+import itertools
+import tempfile
+import threading
+import tkinter as tk
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import BinaryIO, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# find() reads the spill file backwards this many bytes (whole lines)
+# at a time
+SEARCH_CHUNK: int = 1 << 20
+
+
+def session_log_path(name: str) -> str:
+    """
+    Fresh spill file for one GUI session, e.g. /tmp/chat_server-1234-ab12.log
+    """
+    fd, path = tempfile.mkstemp(prefix=f"{name}-{os.getpid()}-", suffix=".log")
+    os.close(fd)
+    return path
+
+
+class LogView:
+    """
+    Batched, rate-limited writer for a Tk Text widget.
+
+    write() may be called from any thread: it only numbers the line and
+    appends it to a deque, under one short lock so the numbers stay in
+    append order, and makes no Tcl call. A timer on the Tk thread
+    flushes everything pending fps times per second with a single
+    insert() and a single see("end").
+
+    At most max_pending lines wait between flushes; when producers
+    outrun the display the oldest are discarded and replaced by one
+    "N lines dropped" marker.
+
+    The widget keeps at most max_lines lines, trimmed from the top.
+    With spill_path set every line is also appended to that file, and
+    a line -> byte offset index lets load_older() and find() page old
+    lines back in from disk. Paging leaves follow mode (new lines go to
+    disk only) until follow() is called. Once this session's part of
+    the file passes max_spill bytes the oldest half of it is dropped.
+    close(remove_spill=True) deletes the file, e.g. on window close.
+
+    Lines written without a tag get one from classify(line), run on the
+    Tk thread over the whole batch at flush time. call_soon() queues
+    any other UI work from a background thread onto the same timer.
+    """
+
+    def __init__(
+        self,
+        root: tk.Misc,
+        text: tk.Text,
+        fps: int = 25,
+        max_pending: int = 5000,
+        max_lines: int = 2000,
+        spill_path: Optional[str] = None,
+        classify: Optional[Callable[[str], str]] = None,
+        max_spill: int = 32 << 20
+    ) -> None:
+        self.root = root
+        self.text = text
+        self.interval: int = max(1, 1000 // fps)
+        self.max_lines: int = max_lines
+        self.dropped: int = 0
+        self.classify: Optional[Callable[[str], str]] = classify
+
+        # (sequence number, line, tag); gaps in the sequence are drops
+        self._pending: Deque[Tuple[int, str, Optional[str]]] = deque(
+            maxlen=max_pending
+        )
+        self._calls: Deque[Callable[[], None]] = deque()
+        self._seq = itertools.count()
+        self._seq_lock = threading.Lock()
+        self._next_seq: int = 0
+        self._after_id: Optional[str] = None
+
+        # ---- scrollback ----
+        self.following: bool = True
+        self.lines: int = 0          # lines ever rendered or spilled
+        self._first: int = 0         # line number of the widget's top line
+        self._last: int = 0          # one past its bottom line
+
+        # ---- disk spill ----
+        self.spill_path: Optional[str] = spill_path
+        self._spill: Optional[BinaryIO] = None
+        self.max_spill: int = max_spill
+        self._size: int = 0
+        self._base: int = 0          # where this session's lines start
+        self._origin: int = 0        # line number of the oldest line kept
+        self._offsets = array("Q")   # line - _origin -> byte offset
+        self._tags = array("B")      # line - _origin -> index into _tag_names
+        self._tag_names: List[str] = [""]
+        self._tag_ids: Dict[str, int] = {"": 0}
+        self._find: Optional[Tuple[str, int]] = None
+        if spill_path:
+            self._spill = open(spill_path, "ab+")
+            self._size = self._base = self._spill.seek(0, os.SEEK_END)
+
+        self.text.tag_configure("found", background="#f6d55c", foreground="black")
+        self._schedule()
+
+    def write(self, msg: str, tag: Optional[str] = None) -> None:
+        """
+        Thread-safe; msg is shown at the next flush.
+        """
+        # Without the lock a writer preempted between next() and
+        # append() lands behind a later number, which reads as a drop
+        with self._seq_lock:
+            self._pending.append((next(self._seq), msg, tag))
+
+    def call_soon(self, callback: Callable[[], None]) -> None:
+        """
+        Thread-safe; callback runs on the Tk thread after the next flush.
+        """
+        self._calls.append(callback)
+
+    def close(self, remove_spill: bool = False) -> None:
+        if self._after_id:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self._spill:
+            self._spill.close()
+            self._spill = None
+            if remove_spill and self.spill_path:
+                try:
+                    os.unlink(self.spill_path)
+                except OSError:
+                    pass
+
+    # ---------------- Flushing ----------------
+
+    def _schedule(self) -> None:
+        self._after_id = self.root.after(self.interval, self._flush)
+
+    def _flush(self) -> None:
+        try:
+            batch = self._drain()
+            if batch:
+                self._spill_lines(batch)
+                self.lines += len(batch)
+                if self.following:
+                    self._render("end", batch)
+                    self._last = self.lines
+                    self._trim()
+                    self.text.see("end")
+            while self._calls:
+                self._calls.popleft()()
+        finally:
+            self._schedule()
+
+    def _drain(self) -> List[Tuple[str, str]]:
+        """
+        Everything pending, one entry per text line, with a marker
+        wherever lines were dropped.
+        """
+        batch: List[Tuple[str, str]] = []
+        pending = self._pending
+        classify = self.classify
+        while pending:
+            seq, msg, tag = pending.popleft()
+            if tag is None:
+                tag = classify(msg) if classify else ""
+            if seq > self._next_seq:
+                lost = seq - self._next_seq
+                self.dropped += lost
+                batch.append((f"... {lost} lines dropped ...", ""))
+            self._next_seq = seq + 1
+            if "\n" in msg:
+                batch.extend((part, tag) for part in msg.split("\n"))
+            else:
+                batch.append((msg, tag))
+        return batch
+
+    def _render(self, index: str, batch: List[Tuple[str, str]]) -> None:
+        # Consecutive lines with the same tag become one run, and all
+        # runs go in with one insert(index, chars, tags, chars, tags, ...)
+        args: List[str] = []
+        run: List[str] = []
+        run_tag: Optional[str] = None
+        for msg, tag in batch:
+            if tag != run_tag and run:
+                args += ["".join(run), run_tag]
+                run = []
+            run_tag = tag
+            run.append(msg + "\n")
+        if run:
+            args += ["".join(run), run_tag]
+
+        restore = str(self.text.cget("state"))
+        if restore == "disabled":
+            self.text.config(state="normal")
+        self.text.insert(index, *args)
+        if restore == "disabled":
+            self.text.config(state="disabled")
+
+    def _trim(self) -> None:
+        excess = (self._last - self._first) - self.max_lines
+        if excess <= 0:
+            return
+        self._delete("1.0", f"{excess + 1}.0")
+        self._first += excess
+
+    def _delete(self, start: str, end: str) -> None:
+        restore = str(self.text.cget("state"))
+        if restore == "disabled":
+            self.text.config(state="normal")
+        self.text.delete(start, end)
+        if restore == "disabled":
+            self.text.config(state="disabled")
+
+    # ---------------- Disk spill ----------------
+
+    def _spill_lines(self, batch: List[Tuple[str, str]]) -> None:
+        if not self._spill:
+            return
+        chunks: List[bytes] = []
+        for msg, tag in batch:
+            data = (msg + "\n").encode(errors="replace")
+            self._offsets.append(self._size)
+            self._tags.append(self._tag_id(tag))
+            self._size += len(data)
+            chunks.append(data)
+        self._spill.write(b"".join(chunks))
+        self._spill.flush()
+        if self._size - self._base > self.max_spill:
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        Keep only the newest max_spill / 2 bytes of lines on disk.
+        """
+        cut = bisect_left(self._offsets, self._size - self.max_spill // 2)
+        cut = min(cut, len(self._offsets) - 1)  # always keep the last line
+        start = self._offsets[cut]
+        self._spill.seek(start)
+        data = self._spill.read()
+        self._spill.truncate(self._base)
+        self._spill.write(data)   # append mode: lands at _base
+        self._spill.flush()
+
+        shift = start - self._base
+        self._offsets = array("Q", [o - shift for o in self._offsets[cut:]])
+        self._tags = self._tags[cut:]
+        self._size -= shift
+        self._origin += cut
+
+    def _tag_id(self, tag: str) -> int:
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = len(self._tag_names)
+            self._tag_names.append(tag)
+            self._tag_ids[tag] = tag_id
+        return tag_id
+
+    def _read_lines(self, start: int, end: int) -> List[Tuple[str, str]]:
+        """
+        Lines [start, end) back from disk, with their tags; start must
+        not be before _origin.
+        """
+        if not self._spill or start >= end:
+            return []
+        first, last = start - self._origin, end - self._origin
+        stop = self._offsets[last] if last < len(self._offsets) else self._size
+        self._spill.seek(self._offsets[first])
+        data = self._spill.read(stop - self._offsets[first])
+        self._spill.seek(0, os.SEEK_END)
+
+        texts = data.decode(errors="replace").split("\n")[:end - start]
+        return [
+            (msg, self._tag_names[self._tags[first + i]])
+            for i, msg in enumerate(texts)
+        ]
+
+    # ---------------- Paging ----------------
+
+    def load_older(self, count: int = 500) -> int:
+        """
+        Prepend up to count lines from before the top of the widget.
+        Returns how many were loaded.
+        """
+        start = max(self._origin, self._first - count)
+        batch = self._read_lines(start, self._first)
+        if not batch:
+            return 0
+        self.following = False
+        self._render("1.0", batch)
+        self._first = start
+        self.text.see("1.0")
+        return len(batch)
+
+    def find(self, needle: str) -> bool:
+        """
+        Show the most recent line containing needle; calling again with
+        the same needle goes further back. The match is highlighted in
+        a window of max_lines lines around it.
+        """
+        if not self._spill or not needle:
+            return False
+
+        before = self.lines
+        if self._find and self._find[0] == needle:
+            before = self._find[1]
+
+        match = self._search(needle, before)
+        if match is None:
+            self._find = None
+            return False
+        self._find = (needle, match)
+
+        half = self.max_lines // 2
+        self._show(max(self._origin, match - half), min(self.lines, match + half))
+        row = match - self._first + 1
+        self.text.tag_add("found", f"{row}.0", f"{row}.end")
+        self.text.see(f"{row}.0")
+        return True
+
+    def _search(self, needle: str, before: int) -> Optional[int]:
+        """
+        Last line number < before whose text contains needle.
+        Reads backwards from before in SEARCH_CHUNK steps cut at line
+        offsets, so a recent match costs one read.
+        """
+        pattern = needle.encode(errors="replace")
+        offsets = self._offsets
+        end = min(before, self.lines) - self._origin
+        try:
+            while end > 0:
+                stop = offsets[end] if end < len(offsets) else self._size
+                start = bisect_left(offsets, stop - SEARCH_CHUNK, 0, end)
+                start = min(start, end - 1)  # one line longer than a chunk
+                self._spill.seek(offsets[start])
+                data = self._spill.read(stop - offsets[start])
+                pos = data.rfind(pattern)
+                if pos >= 0:
+                    line = bisect_right(offsets, offsets[start] + pos, start, end)
+                    return self._origin + line - 1
+                end = start
+            return None
+        finally:
+            self._spill.seek(0, os.SEEK_END)
+
+    def _show(self, start: int, end: int) -> None:
+        """
+        Replace the widget contents with lines [start, end) from disk.
+        """
+        self.following = False
+        self._delete("1.0", "end")
+        self._render("1.0", self._read_lines(start, end))
+        self._first, self._last = start, end
+
+    def follow(self) -> None:
+        """
+        Back to the live tail: the last max_lines lines, then new ones.
+        """
+        self._find = None
+        if self.following:
+            return
+        self.following = True
+        if self._spill:
+            self._show(max(self._origin, self.lines - self.max_lines), self.lines)
+            self.following = True
+        self.text.see("end")
+
+    def status(self) -> str:
+        if self.following:
+            return f"live, {self._last - self._first} of {self.lines} lines"
+        return f"lines {self._first + 1}-{self._last} of {self.lines}"
+
+    # ---------------- Controls ----------------
+
+    def toolbar(self, parent: tk.Misc, bg: str, fg: str, btn: str) -> tk.Frame:
+        """
+        "Load older" / find / "Live" controls for this view.
+        """
+        frame = tk.Frame(parent, bg=bg)
+        status = tk.Label(frame, bg=bg, fg=fg)
+        entry = tk.Entry(frame, width=20)
+
+        def run(action) -> None:
+            action()
+            status.config(text=self.status())
+
+        tk.Button(
+            frame, text="Load older", bg=btn, fg=fg, relief="flat",
+            command=lambda: run(self.load_older)
+        ).pack(side="left", padx=2)
+        entry.pack(side="left", padx=2)
+        tk.Button(
+            frame, text="Find", bg=btn, fg=fg, relief="flat",
+            command=lambda: run(lambda: self.find(entry.get()))
+        ).pack(side="left", padx=2)
+        tk.Button(
+            frame, text="Live", bg=btn, fg=fg, relief="flat",
+            command=lambda: run(self.follow)
+        ).pack(side="left", padx=2)
+        status.pack(side="left", padx=6)
+
+        if not self._spill:
+            for child in frame.winfo_children():
+                if isinstance(child, (tk.Button, tk.Entry)):
+                    child.config(state="disabled")
+        return frame
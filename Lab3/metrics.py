@@ -0,0 +1,286 @@
+"""
+Live server counters and the localhost admin endpoint that serves them.
+
+Hot-path updates are plain attribute increments on per-connection
+UserStats objects, each written by the one thread (or event loop) that
+services that connection, so no lock is taken per message. Globals
+are summed when a snapshot is taken. Only the rare events (broadcast
+fan-out from many senders, send errors) share a lock.
+
+AdminServer answers, on its own port:
+    GET /metrics       Prometheus text exposition format
+    GET /metrics.json  the same snapshot as JSON
+"""
+import json
+import time
+import socket
+import selectors
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Hashable, List, Optional
+
+
+# Seconds of history behind accept_rate
+ACCEPT_WINDOW: int = 10
+
+
+class UserStats:
+    """
+    Counters of one connection.
+    """
+
+    __slots__ = ("username", "msgs_in", "bytes_in", "msgs_out", "bytes_out")
+
+    def __init__(self, username: str) -> None:
+        self.username: str = username
+        self.msgs_in: int = 0
+        self.bytes_in: int = 0
+        self.msgs_out: int = 0
+        self.bytes_out: int = 0
+
+
+COUNTERS = ("msgs_in", "bytes_in", "msgs_out", "bytes_out")
+
+
+class Metrics:
+    """
+    Counters for one server process.
+    extra() may add server-specific gauges to every snapshot.
+    """
+
+    def __init__(self, extra: Optional[Callable[[], Dict[str, float]]] = None) -> None:
+        self.started: float = time.time()
+        self.extra = extra
+        self.connections_total: int = 0
+        self.accepts_total: int = 0
+        self.broadcasts: int = 0
+        self.fanout_total: int = 0
+        self.fanout_max: int = 0
+        self.send_errors: int = 0
+
+        self._users: Dict[Hashable, UserStats] = {}
+        # Totals of connections that have gone away
+        self._retired: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self._lock = threading.Lock()
+
+        # Per-second accept counts, a ring indexed by second % window
+        self._accept_counts: List[int] = [0] * ACCEPT_WINDOW
+        self._accept_secs: List[int] = [0] * ACCEPT_WINDOW
+
+    # ---------------- Updates ----------------
+
+    def accepted(self) -> None:
+        """
+        One accepted socket; called from the accept loop only.
+        """
+        self.accepts_total += 1
+        sec = int(time.monotonic())
+        i = sec % ACCEPT_WINDOW
+        if self._accept_secs[i] != sec:
+            self._accept_secs[i] = sec
+            self._accept_counts[i] = 0
+        self._accept_counts[i] += 1
+
+    def connect(self, key: Hashable, username: str) -> UserStats:
+        """
+        Start counting for a connection that finished its handshake.
+        """
+        stats = UserStats(username)
+        with self._lock:
+            self._users[key] = stats
+            self.connections_total += 1
+        return stats
+
+    def user(self, key: Hashable) -> Optional[UserStats]:
+        return self._users.get(key)
+
+    def disconnect(self, key: Hashable) -> None:
+        with self._lock:
+            stats = self._users.pop(key, None)
+            if stats:
+                for name in COUNTERS:
+                    self._retired[name] += getattr(stats, name)
+
+    def broadcast(self, recipients: int) -> None:
+        with self._lock:
+            self.broadcasts += 1
+            self.fanout_total += recipients
+            if recipients > self.fanout_max:
+                self.fanout_max = recipients
+
+    def send_error(self) -> None:
+        with self._lock:
+            self.send_errors += 1
+
+    # ---------------- Reading ----------------
+
+    def accept_rate(self) -> float:
+        now = int(time.monotonic())
+        recent = sum(
+            count for sec, count in zip(self._accept_secs, self._accept_counts)
+            if now - ACCEPT_WINDOW < sec <= now
+        )
+        return recent / ACCEPT_WINDOW
+
+    def snapshot(self) -> Dict:
+        """
+        Everything as plain numbers; per_user sums the current
+        connections of each username.
+        """
+        with self._lock:
+            users = list(self._users.values())
+            totals = dict(self._retired)
+
+        per_user: Dict[str, Dict[str, int]] = {}
+        for stats in users:
+            row = per_user.setdefault(stats.username, dict.fromkeys(COUNTERS, 0))
+            for name in COUNTERS:
+                value = getattr(stats, name)
+                row[name] += value
+                totals[name] += value
+
+        snapshot = {
+            "uptime_s": round(time.time() - self.started, 1),
+            "connections": len(users),
+            "connections_total": self.connections_total,
+            "accepts_total": self.accepts_total,
+            "accept_rate": self.accept_rate(),
+            **totals,
+            "broadcasts": self.broadcasts,
+            "fanout_total": self.fanout_total,
+            "fanout_max": self.fanout_max,
+            "send_errors": self.send_errors,
+        }
+        if self.extra:
+            snapshot.update(self.extra())
+        snapshot["per_user"] = per_user
+        return snapshot
+
+
+# ---------------- Exposition ----------------
+
+# name: (prometheus type, help)
+DESCRIPTIONS = {
+    "uptime_s": ("gauge", "Seconds since the server started"),
+    "connections": ("gauge", "Connected clients"),
+    "connections_total": ("counter", "Clients that completed the handshake"),
+    "accepts_total": ("counter", "Accepted TCP connections"),
+    "accept_rate": ("gauge", f"Accepts per second over the last {ACCEPT_WINDOW}s"),
+    "msgs_in": ("counter", "Messages received from clients"),
+    "bytes_in": ("counter", "Bytes received from clients"),
+    "msgs_out": ("counter", "Messages sent to clients"),
+    "bytes_out": ("counter", "Bytes sent to clients"),
+    "broadcasts": ("counter", "Broadcast messages routed"),
+    "fanout_total": ("counter", "Recipients over all broadcasts"),
+    "fanout_max": ("gauge", "Largest broadcast fan-out seen"),
+    "send_errors": ("counter", "Failed or refused sends to clients"),
+    "queue_dropped": ("counter", "Payloads dropped from full send queues"),
+    "queue_evicted": ("counter", "Slow consumers disconnected"),
+    "rejected": ("counter", "Connections turned away by admission control"),
+    "queued": ("counter", "Connections that waited for a free slot"),
+    "queue_expired": ("counter", "Queued connections rejected at their deadline"),
+    "waiting": ("gauge", "Connections waiting for a free slot"),
+    "handshaking": ("gauge", "Accepted connections still sending their username"),
+    "handshake_timeouts": ("counter", "Connections closed for a late username"),
+    "pool_backlog": ("gauge", "Readable connections waiting for a pool worker"),
+    "batch_max": ("gauge", "Most datagrams echoed in one wakeup"),
+}
+
+
+def prometheus_text(snapshot: Dict, prefix: str) -> str:
+    lines: List[str] = []
+    for name, value in snapshot.items():
+        if name == "per_user" or not isinstance(value, (int, float)):
+            continue
+        kind, text = DESCRIPTIONS.get(name, ("gauge", name.replace("_", " ")))
+        metric = f"{prefix}_{name}"
+        if kind == "counter" and not metric.endswith("_total"):
+            metric += "_total"
+        lines.append(f"# HELP {metric} {text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.append(f"{metric} {value}")
+
+    for name in COUNTERS:
+        metric = f"{prefix}_user_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for user, row in snapshot["per_user"].items():
+            label = user.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            lines.append(f'{metric}{{user="{label}"}} {row[name]}')
+    return "\n".join(lines) + "\n"
+
+
+class AdminServer:
+    """
+    Serves snapshot() over HTTP on host:port in a daemon thread.
+    Binds to localhost by default; it is not meant for clients.
+    The thread sleeps in select() until a request or stop() arrives;
+    serve_forever() would wake twice a second to check for shutdown.
+    """
+
+    def __init__(
+        self,
+        snapshot: Callable[[], Dict],
+        port: int,
+        host: str = "127.0.0.1",
+        prefix: str = "server"
+    ) -> None:
+        self.snapshot = snapshot
+        self.prefix: str = prefix
+        admin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path == "/metrics":
+                    body = prometheus_text(admin.snapshot(), admin.prefix)
+                    kind = "text/plain; version=0.0.4"
+                elif self.path in ("/metrics.json", "/stats"):
+                    body = json.dumps(admin.snapshot(), indent=2)
+                    kind = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        # A connection reset before accept() must not block the thread
+        self.httpd.socket.setblocking(False)
+        self.address = self.httpd.server_address
+        self.running: bool = False
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup = socket.socketpair()
+
+    def start(self) -> None:
+        self.running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.httpd, selectors.EVENT_READ)
+            selector.register(self._wakeup[0], selectors.EVENT_READ)
+            while self.running:
+                for key, _ in selector.select():
+                    if key.fileobj is self.httpd and self.running:
+                        self.httpd.handle_request()
+
+    def stop(self) -> None:
+        self.running = False
+        try:
+            self._wakeup[1].send(b"\0")
+        except OSError:
+            pass
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
+        for sock in self._wakeup:
+            sock.close()
@@ -0,0 +1,221 @@
+import os
+import time
+import socket
+import threading
+from collections import deque
+from typing import Deque, Iterable, List, Optional, Tuple, Union
+
+
+POLICIES: Tuple[str, ...] = ("drop_oldest", "skip", "disconnect")
+
+# One queued message: the buffers that make it up on the wire,
+# e.g. (payload,) for raw clients or (header, payload) for framed ones.
+# The same tuple is shared by every recipient of a broadcast.
+Payload = Tuple[bytes, ...]
+Buffer = Union[bytes, memoryview]
+
+USE_SENDMSG: bool = hasattr(socket.socket, "sendmsg")
+try:
+    IOV_MAX: int = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+# Below this many bytes, copying into one buffer is cheaper than
+# building an iovec per buffer (see bench_fanout.py)
+COALESCE_BYTES: int = 16384
+
+
+def flatten(batch: Iterable[Payload]) -> List[Buffer]:
+    return [buf for payload in batch for buf in payload]
+
+
+def send_buffers(sock: socket.socket, buffers: List[Buffer]) -> int:
+    """
+    One scatter/gather write of as many buffers as the kernel takes.
+    Returns the number of bytes sent, which may be partial.
+    Small batches, and platforms without sendmsg, use one joined send.
+    """
+    if len(buffers) == 1:
+        return sock.send(buffers[0])
+    if USE_SENDMSG and sum(map(len, buffers)) > COALESCE_BYTES:
+        return sock.sendmsg(buffers[:IOV_MAX])
+    return sock.send(b"".join(buffers))
+
+
+def advance(buffers: List[Buffer], sent: int) -> List[Buffer]:
+    """
+    Drop what was fully sent; the first partly sent buffer becomes a
+    memoryview slice of the original, so nothing is copied.
+    """
+    i = 0
+    while i < len(buffers) and len(buffers[i]) <= sent:
+        sent -= len(buffers[i])
+        i += 1
+    if sent:
+        buffers[i] = memoryview(buffers[i])[sent:]
+    return buffers[i:]
+
+
+def head(buffers: List[Buffer], nbytes: int) -> List[Buffer]:
+    """
+    The leading buffers holding at most nbytes; a buffer cut at the
+    limit becomes a memoryview slice, so nothing is copied.
+    """
+    out: List[Buffer] = []
+    for buf in buffers:
+        if nbytes <= 0:
+            break
+        if len(buf) > nbytes:
+            buf = memoryview(buf)[:nbytes]
+        out.append(buf)
+        nbytes -= len(buf)
+    return out
+
+
+def sendall_buffers(sock: socket.socket, buffers: List[Buffer]) -> None:
+    """
+    Blocking counterpart of send_buffers.
+    """
+    if len(buffers) == 1:
+        sock.sendall(buffers[0])
+        return
+    if not USE_SENDMSG or sum(map(len, buffers)) <= COALESCE_BYTES:
+        sock.sendall(b"".join(buffers))
+        return
+    while buffers:
+        buffers = advance(buffers, sock.sendmsg(buffers[:IOV_MAX]))
+
+
+class OutboundQueue:
+    """
+    Bounded FIFO of encoded payloads waiting to be written to one client.
+    Producers only enqueue; a writer (thread or event loop) drains it.
+
+    policy decides what happens when the queue is full:
+        - "drop_oldest": discard the oldest payload to make room
+        - "skip":        discard the new payload, keep the backlog
+        - "disconnect":  refuse the payload, put() returns False and the
+                         server disconnects the slow consumer
+
+    nbytes counts the queued bytes. Writers that track them also keep
+    inflight (taken from the queue but not yet accepted by the kernel)
+    and blocked_since (when the current write stopped making progress),
+    which is what the server's slow-consumer checks look at.
+
+    evict() replaces the backlog with one final payload; after that
+    the queue ignores new payloads and ends once the final one is taken.
+    finish() is the graceful version: the backlog is kept, new payloads
+    are ignored and the queue ends once the backlog is taken.
+    """
+
+    def __init__(self, maxlen: int = 1024, policy: str = "drop_oldest") -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy '{policy}', expected one of {POLICIES}")
+
+        self.maxlen: int = maxlen
+        self.policy: str = policy
+        self.dropped: int = 0
+        self.closed: bool = False
+        self.nbytes: int = 0
+        self.inflight: int = 0
+        self.blocked_since: Optional[float] = None
+        self.over_since: Optional[float] = None
+        self.evicted_at: Optional[float] = None
+        self.finishing: bool = False
+        self._items: Deque[Payload] = deque()
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, data: Payload) -> bool:
+        """
+        Enqueue one payload (shared, never copied).
+        Returns False if the consumer should be disconnected.
+        """
+        with self._cond:
+            if self.closed or self.finishing or self.evicted_at is not None:
+                return True
+
+            if len(self._items) >= self.maxlen:
+                self.dropped += 1
+                if self.policy == "disconnect":
+                    return False
+                if self.policy == "skip":
+                    return True
+                self.nbytes -= sum(map(len, self._items.popleft()))
+
+            self._items.append(data)
+            self.nbytes += sum(map(len, data))
+            self._cond.notify()
+            return True
+
+    def pop_all(self) -> List[Payload]:
+        """
+        Non-blocking: take everything queued right now.
+        """
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+            self.nbytes = 0
+            return items
+
+    def get_batch(self) -> Optional[List[Payload]]:
+        """
+        Blocking: wait until something is queued, then take all of it.
+        Returns None once the queue is closed.
+        """
+        with self._cond:
+            while not self._items and not self.closed:
+                if self.finishing or self.evicted_at is not None:
+                    return None
+                self._cond.wait()
+            if self.closed:
+                return None
+            items = list(self._items)
+            self._items.clear()
+            self.nbytes = 0
+            return items
+
+    def buffered(self) -> int:
+        """
+        Bytes accepted for this client but not yet written.
+        """
+        return self.nbytes + self.inflight
+
+    def time_over(self, now: float, high_water: int, low_water: int) -> float:
+        """
+        Seconds the buffered bytes have stayed above high_water; the
+        clock only resets once they drop to low_water or below.
+        """
+        buffered = self.buffered()
+        if buffered > high_water:
+            if self.over_since is None:
+                self.over_since = now
+        elif buffered <= low_water:
+            self.over_since = None
+        return 0.0 if self.over_since is None else now - self.over_since
+
+    def evict(self, final: Optional[Payload] = None) -> None:
+        with self._cond:
+            if self.closed or self.evicted_at is not None:
+                return
+            self.evicted_at = time.monotonic()
+            self._items.clear()
+            self.nbytes = 0
+            if final:
+                self._items.append(final)
+                self.nbytes = sum(map(len, final))
+            self._cond.notify_all()
+
+    def finish(self) -> None:
+        with self._cond:
+            self.finishing = True
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._items.clear()
+            self.nbytes = 0
+            self._cond.notify_all()
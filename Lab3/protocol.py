@@ -0,0 +1,281 @@
+import time
+import codecs
+import socket
+import struct
+from typing import List, Optional, Tuple
+
+
+# Framed clients open with MAGIC followed by a framed username.
+# The server answers with MAGIC to confirm, after which every message
+# in both directions is a 4-byte big-endian length + UTF-8 payload.
+# Anything else in the first read is a legacy (raw) client.
+MAGIC: bytes = b"\x00FRM"
+HEADER = struct.Struct("!I")
+
+RAW_RECV_SIZE: int = 1024
+FRAMED_RECV_SIZE: int = 65536
+MAX_FRAME: int = 1 << 20
+# A legacy username is one RAW_RECV_SIZE read; framed ones get the same cap
+MAX_USERNAME: int = RAW_RECV_SIZE
+
+
+class ProtocolError(ValueError):
+    """
+    Peer sent something that is not valid for the negotiated mode.
+    """
+
+
+def frame_bytes(payload: bytes) -> bytes:
+    return HEADER.pack(len(payload)) + payload
+
+
+def frame_parts(payload: bytes) -> Tuple[bytes, bytes]:
+    """
+    Header and payload as separate buffers, for scatter/gather sends
+    that share one payload object between many recipients.
+    """
+    return HEADER.pack(len(payload)), payload
+
+
+def encode(msg: str, framed: bool) -> bytes:
+    payload = msg.encode()
+    return frame_bytes(payload) if framed else payload
+
+
+class StreamDecoder:
+    """
+    Base class: owns a receive buffer that is reused for every recv_into.
+    Subclasses turn received bytes into complete messages.
+    """
+
+    framed: bool = False
+
+    def __init__(self, bufsize: int) -> None:
+        self.bufsize: int = bufsize
+        self.received: int = 0
+        self._recv_buf: bytearray = bytearray(bufsize)
+        self._recv_view: memoryview = memoryview(self._recv_buf)
+
+    def recv_from(self, sock: socket.socket) -> Optional[List[str]]:
+        """
+        One recv_into on sock.
+        Returns:
+            - list of complete messages (may be empty)
+            - None if the peer closed the connection
+        """
+        chunk = self.recv_chunk(sock)
+        if chunk is None:
+            return None
+        return self.feed(chunk)
+
+    def recv_chunk(self, sock: socket.socket) -> Optional[memoryview]:
+        """
+        One recv_into on sock, not decoded: the filled part of the
+        receive buffer (valid until the next read), or None on EOF.
+        """
+        n = sock.recv_into(self._recv_view)
+        if n == 0:
+            return None
+        self.received += n
+        return self._recv_view[:n]
+
+    def feed(self, data) -> List[str]:
+        raise NotImplementedError
+
+    def take_buffered(self) -> bytes:
+        """
+        Bytes fed but not yet returned as a message (a partial frame or
+        character); the decoder forgets them.
+        """
+        return b""
+
+
+class RawDecoder(StreamDecoder):
+    """
+    Legacy mode: one read is one message.
+    UTF-8 is decoded incrementally, so a multibyte character cut at
+    the read boundary is completed by the next read instead of failing.
+    """
+
+    def __init__(self, bufsize: int = RAW_RECV_SIZE) -> None:
+        super().__init__(bufsize)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    def feed(self, data) -> List[str]:
+        try:
+            msg = self._utf8.decode(data)
+        except UnicodeDecodeError as e:
+            raise ProtocolError(str(e))
+        return [msg] if msg else []
+
+    def take_buffered(self) -> bytes:
+        data = self._utf8.getstate()[0]
+        self._utf8.reset()
+        return data
+
+
+class FrameDecoder(StreamDecoder):
+    """
+    Framed mode: splits the byte stream on length headers, so any number
+    of messages per read and messages larger than one read both work.
+    """
+
+    framed = True
+
+    def __init__(
+        self,
+        bufsize: int = FRAMED_RECV_SIZE,
+        max_frame: int = MAX_FRAME
+    ) -> None:
+        super().__init__(bufsize)
+        self.max_frame: int = max_frame
+        self._pending: bytearray = bytearray()
+
+    def feed(self, data) -> List[str]:
+        self._pending += data
+        messages: List[str] = []
+        offset = 0
+        size = HEADER.size
+
+        while len(self._pending) - offset >= size:
+            (length,) = HEADER.unpack_from(self._pending, offset)
+            if length > self.max_frame:
+                raise ProtocolError(f"Frame of {length} bytes exceeds limit")
+
+            end = offset + size + length
+            if len(self._pending) < end:
+                break
+
+            try:
+                messages.append(self._pending[offset + size:end].decode())
+            except UnicodeDecodeError as e:
+                raise ProtocolError(str(e))
+            offset = end
+
+        # Compact once per feed, not once per frame
+        if offset:
+            del self._pending[:offset]
+        return messages
+
+    def take_buffered(self) -> bytes:
+        data = bytes(self._pending)
+        self._pending.clear()
+        return data
+
+
+class Handshake:
+    """
+    Incremental parser for the first bytes a client sends.
+    feed() returns True once the username is known; decoder is then
+    set for the negotiated mode and pending holds any messages that
+    arrived in the same reads as the username.
+    A framed username is held back until its whole frame is in, and a
+    frame header announcing more than MAX_USERNAME bytes raises
+    ProtocolError, so the handshake never waits on a huge username.
+    """
+
+    def __init__(self) -> None:
+        self.username: Optional[str] = None
+        self.decoder: Optional[StreamDecoder] = None
+        self.pending: List[str] = []
+        self._buffer: bytearray = bytearray()
+
+    @property
+    def framed(self) -> bool:
+        return bool(self.decoder and self.decoder.framed)
+
+    def feed(self, data: bytes) -> bool:
+        self._buffer += data
+        if len(self._buffer) < len(MAGIC) and MAGIC.startswith(self._buffer):
+            return False
+
+        if not self._buffer.startswith(MAGIC):
+            # Legacy client: the whole first read is the username
+            self.decoder = RawDecoder()
+            messages = self.decoder.feed(self._buffer)
+            self.username = messages[0] if messages else ""
+            return True
+
+        start = len(MAGIC) + HEADER.size
+        if len(self._buffer) < start:
+            return False
+        (length,) = HEADER.unpack_from(self._buffer, len(MAGIC))
+        if length > MAX_USERNAME:
+            raise ProtocolError(f"Username of {length} bytes exceeds limit")
+        if len(self._buffer) < start + length:
+            return False
+
+        self.decoder = FrameDecoder()
+        messages = self.decoder.feed(self._buffer[len(MAGIC):])
+        self._buffer.clear()
+        self.username = messages[0]
+        self.pending = messages[1:]
+        return True
+
+
+def read_handshake(
+    sock: socket.socket,
+    timeout: Optional[float] = None
+) -> Handshake:
+    """
+    Blocking server-side handshake.
+    timeout bounds the whole handshake, not each read: every recv only
+    gets the time that is left. The socket's timeout is restored after.
+    Raises ConnectionError if the peer closes before sending a username,
+    socket.timeout if it is not in within timeout seconds.
+    """
+    handshake = Handshake()
+    previous = sock.gettimeout()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        while True:
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise socket.timeout("Handshake timed out")
+                sock.settimeout(left)
+            data = sock.recv(RAW_RECV_SIZE)
+            if not data:
+                raise ConnectionError("Closed during handshake")
+            if handshake.feed(data):
+                break
+    finally:
+        sock.settimeout(previous)
+
+    if handshake.framed:
+        sock.sendall(MAGIC)
+    return handshake
+
+
+def client_handshake(
+    sock: socket.socket,
+    username: str,
+    timeout: Optional[float] = 5.0
+) -> Tuple[FrameDecoder, List[str]]:
+    """
+    Blocking client-side negotiation of framed mode.
+    Returns the decoder to use for the rest of the connection and any
+    messages the server sent right after its confirmation.
+    Raises ConnectionError if the server does not speak the framed protocol.
+    """
+    sock.sendall(MAGIC + encode(username, framed=True))
+
+    previous = sock.gettimeout()
+    sock.settimeout(timeout)
+    reply = b""
+    try:
+        while len(reply) < len(MAGIC):
+            data = sock.recv(RAW_RECV_SIZE)
+            if not data:
+                break
+            reply += data
+    except socket.timeout:
+        pass
+    finally:
+        sock.settimeout(previous)
+
+    if not reply.startswith(MAGIC):
+        raise ConnectionError("Server does not support the framed protocol")
+
+    decoder = FrameDecoder()
+    return decoder, decoder.feed(reply[len(MAGIC):])
@@ -0,0 +1,129 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+class ClientEntry:
+    """
+    One connected client.
+    conn is whatever the server writes to (socket or StreamWriter),
+    fd is the socket descriptor captured at join time.
+    """
+
+    __slots__ = ("username", "conn", "fd", "framed")
+
+    def __init__(self, username: str, conn: Any, fd: int, framed: bool) -> None:
+        self.username: str = username
+        self.conn: Any = conn
+        self.fd: int = fd
+        self.framed: bool = framed
+
+
+class ClientRegistry:
+    """
+    Thread-safe client table indexed by username and by connection.
+
+    Entries are keyed by the conn object itself (its id(), which stays
+    unique while the entry holds a reference), never by re-reading its
+    fd: remove() must still work after the socket is closed, which is
+    how asyncio hands a dead StreamWriter back. The fd is only read
+    once, in add(), and kept in the entry.
+
+    add/remove/lookup are O(1). snapshot() returns an immutable tuple
+    that is rebuilt only after the membership changed, so broadcasts
+    iterate without holding the lock and never see a list that is
+    being mutated by another thread.
+
+    Several clients may share a username; get() returns the one that
+    joined first, like the old linear scan did.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_conn: Dict[int, ClientEntry] = {}     # id(conn) -> entry
+        self._by_name: Dict[str, Dict[int, ClientEntry]] = {}
+        self._snapshot: Optional[Tuple[ClientEntry, ...]] = ()
+
+    def __len__(self) -> int:
+        return len(self._by_conn)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    @staticmethod
+    def fd_of(conn: Any) -> int:
+        if hasattr(conn, "fileno"):
+            return conn.fileno()
+        # asyncio.StreamWriter
+        return conn.get_extra_info("socket").fileno()
+
+    def add(
+        self,
+        username: str,
+        conn: Any,
+        framed: bool = False,
+        fd: Optional[int] = None
+    ) -> ClientEntry:
+        entry = ClientEntry(
+            username, conn, self.fd_of(conn) if fd is None else fd, framed
+        )
+        key = id(conn)
+        with self._lock:
+            self._by_conn[key] = entry
+            self._by_name.setdefault(username, {})[key] = entry
+            self._snapshot = None
+        return entry
+
+    def remove(self, conn: Any) -> Optional[ClientEntry]:
+        """
+        Remove conn if it is registered; returns its entry or None.
+        Works whether or not conn has been closed already.
+        """
+        key = id(conn)
+        with self._lock:
+            entry = self._by_conn.get(key)
+            if entry is None or entry.conn is not conn:
+                return None
+
+            del self._by_conn[key]
+            same_name = self._by_name[entry.username]
+            del same_name[key]
+            if not same_name:
+                del self._by_name[entry.username]
+            self._snapshot = None
+            return entry
+
+    def get(self, username: str) -> Optional[ClientEntry]:
+        same_name = self._by_name.get(username)
+        if not same_name:
+            return None
+        try:
+            return next(iter(same_name.values()))
+        except (StopIteration, RuntimeError):
+            # Raced with a concurrent remove; retry under the lock
+            with self._lock:
+                same_name = self._by_name.get(username)
+                return next(iter(same_name.values())) if same_name else None
+
+    def get_conn(self, conn: Any) -> Optional[ClientEntry]:
+        entry = self._by_conn.get(id(conn))
+        return entry if entry is not None and entry.conn is conn else None
+
+    def snapshot(self) -> Tuple[ClientEntry, ...]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = tuple(self._by_conn.values())
+                snapshot = self._snapshot
+        return snapshot
+
+    def clear(self) -> Tuple[ClientEntry, ...]:
+        """
+        Remove everyone; returns the entries that were registered.
+        """
+        with self._lock:
+            entries = tuple(self._by_conn.values())
+            self._by_conn.clear()
+            self._by_name.clear()
+            self._snapshot = ()
+        return entries
@@ -1,15 +1,21 @@
+from typing import Dict, Optional, Union
 from server_gui import ServerGUI
 
 
 if __name__ == "__main__":
-    mode: str = input("Choose mode (gui/cli): ").strip().lower()
+    mode: str = input("Choose mode (gui/cli/async/udp): ").strip().lower()
 
     if mode == "gui":
         gui: ServerGUI = ServerGUI()
         gui.start()
 
     else:
-        from server_logic import EchoServer
+        from server_logic import (
+            ECHO_MODES, OVERLOAD_POLICIES,
+            EchoServer, AsyncEchoServer, UDPEchoServer
+        )
+        from workers import EchoSupervisor
+        from eventlog import RotatingFileSink
 
         try:
             port: int = int(input("Enter server port to listen on: "))
@@ -17,7 +23,74 @@ if __name__ == "__main__":
             print("[server]: Invalid port number")
             raise SystemExit(1)
 
-        server: EchoServer = EchoServer(port=port)
+        workers: int = 1
+        if mode == "cli":
+            try:
+                workers = int(input("Worker processes [1]: ").strip() or "1")
+            except ValueError:
+                print("[server]: Invalid worker count")
+                raise SystemExit(1)
+
+        # Workers log to their own stdout; the file sink is single-process
+        log_file: str = ""
+        admin_port: Optional[int] = None
+        unix: Dict = {}
+        if workers == 1:
+            if mode != "udp":
+                path = input("Also listen on Unix socket path (blank for none): ")
+                if path.strip():
+                    unix["unix_path"] = path.strip()
+            log_file = input("Log file (blank for none): ").strip()
+            try:
+                admin = input("Metrics port (blank for none): ").strip()
+                admin_port = int(admin) if admin else None
+            except ValueError:
+                print("[server]: Invalid port number")
+                raise SystemExit(1)
+        log_sinks = [RotatingFileSink(log_file)] if log_file else []
+
+        # Admission control, worker pool and echo path (threaded server only)
+        limits: Dict = {}
+        if mode == "cli" and workers == 1:
+            try:
+                limit = input("Max connections (blank for unlimited): ").strip()
+                if limit:
+                    limits["max_connections"] = int(limit)
+                    limits["overload"] = input(
+                        "When full, reject or queue [reject]: "
+                    ).strip().lower() or "reject"
+                    if limits["overload"] not in OVERLOAD_POLICIES:
+                        print("[server]: Invalid overload policy")
+                        raise SystemExit(1)
+                pool = input("Worker pool size (blank for a thread per client): ")
+                if pool.strip():
+                    limits["pool_size"] = int(pool)
+                limits["echo_mode"] = input(
+                    "Echo mode, decode, raw or splice [decode]: "
+                ).strip().lower() or "decode"
+                if limits["echo_mode"] not in ECHO_MODES:
+                    print("[server]: Invalid echo mode")
+                    raise SystemExit(1)
+            except ValueError:
+                print("[server]: Invalid number")
+                raise SystemExit(1)
+
+        server: Union[EchoServer, AsyncEchoServer, UDPEchoServer, EchoSupervisor]
+        if mode == "async":
+            server = AsyncEchoServer(
+                port=port, log_sinks=log_sinks, admin_port=admin_port, **unix
+            )
+        elif mode == "udp":
+            server = UDPEchoServer(
+                port=port, log_sinks=log_sinks, admin_port=admin_port
+            )
+        elif workers > 1:
+            server = EchoSupervisor(port=port, workers=workers, verbose=True)
+        else:
+            server = EchoServer(
+                port=port, log_sinks=log_sinks, admin_port=admin_port,
+                **unix, **limits
+            )
 
         try:
             server.start()
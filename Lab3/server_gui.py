@@ -1,7 +1,19 @@
 import tkinter as tk
 import threading
-from typing import Optional
+from typing import Dict, Optional
 from server_logic import EchoServer
+from dashboard import Dashboard
+from logview import LogView, session_log_path
+
+
+# Dashboard charts: (title, metrics key, per-second rate). The echo
+# server answers inline and has no outbound queue to chart.
+DASHBOARD_SERIES = (
+    ("Users", "connections", False),
+    ("Msgs/s", "msgs_in", True),
+    ("Bytes in/s", "bytes_in", True),
+    ("Bytes out/s", "bytes_out", True),
+)
 
 
 class ServerGUI:
@@ -25,6 +37,7 @@ class ServerGUI:
         self.root: tk.Tk = tk.Tk()
         self.root.title("Echo Server")
         self.root.configure(bg=BG)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # ---- Port selection ----
         frame = tk.Frame(self.root, bg=PANEL)
@@ -56,6 +69,26 @@ class ServerGUI:
         )
         self.start_btn.grid(row=1, column=0, columnspan=2, pady=8)
 
+        # Per-message logging can be turned off; the dashboard stays live
+        self.log_messages = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            frame,
+            text="Log messages",
+            variable=self.log_messages,
+            command=self.set_message_logging,
+            bg=PANEL,
+            fg=FG,
+            selectcolor=ENTRY_BG,
+            activebackground=PANEL,
+            activeforeground=FG
+        ).grid(row=2, column=0, columnspan=2, pady=(0, 5))
+
+        # ---- Dashboard ----
+        self.dashboard = Dashboard(
+            self.root, self.sample_metrics, DASHBOARD_SERIES, PANEL, FG
+        )
+        self.dashboard.frame.pack(padx=10)
+
         # ---- Log window ----
         self.log = tk.Text(
             self.root,
@@ -67,27 +100,48 @@ class ServerGUI:
             relief="flat"
         )
         self.log.pack(padx=10, pady=5)
+        self.log_view = LogView(
+            self.root, self.log, spill_path=session_log_path("echo_server")
+        )
+        self.log_view.toolbar(self.root, BG, FG, BTN).pack(
+            fill="x", padx=10, pady=(0, 8)
+        )
 
     # ---------------- LOGGING ----------------
 
     def write_log(self, msg: str) -> None:
         """
         Thread-safe log writer.
-        Always executed on GUI thread.
+        Lines are queued and rendered in batches on the GUI thread.
         """
-        self.root.after(0, self._append_log, msg)
+        self.log_view.write(msg)
 
-    def _append_log(self, msg: str) -> None:
-        self.log.insert("end", msg + "\n")
-        self.log.see("end")
+    def set_message_logging(self) -> None:
+        if self.server:
+            every = self.message_sample()
+            self.server.log_sample = every
+            self.server.events.sample_every = every
+
+    def message_sample(self) -> int:
+        return 1 if self.log_messages.get() else 0
+
+    # ---------------- DASHBOARD ----------------
+
+    def sample_metrics(self) -> Optional[Dict]:
+        """
+        Called once a second on the GUI thread.
+        """
+        if not self.running or not self.server:
+            return None
+        return self.server.metrics.snapshot()
 
     # ---------------- SERVER CONTROL ----------------
 
-    def start_server(self, port: int) -> None:
+    def start_server(self, port: int, log_sample: int) -> None:
         """
         Runs in background thread.
         """
-        self.server = EchoServer(port=port)
+        self.server = EchoServer(port=port, log_sample=log_sample)
         self.server.start(log_callback=self.write_log)
 
     def toggle_server(self) -> None:
@@ -100,7 +154,7 @@ class ServerGUI:
 
             self.server_thread = threading.Thread(
                 target=self.start_server,
-                args=(port,),
+                args=(port, self.message_sample()),
                 daemon=True
             )
             self.server_thread.start()
@@ -117,5 +171,14 @@ class ServerGUI:
             self.running = False
             self.start_btn.config(text="Start")
 
+    def on_close(self) -> None:
+        """
+        Window closed: shut down and delete this session's spill file.
+        """
+        if self.running and self.server:
+            self.server.stop()
+        self.log_view.close(remove_spill=True)
+        self.root.destroy()
+
     def start(self) -> None:
         self.root.mainloop()
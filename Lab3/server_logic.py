@@ -1,91 +1,926 @@
+import os
+import time
+import queue
 import socket
+import asyncio
+import selectors
 import threading
-from typing import Callable, List, Tuple, Optional
+from collections import deque
+from typing import (
+    Callable, Deque, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+)
+from registry import ClientRegistry
+from metrics import AdminServer, Metrics, UserStats
+from eventlog import (
+    CONNECT, DISCONNECT, MESSAGE, REPLY, SERVER, CallbackSink, EventLog
+)
+from outbound import Buffer, advance, send_buffers
+from protocol import (
+    MAGIC, RAW_RECV_SIZE, ProtocolError, RawDecoder, StreamDecoder,
+    Handshake, encode
+)
+from transport import UNIX_PREFIX, listen_unix, remove_unix, set_nodelay
+
+try:
+    import fcntl
+except ImportError:  # Windows: no splice either
+    fcntl = None
+
+
+OVERLOAD_POLICIES: Tuple[str, ...] = ("reject", "queue")
+
+ECHO_MODES: Tuple[str, ...] = ("decode", "raw", "splice")
+
+# Pipe capacity asked for in splice mode, and so the most one splice
+# moves; Linux caps it at /proc/sys/fs/pipe-max-size (1 MiB by default)
+SPLICE_PIPE_SIZE: int = 1 << 20
+
+BUSY_MESSAGE: str = "Server busy, please try again later"
+
+# How long a rejected client gets to send its username (and so learn
+# whether it speaks the framed protocol) before it is just closed
+REJECT_TIMEOUT: float = 1.0
+
+
+class _Session:
+    """
+    One client of the worker pool.
+    pending holds messages that arrived with the username; decode is
+    set once a raw or splice echo_mode session has started, and pipe
+    is its splice pipe. out holds echoes the socket has not taken yet
+    and piped the bytes still waiting in the pipe; while either is
+    set the session waits for EVENT_WRITE instead of reading.
+    """
+
+    __slots__ = (
+        "sock", "username", "decoder", "stats", "pending", "decode", "pipe",
+        "out", "piped"
+    )
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        username: str,
+        decoder: StreamDecoder,
+        stats: UserStats,
+        pending: List[str]
+    ) -> None:
+        self.sock: socket.socket = sock
+        self.username: str = username
+        self.decoder: StreamDecoder = decoder
+        self.stats: UserStats = stats
+        self.pending: List[str] = pending
+        self.decode: Optional[bool] = None
+        self.pipe: Optional[Tuple[int, int]] = None
+        self.out: List[Buffer] = []
+        self.piped: int = 0
+
+    def owes(self) -> bool:
+        return bool(self.out or self.piped)
+
+
+class _Pending:
+    """
+    An accepted connection whose username has not arrived yet.
+    A rejected one gets BUSY_MESSAGE, in the protocol it asked for,
+    instead of being admitted.
+    """
+
+    __slots__ = ("sock", "addr", "handshake", "deadline", "rejected")
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        addr: Tuple,
+        deadline: float,
+        rejected: bool
+    ) -> None:
+        self.sock: socket.socket = sock
+        self.addr: Tuple = addr
+        self.handshake: Handshake = Handshake()
+        self.deadline: float = deadline
+        self.rejected: bool = rejected
 
 
 class EchoServer:
     """
     Echo server business logic.
     Handles networking only.
+
+    reuse_port sets SO_REUSEPORT so several processes can bind the same
+    port; listen_sock lets a parent hand over an already bound socket.
+    unix_path also listens on a Unix domain socket for same-host
+    clients ("unix:/path" addresses); they share the registry, counters
+    and admission limits with the TCP ones.
+
+    Nothing polls: the accept loop sleeps in select() on the listening
+    socket plus a wakeup socketpair that stop() writes to, and client
+    threads block in recv() until data arrives or stop() shuts their
+    socket down. The event log consumer and the admin endpoint also
+    sleep until there is work, so an idle server uses no CPU at all.
+    stop() joins the client threads, waiting at most stop_timeout
+    seconds in total.
+
+    The accept loop never blocks on a client: accepted sockets wait in
+    its selector until their username arrives, and are closed if that
+    takes longer than handshake_timeout seconds.
+
+    Admission control: backlog is the listen() queue length. With
+    max_connections set, connections past the limit are handled by
+    overload:
+        - "reject": the client gets BUSY_MESSAGE and is closed
+        - "queue":  up to backlog of them wait, unserved, for a free
+                    slot; after queue_timeout seconds they are rejected
+
+    pool_size replaces the thread per client with that many worker
+    threads: idle sockets wait in the accept loop's selector, and a
+    readable one is handed to a free worker, which reads and echoes
+    once and hands it back. Pool sockets are non-blocking, so a worker
+    never waits on one peer: echoes the socket does not take at once
+    wait for EVENT_WRITE in the selector, and the client is not read
+    again until they are written.
+
+    echo_mode "raw" skips the decode/encode round trip: every read
+    lands in the connection's preallocated buffer (recv_into) and that
+    slice is sent back unchanged. Messages are decoded only to log
+    them, if message logging is on when the connection starts;
+    otherwise msgs_in/msgs_out count reads rather than messages.
+    echo_mode "splice" (Linux) goes further: every connection gets a
+    pipe and os.splice() moves its data socket -> pipe -> socket inside
+    the kernel, so the bytes never reach Python and are never logged.
+    Where splice is unavailable it falls back to "raw", and so does a
+    connection that cannot get a pipe.
+
+    Log lines are queued as EventLog records and written by a
+    background thread to log_callback plus any extra log_sinks.
+    log_sample keeps one in N per-message records (0 for none);
+    connects and disconnects are always kept.
+
+    Live counters are kept in self.metrics (see metrics.py); with
+    admin_port set they are also served on 127.0.0.1:admin_port as
+    /metrics (Prometheus text) and /metrics.json.
     """
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 5000) -> None:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 5000,
+        reuse_port: bool = False,
+        listen_sock: Optional[socket.socket] = None,
+        unix_path: Optional[str] = None,
+        log_sinks: Sequence = (),
+        log_sample: int = 1,
+        admin_port: Optional[int] = None,
+        stop_timeout: float = 5.0,
+        handshake_timeout: float = 5.0,
+        backlog: int = 128,
+        max_connections: Optional[int] = None,
+        overload: str = "reject",
+        queue_timeout: float = 3.0,
+        pool_size: Optional[int] = None,
+        echo_mode: str = "decode"
+    ) -> None:
+        if overload not in OVERLOAD_POLICIES:
+            raise ValueError(
+                f"Unknown overload policy '{overload}', "
+                f"expected one of {OVERLOAD_POLICIES}"
+            )
+        if echo_mode not in ECHO_MODES:
+            raise ValueError(
+                f"Unknown echo mode '{echo_mode}', expected one of {ECHO_MODES}"
+            )
+
         self.host: str = host
         self.port: int = port
+        self.reuse_port: bool = reuse_port
+        self.listen_sock: Optional[socket.socket] = listen_sock
         self.server: Optional[socket.socket] = None
-        self.clients: List[Tuple[str, socket.socket]] = []
+        self.unix_path: Optional[str] = unix_path
+        self.unix_server: Optional[socket.socket] = None
+        self.clients: ClientRegistry = ClientRegistry()
         self.running: bool = False
+        self.echo_mode: str = echo_mode
+        self.splice_fallback: bool = False
+        if echo_mode == "splice" and not splice_supported():
+            self.echo_mode = "raw"
+            self.splice_fallback = True
+
+        # ---- shutdown ----
+        self.stop_timeout: float = stop_timeout
+        self.client_threads: Set[threading.Thread] = set()
+        self._threads_lock = threading.Lock()
+        self._wakeup: Optional[Tuple[socket.socket, socket.socket]] = None
+
+        # ---- handshakes ----
+        self.handshake_timeout: float = handshake_timeout
+        self.handshake_timeouts: int = 0
+        self._pending: Dict[socket.socket, _Pending] = {}
+        # Pending connections that will be admitted (not rejected ones)
+        self._handshakes: int = 0
+
+        # ---- admission control ----
+        self.backlog: int = backlog
+        self.max_connections: Optional[int] = max_connections
+        self.overload: str = overload
+        self.queue_timeout: float = queue_timeout
+        self.rejected_total: int = 0
+        self.queued_total: int = 0
+        self.expired_total: int = 0
+        # (socket, address, deadline), oldest first
+        self._waiting: Deque[Tuple[socket.socket, Tuple, float]] = deque()
+
+        # ---- worker pool ----
+        self.pool_size: Optional[int] = pool_size
+        self.workers: List[threading.Thread] = []
+        self._ready: "queue.Queue[Optional[_Session]]" = queue.Queue()
+        self._rearm: Deque[_Session] = deque()
+
+        # ---- logging ----
+        self.log_sinks: List = list(log_sinks)
+        self.log_sample: int = log_sample
+        self.events: EventLog = EventLog()
+
+        # ---- metrics ----
+        self.metrics: Metrics = Metrics(self._gauges)
+        self.admin_port: Optional[int] = admin_port
+        self.admin: Optional[AdminServer] = None
 
     def start(self, log_callback: Callable[[str], None] = print) -> None:
-        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server.bind((self.host, self.port))
-        self.server.listen(5)
-        self.server.settimeout(1.0)
+        self.events = EventLog(
+            [CallbackSink(log_callback), *self.log_sinks], self.log_sample
+        )
+        self.events.start()
+        try:
+            self._serve()
+        finally:
+            self.events.stop()
+
+    def _serve(self) -> None:
+        if self.listen_sock:
+            self.server = self.listen_sock
+        else:
+            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if self.reuse_port:
+                self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self.server.bind((self.host, self.port))
+            self.server.listen(self.backlog)
+        # Non-blocking: with a shared listen_sock another worker may
+        # take the connection between select() and accept()
+        self.server.setblocking(False)
+
+        self._wakeup = socket.socketpair()
+        selector = selectors.DefaultSelector()
+        selector.register(self.server, selectors.EVENT_READ, "accept")
+        selector.register(self._wakeup[0], selectors.EVENT_READ, "wakeup")
+        if self.unix_path:
+            self.unix_server = listen_unix(self.unix_path, self.backlog)
+            self.unix_server.setblocking(False)
+            selector.register(self.unix_server, selectors.EVENT_READ, "accept")
 
         self.running = True
-        log_callback(f"[SERVER]: Listening on {self.host}:{self.port}")
+        self.events.emit(SERVER, detail=f"Listening on {self.host}:{self.port}")
+        if self.unix_path:
+            self.events.emit(SERVER, detail=f"Listening on {UNIX_PREFIX}{self.unix_path}")
+        if self.splice_fallback:
+            self.events.emit(SERVER, detail="splice unavailable, echoing in raw mode")
+        self._start_admin()
 
+        self._ready = queue.Queue()
+        for _ in range(self.pool_size or 0):
+            worker = threading.Thread(target=self._pool_worker, daemon=True)
+            self.workers.append(worker)
+            worker.start()
+
+        try:
+            self._accept_loop(selector)
+        finally:
+            for conn, _, _ in self._waiting:
+                conn.close()
+            self._waiting.clear()
+            for state in list(self._pending.values()):
+                state.sock.close()
+            self._pending.clear()
+            self._handshakes = 0
+            # Idle pool sessions are closed by stop(); their pipes here
+            for key in selector.get_map().values():
+                if isinstance(key.data, _Session):
+                    self._close_pipe(key.data.pipe)
+            selector.close()
+            for sock in self._wakeup:
+                sock.close()
+            self._wakeup = None
+            if self.unix_server:
+                self.unix_server.close()
+                self.unix_server = None
+                remove_unix(self.unix_path)
+
+    def _accept_loop(self, selector: selectors.BaseSelector) -> None:
         while self.running:
-            try:
-                conn, addr = self.server.accept()
-            except socket.timeout:
-                continue
-            except OSError:
+            events = selector.select(self._select_timeout())
+            if not self.running:
                 break
+            for key, _ in events:
+                if key.data == "accept":
+                    if not self._accept_ready(selector, key.fileobj):
+                        return
+                elif key.data == "wakeup":
+                    try:
+                        self._wakeup[0].recv(1024)
+                    except OSError:
+                        pass
+                elif isinstance(key.data, _Pending):
+                    self._handshake_ready(selector, key.data)
+                else:
+                    # Worker pool: readable, hand it to a free worker
+                    selector.unregister(key.fileobj)
+                    self._ready.put(key.data)
+
+            self._rearm_sessions(selector)
+            self._admit_waiting(selector)
+            self._expire_pending(selector)
+
+    def _select_timeout(self) -> Optional[float]:
+        """
+        Sleep until the next handshake or queue deadline, or forever.
+        """
+        deadlines = [state.deadline for state in self._pending.values()]
+        if self._waiting:
+            deadlines.append(self._waiting[0][2])
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
 
+    def _accept_ready(
+        self,
+        selector: selectors.BaseSelector,
+        listener: socket.socket
+    ) -> bool:
+        """
+        Accept every pending connection on listener.
+        Returns False once the listening socket is gone.
+        """
+        while True:
             try:
-                username = conn.recv(1024).decode()
-                if not username:
-                    conn.close()
-                    continue
-            except Exception:
-                conn.close()
-                continue
+                conn, addr = listener.accept()
+            except BlockingIOError:
+                return True
+            except OSError:
+                return False
+            self.metrics.accepted()
+            set_nodelay(conn)
+            # Unix domain peers have no address of their own
+            addr = addr or f"{UNIX_PREFIX}{self.unix_path}"
+
+            if not self._full():
+                self._admit(selector, conn, addr)
+            elif self.overload == "queue" and len(self._waiting) < self.backlog:
+                self.queued_total += 1
+                self._waiting.append(
+                    (conn, addr, time.monotonic() + self.queue_timeout)
+                )
+            else:
+                self._reject(selector, conn, addr)
+
+    def _full(self) -> bool:
+        return (self.max_connections is not None
+                and len(self.clients) + self._handshakes >= self.max_connections)
+
+    def _admit(
+        self,
+        selector: selectors.BaseSelector,
+        conn: socket.socket,
+        addr: Tuple
+    ) -> None:
+        """
+        Start the handshake; the client joins once its username is in.
+        """
+        self._handshakes += 1
+        self._begin(selector, conn, addr, self.handshake_timeout, False)
+
+    def _reject(
+        self,
+        selector: selectors.BaseSelector,
+        conn: socket.socket,
+        addr: Tuple
+    ) -> None:
+        """
+        Turn a connection away without blocking the accept loop.
+        """
+        self.rejected_total += 1
+        self._begin(selector, conn, addr, REJECT_TIMEOUT, True)
+
+    def _begin(
+        self,
+        selector: selectors.BaseSelector,
+        conn: socket.socket,
+        addr: Tuple,
+        timeout: float,
+        rejected: bool
+    ) -> None:
+        conn.setblocking(False)
+        state = _Pending(conn, addr, time.monotonic() + timeout, rejected)
+        self._pending[conn] = state
+        selector.register(conn, selectors.EVENT_READ, state)
+
+    def _add_client(
+        self,
+        selector: selectors.BaseSelector,
+        conn: socket.socket,
+        addr: Tuple,
+        handshake: Handshake
+    ) -> None:
+        username = handshake.username
+        self.clients.add(username, conn, handshake.framed)
+        stats = self.metrics.connect(conn, username)
+        self.events.emit(CONNECT, username, detail=str(addr))
+
+        if self.pool_size:
+            conn.setblocking(False)
+            session = _Session(
+                conn, username, handshake.decoder or RawDecoder(),
+                stats, list(handshake.pending)
+            )
+            # A raw session starts on a worker, see _service_raw
+            if session.pending or self.echo_mode == "raw":
+                self._ready.put(session)
+            else:
+                selector.register(conn, selectors.EVENT_READ, session)
+            return
+
+        thread = threading.Thread(
+            target=self.handle_client,
+            args=(
+                username, conn,
+                handshake.decoder, handshake.pending
+            ),
+            daemon=True
+        )
+        with self._threads_lock:
+            self.client_threads.add(thread)
+        thread.start()
+
+    def _admit_waiting(self, selector: selectors.BaseSelector) -> None:
+        """
+        Admit queued connections while there is room; reject the ones
+        whose deadline has passed.
+        """
+        now = time.monotonic()
+        while self._waiting and (not self._full() or self._waiting[0][2] <= now):
+            conn, addr, deadline = self._waiting.popleft()
+            if deadline <= now:
+                self.expired_total += 1
+                self._reject(selector, conn, addr)
+            else:
+                self._admit(selector, conn, addr)
+
+    # ---------------- Handshakes ----------------
+
+    def _handshake_ready(
+        self,
+        selector: selectors.BaseSelector,
+        state: _Pending
+    ) -> None:
+        handshake = state.handshake
+        try:
+            data = state.sock.recv(RAW_RECV_SIZE)
+            done = bool(data) and handshake.feed(data)
+        except BlockingIOError:
+            return
+        except (OSError, ValueError):
+            data, done = b"", False
+
+        if data and not done:
+            return
+        self._drop_pending(selector, state)
+        conn = state.sock
+
+        if not done or not handshake.username:
+            conn.close()
+            return
+
+        # Small enough for an empty socket buffer: never blocks
+        reply = MAGIC if handshake.framed else b""
+        if state.rejected:
+            reply += encode(BUSY_MESSAGE, handshake.framed)
+        try:
+            if reply:
+                conn.send(reply)
+        except OSError:
+            conn.close()
+            return
+
+        if state.rejected:
+            conn.close()
+            return
+        conn.setblocking(True)
+        self._add_client(selector, conn, state.addr, handshake)
+
+    def _expire_pending(self, selector: selectors.BaseSelector) -> None:
+        now = time.monotonic()
+        for state in list(self._pending.values()):
+            if state.deadline <= now:
+                if not state.rejected:
+                    self.handshake_timeouts += 1
+                self._drop_pending(selector, state)
+                state.sock.close()
+
+    def _drop_pending(
+        self,
+        selector: selectors.BaseSelector,
+        state: _Pending
+    ) -> None:
+        self._pending.pop(state.sock, None)
+        if not state.rejected:
+            self._handshakes -= 1
+        try:
+            selector.unregister(state.sock)
+        except (KeyError, ValueError):
+            pass
 
-            self.clients.append((username, conn))
-            log_callback(f"[SERVER]: Connected to {username} at {addr}")
+    # ---------------- Worker pool ----------------
 
-            threading.Thread(
-                target=self.handle_client,
-                args=(username, conn, log_callback),
-                daemon=True
-            ).start()
+    def _pool_worker(self) -> None:
+        while True:
+            session = self._ready.get()
+            if session is None:
+                return
+            if self._service(session):
+                self._rearm.append(session)
+                self._wake()
+            else:
+                self._close_pipe(session.pipe)
+                self._finish(session.username, session.sock)
+
+    def _service(self, session: _Session) -> bool:
+        """
+        One read and its echoes, or the rest of the last echoes if the
+        socket was waiting for EVENT_WRITE. Nothing here blocks.
+        Returns False once the client is gone.
+        """
+        try:
+            if session.owes():
+                return self._flush(session) and self.running
+            if self.echo_mode != "decode":
+                return self._service_raw(session)
+
+            messages = session.pending
+            if messages:
+                session.pending = []
+            else:
+                messages = session.decoder.recv_from(session.sock)
+                session.stats.bytes_in = session.decoder.received
+                if messages is None:
+                    return False
+            self._echo(
+                session.username, session.sock,
+                session.decoder.framed, session.stats, messages, session.out
+            )
+            return self._flush(session) and self.running
+        except BlockingIOError:
+            return self.running  # woken, but nothing to read after all
+        except (OSError, ProtocolError):
+            return False
+
+    def _service_raw(self, session: _Session) -> bool:
+        if session.decode is None:
+            # Queued straight from the handshake: nothing read yet
+            session.decode = self._start_raw(
+                session.username, session.sock, session.decoder,
+                session.stats, session.pending, session.out
+            )
+            session.pending = []
+            if self.echo_mode == "splice":
+                session.pipe = self._open_pipe()
+        elif session.pipe:
+            piped = self._echo_splice(session.sock, session.pipe, session.stats)
+            if piped is None:
+                return False
+            session.piped = piped
+        elif not self._echo_raw(
+            session.username, session.sock, session.decoder,
+            session.stats, session.decode, session.out
+        ):
+            return False
+        return self._flush(session) and self.running
+
+    def _flush(self, session: _Session) -> bool:
+        """
+        Write as much of what the session owes as the socket takes now.
+        Returns False if the connection failed.
+        """
+        try:
+            while session.out:
+                sent = send_buffers(session.sock, session.out)
+                session.out = advance(session.out, sent)
+            if session.piped:
+                session.piped = self._splice_out(
+                    session.sock, session.pipe, session.piped
+                )
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.metrics.send_error()
+            return False
+        return True
+
+    def _rearm_sessions(self, selector: selectors.BaseSelector) -> None:
+        """
+        Watch the sockets the workers are done with again: for reading,
+        or for writing if their last echoes did not fit.
+        """
+        while self._rearm:
+            session = self._rearm.popleft()
+            events = selectors.EVENT_WRITE if session.owes() else selectors.EVENT_READ
+            try:
+                selector.register(session.sock, events, session)
+            except (KeyError, ValueError, OSError):
+                self._finish(session.username, session.sock)
+
+    def _wake(self) -> None:
+        wakeup = self._wakeup
+        if wakeup:
+            try:
+                wakeup[1].send(b"\0")
+            except OSError:
+                pass
 
     def handle_client(
         self,
         username: str,
         conn: socket.socket,
-        log_callback: Callable[[str], None]
+        decoder: Optional[StreamDecoder] = None,
+        pending: Iterable[str] = ()
     ) -> None:
-        conn.settimeout(1.0)
+        """
+        decoder is the one negotiated in the handshake (raw if omitted),
+        pending holds messages that arrived together with the username.
+        """
+        decoder = decoder or RawDecoder()
+        stats = self.metrics.user(conn) or UserStats(username)
+        pipe: Optional[Tuple[int, int]] = None
 
-        while self.running:
+        messages = list(pending)
+        try:
+            if self.echo_mode != "decode":
+                decode = self._start_raw(username, conn, decoder, stats, messages)
+                if self.echo_mode == "splice":
+                    pipe = self._open_pipe()
+                while self.running and self._relay(
+                    username, conn, decoder, stats, decode, pipe
+                ):
+                    pass
+            else:
+                while self.running:
+                    self._echo(username, conn, decoder.framed, stats, messages)
+
+                    messages = decoder.recv_from(conn)
+                    stats.bytes_in = decoder.received
+                    if messages is None:
+                        break
+
+        except (ConnectionResetError, OSError, ProtocolError):
+            pass
+
+        self._close_pipe(pipe)
+        self._finish(username, conn)
+
+        with self._threads_lock:
+            self.client_threads.discard(threading.current_thread())
+
+    def _echo(
+        self,
+        username: str,
+        conn: socket.socket,
+        framed: bool,
+        stats: UserStats,
+        messages: List[str],
+        out: Optional[List[Buffer]] = None
+    ) -> None:
+        """
+        With out given the echoes are appended to it instead of sent.
+        """
+        stats.msgs_in += len(messages)
+        for msg in messages:
+            # NORMAL CHAT MESSAGE
+            self.events.emit(MESSAGE, username, len(msg), msg)
+            data = encode(msg, framed)
+            if out is not None:
+                out.append(data)
+            else:
+                try:
+                    conn.sendall(data)
+                except OSError:
+                    self.metrics.send_error()
+                    raise
+            stats.msgs_out += 1
+            stats.bytes_out += len(data)
+            self.events.emit(REPLY, username, len(data), msg)
+
+    def _start_raw(
+        self,
+        username: str,
+        conn: socket.socket,
+        decoder: StreamDecoder,
+        stats: UserStats,
+        pending: List[str],
+        out: Optional[List[Buffer]] = None
+    ) -> bool:
+        """
+        Echo what arrived with the username and pick whether this
+        connection's reads are decoded for the log.
+        """
+        self._echo(username, conn, decoder.framed, stats, pending, out)
+        decode = self.events.sample_every != 0
+
+        # From here on the stream is relayed as bytes, starting with
+        # any partial message the handshake read
+        leftover = decoder.take_buffered()
+        if leftover:
+            if out is not None:
+                out.append(leftover)
+            else:
+                conn.sendall(leftover)
+            stats.bytes_out += len(leftover)
+            if decode:
+                decoder.feed(leftover)
+        return decode
+
+    def _relay(
+        self,
+        username: str,
+        conn: socket.socket,
+        decoder: StreamDecoder,
+        stats: UserStats,
+        decode: bool,
+        pipe: Optional[Tuple[int, int]]
+    ) -> bool:
+        if pipe:
+            return self._echo_splice(conn, pipe, stats) is not None
+        return self._echo_raw(username, conn, decoder, stats, decode)
+
+    def _echo_raw(
+        self,
+        username: str,
+        conn: socket.socket,
+        decoder: StreamDecoder,
+        stats: UserStats,
+        decode: bool,
+        out: Optional[List[Buffer]] = None
+    ) -> bool:
+        """
+        One recv_into the connection's buffer, sent back as is (or
+        appended to out; the buffer is only reused once out is empty).
+        Returns False once the client has closed.
+        """
+        chunk = decoder.recv_chunk(conn)
+        if chunk is None:
+            return False
+        stats.bytes_in = decoder.received
+
+        messages = decoder.feed(chunk) if decode else None
+        count = len(messages) if messages is not None else 1
+        stats.msgs_in += count
+        if messages:
+            for msg in messages:
+                self.events.emit(MESSAGE, username, len(msg), msg)
+        if out is not None:
+            out.append(chunk)
+        else:
             try:
-                data = conn.recv(1024)
-                if not data:
-                    break
+                conn.sendall(chunk)
+            except OSError:
+                self.metrics.send_error()
+                raise
+        stats.msgs_out += count
+        stats.bytes_out += len(chunk)
+        if messages:
+            for msg in messages:
+                self.events.emit(REPLY, username, len(msg), msg)
+        return True
+
+    # ---------------- Splice ----------------
 
-                msg = data.decode()
+    def _open_pipe(self) -> Optional[Tuple[int, int]]:
+        """
+        A splice pipe as large as the system allows, or None (the
+        connection is then echoed in raw mode).
+        """
+        try:
+            pipe = os.pipe()
+        except OSError:
+            return None
+        try:
+            fcntl.fcntl(pipe[1], fcntl.F_SETPIPE_SZ, SPLICE_PIPE_SIZE)
+        except (OSError, AttributeError):
+            pass  # the default 64 KiB pipe works, in smaller steps
+        return pipe
 
-                # NORMAL CHAT MESSAGE
-                log_callback(f"[{username}]: {msg}")
-                conn.sendall(msg.encode())
-                log_callback(f"[SERVER → {username}]: {msg}")
+    def _close_pipe(self, pipe: Optional[Tuple[int, int]]) -> None:
+        for fd in pipe or ():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
 
-            except socket.timeout:
-                continue
-            except (ConnectionResetError, OSError):
-                break
+    def _echo_splice(
+        self,
+        conn: socket.socket,
+        pipe: Tuple[int, int],
+        stats: UserStats
+    ) -> Optional[int]:
+        """
+        Whatever one read gets, moved into the pipe and back out to the
+        socket without leaving the kernel.
+        Returns None once the client has closed, else the bytes a
+        non-blocking socket left in the pipe (always 0 when blocking).
+        """
+        n = os.splice(
+            conn.fileno(), pipe[1], SPLICE_PIPE_SIZE, flags=os.SPLICE_F_MOVE
+        )
+        if n == 0:
+            return None
+        stats.msgs_in += 1
+        stats.bytes_in += n
+
+        try:
+            left = self._splice_out(conn, pipe, n)
+        except OSError:
+            self.metrics.send_error()
+            raise
+        stats.msgs_out += 1
+        stats.bytes_out += n
+        return left
+
+    def _splice_out(
+        self,
+        conn: socket.socket,
+        pipe: Tuple[int, int],
+        left: int
+    ) -> int:
+        """
+        Move left bytes from the pipe to the socket.
+        Returns what a non-blocking socket did not take.
+        """
+        fd = conn.fileno()
+        try:
+            while left:
+                left -= os.splice(pipe[0], fd, left, flags=os.SPLICE_F_MOVE)
+        except BlockingIOError:
+            pass
+        return left
 
+    def _finish(self, username: str, conn: socket.socket) -> None:
         # CLEAN DISCONNECT (not a message)
-        log_callback(f"[SERVER] : {username} disconnected")
+        self.events.emit(DISCONNECT, username)
 
+        self.metrics.disconnect(conn)
+        self.clients.remove(conn)
         try:
             conn.close()
         except Exception:
             pass
 
-        self.clients = [(u, c) for u, c in self.clients if c != conn]
+        # A slot is free: let the accept loop admit a queued client
+        if self._waiting:
+            self._wake()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Snapshot of the server counters.
+        """
+        snapshot = self.metrics.snapshot()
+        return {
+            "connections": len(self.clients),
+            "connections_total": snapshot["connections_total"],
+            "bytes_in": snapshot["bytes_in"],
+            "bytes_out": snapshot["bytes_out"],
+        }
+
+    def _gauges(self) -> Dict[str, int]:
+        """
+        Admission and pool values added to every metrics snapshot.
+        """
+        return {
+            "rejected": self.rejected_total,
+            "queued": self.queued_total,
+            "queue_expired": self.expired_total,
+            "waiting": len(self._waiting),
+            "handshaking": len(self._pending),
+            "handshake_timeouts": self.handshake_timeouts,
+            "pool_backlog": self._ready.qsize(),
+        }
+
+    def _start_admin(self) -> None:
+        if self.admin_port is None:
+            return
+        self.admin = AdminServer(
+            self.metrics.snapshot, self.admin_port, prefix="echo"
+        )
+        self.admin.start()
+        self.events.emit(
+            SERVER,
+            detail=f"Metrics on http://127.0.0.1:{self.admin.address[1]}/metrics"
+        )
 
     def stop(self) -> None:
         """
@@ -94,18 +929,28 @@ class EchoServer:
         """
         self.running = False
 
-        # --- Close listening socket first ---
+        # --- Wake the accept loop, then close the listening sockets ---
+        self._wake()
         if self.server:
             try:
                 self.server.close()
             except Exception:
                 pass
             self.server = None
+        if self.unix_server:
+            try:
+                self.unix_server.close()
+            except Exception:
+                pass
 
         # --- Notify clients and close connections ---
-        for username, conn in self.clients:
+        entries = self.clients.clear()
+        for entry in entries:
+            conn = entry.conn
             try:
-                conn.sendall("__SERVER_SHUTDOWN__".encode())  # optional: informs client
+                conn.sendall(encode(  # optional: informs client
+                    "__SERVER_SHUTDOWN__", entry.framed
+                ))
             except Exception:
                 pass
             try:
@@ -118,11 +963,409 @@ class EchoServer:
                 pass
 
         # --- Wait for client threads to finish ---
-        for t in getattr(self, "client_threads", []):
-            t.join()
+        # shutdown() above wakes their recv(); the deadline only guards
+        # against a thread stuck in sendall() to a peer that never reads
+        for _ in self.workers:
+            self._ready.put(None)
+        with self._threads_lock:
+            threads = list(self.client_threads) + self.workers
+        deadline = time.monotonic() + self.stop_timeout
+        for t in threads:
+            if t is not threading.current_thread():
+                t.join(max(0.0, deadline - time.monotonic()))
 
-        # --- Clear client list and thread list ---
-        self.clients.clear()
-        if hasattr(self, "client_threads"):
+        # --- Clear thread list ---
+        with self._threads_lock:
             self.client_threads.clear()
+        self.workers = []
+
+        if self.admin:
+            self.admin.stop()
+            self.admin = None
+
+
+def splice_supported() -> bool:
+    """
+    True if os.splice can move socket data here (Linux, Python 3.10+).
+    """
+    if not hasattr(os, "splice"):
+        return False
+    try:
+        a, b = socket.socketpair()
+        r, w = os.pipe()
+    except OSError:
+        return False
+    try:
+        a.sendall(b"x")
+        return os.splice(b.fileno(), w, 1) == 1
+    except OSError:
+        return False
+    finally:
+        a.close()
+        b.close()
+        os.close(r)
+        os.close(w)
+
+
+class AsyncEchoServer:
+    """
+    asyncio echo server.
+    Same protocol as EchoServer (username first, then echo,
+    __SERVER_SHUTDOWN__ on stop) but every session is a coroutine,
+    so one process can hold tens of thousands of connections.
+    Counters, admin_port, handshake_timeout and unix_path work as in
+    EchoServer.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 5000,
+        unix_path: Optional[str] = None,
+        log_sinks: Sequence = (),
+        log_sample: int = 1,
+        admin_port: Optional[int] = None,
+        handshake_timeout: float = 5.0
+    ) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.log_sinks: List = list(log_sinks)
+        self.log_sample: int = log_sample
+        self.events: EventLog = EventLog()
+        self.handshake_timeout: float = handshake_timeout
+        self.handshake_timeouts: int = 0
+        self.metrics: Metrics = Metrics(
+            lambda: {"handshake_timeouts": self.handshake_timeouts}
+        )
+        self.admin_port: Optional[int] = admin_port
+        self.admin: Optional[AdminServer] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.unix_path: Optional[str] = unix_path
+        self.unix_server: Optional[asyncio.AbstractServer] = None
+        self.clients: ClientRegistry = ClientRegistry()
+        # Connections whose username has not arrived yet
+        self._handshaking: Set[asyncio.StreamWriter] = set()
+        self.running: bool = False
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+
+    def start(self, log_callback: Callable[[str], None] = print) -> None:
+        """
+        Blocking entry point, mirrors EchoServer.start.
+        Runs its own event loop until stop() is called.
+        """
+        asyncio.run(self.serve(log_callback))
+
+    async def serve(self, log_callback: Callable[[str], None] = print) -> None:
+        """
+        Coroutine entry point for callers that already run a loop.
+        """
+        self.loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self.events = EventLog(
+            [CallbackSink(log_callback), *self.log_sinks], self.log_sample
+        )
+        self.events.start()
+
+        try:
+            self.server = await asyncio.start_server(
+                self.handle_client, self.host, self.port
+            )
+            if self.unix_path:
+                remove_unix(self.unix_path)
+                self.unix_server = await asyncio.start_unix_server(
+                    self.handle_client, self.unix_path
+                )
+
+            self.running = True
+            self.events.emit(
+                SERVER, detail=f"Listening on {self.host}:{self.port}"
+            )
+            if self.unix_path:
+                self.events.emit(
+                    SERVER, detail=f"Listening on {UNIX_PREFIX}{self.unix_path}"
+                )
+            if self.admin_port is not None:
+                self.admin = AdminServer(
+                    self.metrics.snapshot, self.admin_port, prefix="echo"
+                )
+                self.admin.start()
+
+            try:
+                await self._stop_event.wait()
+            finally:
+                await self._shutdown()
+        finally:
+            self.events.stop()
+
+    async def handle_client(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        addr = writer.get_extra_info("peername") or f"{UNIX_PREFIX}{self.unix_path}"
+        self.metrics.accepted()
+
+        handshake = Handshake()
+        self._handshaking.add(writer)
+        try:
+            await asyncio.wait_for(
+                self._read_handshake(reader, handshake), self.handshake_timeout
+            )
+        except asyncio.TimeoutError:
+            self.handshake_timeouts += 1
+        except (OSError, ProtocolError):
+            pass
+        finally:
+            self._handshaking.discard(writer)
+
+        username = handshake.username
+        if not username or not self.running:
+            writer.close()
+            return
+
+        framed = handshake.framed
+        if framed:
+            writer.write(MAGIC)
+        decoder = handshake.decoder
+
+        self.clients.add(username, writer, framed)
+        stats = self.metrics.connect(writer, username)
+        self.events.emit(CONNECT, username, detail=str(addr))
+
+        messages = handshake.pending
+        while self.running:
+            try:
+                stats.msgs_in += len(messages)
+                for msg in messages:
+                    self.events.emit(MESSAGE, username, len(msg), msg)
+                    data = encode(msg, framed)
+                    writer.write(data)
+                    stats.msgs_out += 1
+                    stats.bytes_out += len(data)
+                    self.events.emit(REPLY, username, len(data), msg)
+                await writer.drain()
+
+                data = await reader.read(decoder.bufsize)
+                if not data:
+                    break
+                stats.bytes_in += len(data)
+                messages = decoder.feed(data)
+
+            except (ConnectionResetError, OSError, ProtocolError):
+                break
+
+        self.events.emit(DISCONNECT, username)
+
+        self.metrics.disconnect(writer)
+        self.clients.remove(writer)
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+    def stop(self) -> None:
+        """
+        Thread-safe: may be called from the GUI or any other thread.
+        """
+        self.running = False
+        if self.loop and self._stop_event:
+            try:
+                self.loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                # loop already closed
+                pass
+
+    async def _read_handshake(
+        self,
+        reader: asyncio.StreamReader,
+        handshake: Handshake
+    ) -> None:
+        while True:
+            data = await reader.read(1024)
+            if not data or handshake.feed(data):
+                return
+
+    async def _shutdown(self) -> None:
+        self.running = False
+
+        # --- Stop accepting; wait_closed() comes after the clients ---
+        servers = [srv for srv in (self.server, self.unix_server) if srv]
+        for srv in servers:
+            srv.close()
+
+        if self.admin:
+            self.admin.stop()
+            self.admin = None
+
+        # --- Notify clients and close connections ---
+        entries = self.clients.clear()
+        for entry in entries:
+            try:
+                entry.conn.write(encode("__SERVER_SHUTDOWN__", entry.framed))
+                entry.conn.close()
+            except Exception:
+                pass
+        # Their handshake read sees EOF and the handler returns
+        for writer in list(self._handshaking):
+            writer.close()
+
+        for entry in entries:
+            try:
+                await entry.conn.wait_closed()
+            except Exception:
+                pass
+
+        # From Python 3.12.1 this waits for every connection to close
+        for srv in servers:
+            await srv.wait_closed()
+        self.server = None
+        if self.unix_server:
+            self.unix_server = None
+            remove_unix(self.unix_path)
+
+
+class UDPEchoServer:
+    """
+    UDP echo server for latency probing.
+    Every datagram is sent straight back to its sender: no handshake,
+    no framing, no connection state, so there is no setup cost and no
+    head-of-line blocking; datagrams may be lost or reordered.
+
+    One thread sleeps in select() on the socket and a wakeup
+    socketpair. Each wakeup drains every datagram already queued (at
+    most drain_limit, then it selects again) with recvfrom_into into
+    one reused buffer, sending each back from the same buffer. A reply
+    the socket cannot take is dropped and counted as a send error.
+
+    Datagrams are decoded only for logging; the log names the sender
+    by address. Counters work as in EchoServer, with all traffic on a
+    single "udp" entry.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 5000,
+        log_sinks: Sequence = (),
+        log_sample: int = 1,
+        admin_port: Optional[int] = None,
+        bufsize: int = 65535,
+        drain_limit: int = 1024
+    ) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.sock: Optional[socket.socket] = None
+        self.running: bool = False
+        self.bufsize: int = bufsize
+        self.drain_limit: int = drain_limit
+        self.batch_max: int = 0
+        self._wakeup: Optional[Tuple[socket.socket, socket.socket]] = None
+
+        self.log_sinks: List = list(log_sinks)
+        self.log_sample: int = log_sample
+        self.events: EventLog = EventLog()
+
+        self.metrics: Metrics = Metrics(lambda: {"batch_max": self.batch_max})
+        self.admin_port: Optional[int] = admin_port
+        self.admin: Optional[AdminServer] = None
+
+    def start(self, log_callback: Callable[[str], None] = print) -> None:
+        self.events = EventLog(
+            [CallbackSink(log_callback), *self.log_sinks], self.log_sample
+        )
+        self.events.start()
+        try:
+            self._serve()
+        finally:
+            self.events.stop()
+
+    def _serve(self) -> None:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((self.host, self.port))
+        self.sock.setblocking(False)
+
+        self._wakeup = socket.socketpair()
+        selector = selectors.DefaultSelector()
+        selector.register(self.sock, selectors.EVENT_READ)
+        selector.register(self._wakeup[0], selectors.EVENT_READ)
+
+        stats = self.metrics.connect(self.sock, "udp")
+        buf = memoryview(bytearray(self.bufsize))
+
+        self.running = True
+        self.events.emit(
+            SERVER, detail=f"Listening on {self.host}:{self.port} (UDP)"
+        )
+        if self.admin_port is not None:
+            self.admin = AdminServer(
+                self.metrics.snapshot, self.admin_port, prefix="echo"
+            )
+            self.admin.start()
+
+        try:
+            while self.running:
+                selector.select()
+                if self.running:
+                    self._drain(buf, stats)
+        finally:
+            self.metrics.disconnect(self.sock)
+            selector.close()
+            self.sock.close()
+            for sock in self._wakeup:
+                sock.close()
+            self._wakeup = None
+
+    def _drain(self, buf: memoryview, stats: UserStats) -> None:
+        """
+        Echo every datagram already queued, up to drain_limit.
+        """
+        sock = self.sock
+        logging = self.events.sample_every != 0
+        count = 0
+        while count < self.drain_limit:
+            try:
+                n, addr = sock.recvfrom_into(buf)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                # e.g. ICMP port unreachable from an earlier reply
+                count += 1
+                continue
+            count += 1
+            stats.msgs_in += 1
+            stats.bytes_in += n
+
+            data = buf[:n]
+            if logging:
+                sender = f"{addr[0]}:{addr[1]}"
+                text = bytes(data).decode(errors="replace")
+                self.events.emit(MESSAGE, sender, n, text)
+            try:
+                sock.sendto(data, addr)
+            except OSError:
+                self.metrics.send_error()
+                continue
+            stats.msgs_out += 1
+            stats.bytes_out += n
+            if logging:
+                self.events.emit(REPLY, sender, n, text)
+
+        if count > self.batch_max:
+            self.batch_max = count
+
+    def stop(self) -> None:
+        """
+        Thread-safe. UDP has no connections, so clients are not notified.
+        """
+        self.running = False
+        wakeup = self._wakeup
+        if wakeup:
+            try:
+                wakeup[1].send(b"\0")
+            except OSError:
+                pass
 
+        if self.admin:
+            self.admin.stop()
+            self.admin = None
@@ -0,0 +1,264 @@
+import os
+import time
+import signal
+import socket
+import threading
+import multiprocessing
+from typing import Callable, Dict, List, Optional
+from server_logic import EchoServer
+
+
+# Counters each worker publishes into its shared slot
+COUNTERS = ("connections", "connections_total", "bytes_in", "bytes_out")
+
+# Cumulative counters survive a worker restart; "connections" does not
+CUMULATIVE = ("connections_total", "bytes_in", "bytes_out")
+
+REPORT_INTERVAL: float = 0.5
+
+# A worker that exits within QUICK_EXIT seconds of starting is a failed
+# start. Consecutive failed starts are retried after RESTART_DELAY,
+# doubling up to RESTART_DELAY_MAX; after MAX_QUICK_EXITS of them the
+# slot is given up. A worker that ran longer restarts at once.
+QUICK_EXIT: float = 10.0
+RESTART_DELAY: float = 0.5
+RESTART_DELAY_MAX: float = 30.0
+MAX_QUICK_EXITS: int = 5
+
+
+def _worker_main(
+    index: int,
+    host: str,
+    port: int,
+    listen_sock: Optional[socket.socket],
+    backlog: int,
+    shared,
+    verbose: bool
+) -> None:
+    """
+    Entry point of one worker process: a plain EchoServer that
+    publishes its counters into shared every REPORT_INTERVAL seconds.
+    """
+    # Ctrl-C belongs to the supervisor, which stops us with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    server = EchoServer(
+        host, port, reuse_port=listen_sock is None, listen_sock=listen_sock,
+        backlog=backlog, log_sample=1 if verbose else 0
+    )
+    signal.signal(signal.SIGTERM, lambda *_: server.stop())
+
+    def report() -> None:
+        while True:
+            stats = server.stats()
+            for i, name in enumerate(COUNTERS):
+                shared[i] = stats[name]
+            time.sleep(REPORT_INTERVAL)
+
+    threading.Thread(target=report, daemon=True).start()
+
+    def log(msg: str) -> None:
+        print(f"[WORKER {index} pid {os.getpid()}] {msg}", flush=True)
+
+    server.start(log_callback=log if verbose else (lambda msg: None))
+
+
+class EchoSupervisor:
+    """
+    Runs N EchoServer worker processes on one port.
+
+    Workers bind the port themselves with SO_REUSEPORT, so the kernel
+    spreads connections across them; where SO_REUSEPORT is missing the
+    supervisor binds once and every worker inherits the socket.
+    Crashed workers are restarted, backing off while they keep dying
+    right after starting (see QUICK_EXIT), and stats() sums all workers.
+    backlog is each listen() queue length, as in EchoServer.
+    Same start()/stop() interface as EchoServer.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 5000,
+        workers: int = 2,
+        verbose: bool = False,
+        stats_interval: float = 10.0,
+        backlog: int = 128
+    ) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.workers: int = workers
+        self.backlog: int = backlog
+        self.verbose: bool = verbose
+        self.stats_interval: float = stats_interval
+        self.running: bool = False
+        self.restarts: int = 0
+
+        self.listen_sock: Optional[socket.socket] = None
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        # Per slot: when the worker started, failed starts in a row, and
+        # when a dead worker is due to be restarted
+        self._started: List[float] = [0.0] * workers
+        self._quick_exits: List[int] = [0] * workers
+        self._restart_at: List[Optional[float]] = [None] * workers
+        self.shared = [
+            multiprocessing.Array("q", len(COUNTERS), lock=False)
+            for _ in range(workers)
+        ]
+        # Cumulative totals of workers that died, per slot
+        self.retired: List[Dict[str, int]] = [
+            dict.fromkeys(CUMULATIVE, 0) for _ in range(workers)
+        ]
+        self._stopped = threading.Event()
+
+    def _spawn(self, index: int) -> None:
+        shared = self.shared[index]
+        for i in range(len(COUNTERS)):
+            shared[i] = 0
+
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(
+                index, self.host, self.port,
+                self.listen_sock, self.backlog, shared, self.verbose
+            ),
+            daemon=True
+        )
+        process.start()
+        self.processes[index] = process
+        self._started[index] = time.monotonic()
+        self._restart_at[index] = None
+
+    def _retire(self, index: int) -> None:
+        shared = self.shared[index]
+        for name in CUMULATIVE:
+            self.retired[index][name] += shared[COUNTERS.index(name)]
+
+    def start(self, log_callback: Callable[[str], None] = print) -> None:
+        if not hasattr(socket, "SO_REUSEPORT"):
+            self.listen_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.listen_sock.bind((self.host, self.port))
+            self.listen_sock.listen(self.backlog)
+
+        self.running = True
+        self._stopped.clear()
+        for index in range(self.workers):
+            self._spawn(index)
+
+        mode = "inherited socket" if self.listen_sock else "SO_REUSEPORT"
+        log_callback(
+            f"[SUPERVISOR]: {self.workers} workers on "
+            f"{self.host}:{self.port} ({mode})"
+        )
+
+        last_report = time.monotonic()
+        last_stats: Dict[str, int] = {}
+        while self.running:
+            for index, process in enumerate(self.processes):
+                if self.running and process and not process.is_alive():
+                    self._restart(index, process, log_callback)
+            if not any(self.processes):
+                log_callback("[SUPERVISOR]: no workers left, stopping")
+                self.running = False
+                break
+
+            if time.monotonic() - last_report >= self.stats_interval:
+                last_report = time.monotonic()
+                stats = self.stats()
+                if stats != last_stats:
+                    last_stats = stats
+                    log_callback(
+                        "[SUPERVISOR]: "
+                        + ", ".join(f"{k}={v}" for k, v in stats.items())
+                    )
+
+            self._stopped.wait(REPORT_INTERVAL)
+
+    def _restart(
+        self,
+        index: int,
+        process: multiprocessing.Process,
+        log_callback: Callable[[str], None]
+    ) -> None:
+        """
+        Restart a dead worker, or schedule or give up its restart.
+        """
+        now = time.monotonic()
+        if self._restart_at[index] is None:
+            self._retire(index)
+            if now - self._started[index] >= QUICK_EXIT:
+                self._quick_exits[index] = 0
+                delay = 0.0
+            else:
+                self._quick_exits[index] += 1
+                if self._quick_exits[index] > MAX_QUICK_EXITS:
+                    log_callback(
+                        f"[SUPERVISOR]: worker {index} (pid {process.pid}) "
+                        f"exited with {process.exitcode}; giving up after "
+                        f"{MAX_QUICK_EXITS} failed restarts"
+                    )
+                    self.processes[index] = None
+                    return
+                delay = min(
+                    RESTART_DELAY * 2 ** (self._quick_exits[index] - 1),
+                    RESTART_DELAY_MAX
+                )
+            log_callback(
+                f"[SUPERVISOR]: worker {index} (pid {process.pid}) "
+                f"exited with {process.exitcode}, restarting in {delay:g}s"
+            )
+            self._restart_at[index] = now + delay
+
+        if now >= self._restart_at[index]:
+            self.restarts += 1
+            self._spawn(index)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Sum of all workers' counters, including restarted ones.
+        """
+        totals = dict.fromkeys(COUNTERS, 0)
+        for index, shared in enumerate(self.shared):
+            for i, name in enumerate(COUNTERS):
+                totals[name] += shared[i]
+            for name in CUMULATIVE:
+                totals[name] += self.retired[index][name]
+        totals["workers"] = sum(
+            1 for p in self.processes if p and p.is_alive()
+        )
+        totals["restarts"] = self.restarts
+        return totals
+
+    def worker_stats(self) -> List[Dict[str, int]]:
+        """
+        Counters of each worker slot as last published.
+        """
+        return [
+            dict(zip(COUNTERS, shared[:])) for shared in self.shared
+        ]
+
+    def stop(self) -> None:
+        """
+        Stop supervising, then SIGTERM every worker so each one
+        notifies its clients; kill any that do not exit in time.
+        """
+        self.running = False
+        self._stopped.set()
+
+        for process in self.processes:
+            if process and process.is_alive():
+                process.terminate()
+
+        for process in self.processes:
+            if process:
+                process.join(timeout=3.0)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+
+        if self.listen_sock:
+            try:
+                self.listen_sock.close()
+            except OSError:
+                pass
+            self.listen_sock = None
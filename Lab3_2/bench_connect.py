@@ -0,0 +1,88 @@
+"""
+Connection benchmark: how fast ChatServer completes username
+handshakes while some clients connect and never send one.
+
+--connections clients connect from --concurrency threads; a
+--silent fraction of them, spread through the run, stay silent and
+are held open until the rest are done. Every other connection is
+timed from connect() until the server confirms the framed handshake.
+A server that reads usernames in its accept loop stalls behind the
+first silent client, which shows up here as failed handshakes.
+
+Reported (JSON, to stdout or --json PATH):
+    - completed / failed handshakes and the run's wall time
+    - handshakes_per_s over the whole run
+    - handshake_ms: p50/p95/p99/max connect-to-confirmation time
+
+Usage:
+    python bench_connect.py [--engine threaded|selectors]
+                            [--connections N] [--silent FRACTION]
+                            [--concurrency N] [--handshake-timeout S]
+                            [--json PATH]
+"""
+import os
+import sys
+from typing import List
+
+from loadgen import (
+    connect_storm, free_port, git_commit, parse_args, raise_fd_limit,
+    start_subprocess, write_json
+)
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SERVER_SCRIPT = """
+import sys
+from server_logic import ChatServer
+
+def log(msg):
+    if msg.startswith("[SERVER]: Listening"):
+        print(msg, flush=True)
+
+ChatServer(
+    engine=sys.argv[1], backlog=1024, log_sample=0,
+    handshake_timeout=float(sys.argv[3])
+).start("127.0.0.1", int(sys.argv[2]), log)
+"""
+
+DEFAULTS = {
+    "engine": "threaded",
+    "connections": 500,
+    "silent": 0.1,
+    "concurrency": 16,
+    "handshake_timeout": 5.0,
+    "json": None,
+}
+
+
+def main(argv: List[str]) -> None:
+    opts = parse_args(argv, DEFAULTS)
+    raise_fd_limit()
+    port = free_port()
+
+    proc = start_subprocess(
+        SERVER_SCRIPT, HERE, opts["engine"], str(port),
+        str(opts["handshake_timeout"])
+    )
+    try:
+        result = connect_storm(
+            "127.0.0.1", port, opts["connections"],
+            opts["silent"], opts["concurrency"]
+        )
+    finally:
+        proc.kill()
+        proc.wait()
+
+    write_json({
+        "bench": "chat_connect",
+        "commit": git_commit(HERE),
+        "engine": opts["engine"],
+        "concurrency": opts["concurrency"],
+        "handshake_timeout": opts["handshake_timeout"],
+        **result,
+    }, opts["json"])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,204 @@
+"""
+Benchmark: threaded vs selectors ChatServer engine.
+
+For every engine and connection count the server is started in a
+subprocess, N clients connect and perform the username handshake, and
+then a small set of "active" clients ping themselves through the server
+with private messages (@self ...) while the rest stay idle.
+
+Reported per run:
+    - settle time: connect all clients until the O(N^2) join notices
+      have been delivered and the idle sockets go quiet
+    - server RSS and OS thread count (from /proc, Linux only)
+    - routed messages per second across all active clients
+
+Usage:
+    python bench_engines.py [counts...] [--active N] [--seconds S]
+    python bench_engines.py 100 1000 10000
+"""
+import os
+import sys
+import time
+import socket
+import selectors
+import subprocess
+import threading
+from typing import Dict, List, Tuple
+
+from loadgen import free_port, process_usage, raise_fd_limit
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SERVER_SCRIPT = """
+import sys
+from server_logic import ChatServer
+
+def log(msg):
+    if msg.startswith("[SERVER]: Listening"):
+        print(msg, flush=True)
+
+ChatServer(engine=sys.argv[1], backlog=1024).start(
+    "127.0.0.1", int(sys.argv[2]), log
+)
+"""
+
+
+class Drainer(threading.Thread):
+    """
+    Reads and discards everything sent to idle clients,
+    so join notices never fill a socket buffer.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(daemon=True)
+        self.selector = selectors.DefaultSelector()
+        self.running = True
+        self.last_rx = time.perf_counter()
+
+    def add(self, sock: socket.socket) -> None:
+        sock.setblocking(False)
+        self.selector.register(sock, selectors.EVENT_READ)
+
+    def run(self) -> None:
+        while self.running:
+            if not self.selector.get_map():
+                time.sleep(0.01)
+                continue
+            for key, _ in self.selector.select(timeout=0.1):
+                try:
+                    if not key.fileobj.recv(65536):
+                        self.selector.unregister(key.fileobj)
+                    self.last_rx = time.perf_counter()
+                except BlockingIOError:
+                    pass
+                except (OSError, KeyError, ValueError):
+                    pass
+
+
+def ping_loop(
+    sock: socket.socket,
+    username: str,
+    deadline: float,
+    counts: List[int],
+    index: int
+) -> None:
+    """
+    Send @self messages one at a time and wait for each to come back.
+    """
+    seq = 0
+    buf = b""
+    while time.perf_counter() < deadline:
+        token = f"p{seq}.".encode()
+        sock.sendall(f"@{username} ".encode() + token)
+        while token not in buf:
+            data = sock.recv(65536)
+            if not data:
+                return
+            buf += data
+        buf = b""
+        seq += 1
+    counts[index] = seq
+
+
+def run_one(engine: str, total: int, active: int, seconds: float) -> Dict:
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", SERVER_SCRIPT, engine, str(port)],
+        cwd=HERE,
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    proc.stdout.readline()  # wait for "Listening on"
+
+    drainer = Drainer()
+    drainer.start()
+    socks: List[Tuple[str, socket.socket]] = []
+
+    try:
+        idle = max(total - active, 0)
+        t0 = time.perf_counter()
+        for i in range(idle + active):
+            username = f"u{i}"
+            sock = socket.create_connection(("127.0.0.1", port))
+            sock.sendall(username.encode())
+            socks.append((username, sock))
+            if i < idle:
+                drainer.add(sock)
+
+        # Wait until every join notice has been fanned out
+        while time.perf_counter() - drainer.last_rx < 0.5:
+            time.sleep(0.1)
+        settle_time = time.perf_counter() - t0 - 0.5
+
+        actives = socks[idle:]
+        counts = [0] * len(actives)
+        deadline = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(
+                target=ping_loop,
+                args=(sock, username, deadline, counts, i),
+                daemon=True
+            )
+            for i, (username, sock) in enumerate(actives)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+        usage = process_usage(proc.pid)
+        return {
+            "engine": engine,
+            "connections": total,
+            "settle_s": round(settle_time, 2),
+            "rss_mb": round(usage["rss_kb"] / 1024, 1),
+            "threads": usage["threads"],
+            "msgs_per_s": round(sum(counts) / elapsed, 1),
+        }
+
+    finally:
+        drainer.running = False
+        for _, sock in socks:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        proc.kill()
+        proc.wait()
+
+
+def main(argv: List[str]) -> None:
+    active = 10
+    seconds = 3.0
+    counts: List[int] = []
+
+    args = iter(argv)
+    for arg in args:
+        if arg == "--active":
+            active = int(next(args))
+        elif arg == "--seconds":
+            seconds = float(next(args))
+        else:
+            counts.append(int(arg))
+    counts = counts or [100, 1000, 10000]
+
+    limit = raise_fd_limit()
+    print(f"fd limit: {limit}")
+    print(f"{'engine':<10} {'conns':>6} {'settle_s':>9} "
+          f"{'rss_mb':>7} {'threads':>7} {'msgs/s':>9}")
+
+    for total in counts:
+        if total + 64 > limit:
+            print(f"skipping {total}: fd limit {limit} too low")
+            continue
+        for engine in ("threaded", "selectors"):
+            r = run_one(engine, total, active, seconds)
+            print(f"{r['engine']:<10} {r['connections']:>6} {r['settle_s']:>9} "
+                  f"{r['rss_mb']:>7} {r['threads']:>7} {r['msgs_per_s']:>9}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
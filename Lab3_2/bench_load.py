@@ -0,0 +1,171 @@
+"""
+Load benchmark: ChatServer broadcast fan-out under a steady message rate.
+
+N framed clients join the room; together they send --rate broadcast
+messages per second of --size bytes for --seconds, round-robin. Every
+other client receives each message, and the delivery latency is
+measured from the sender's send time.
+
+Reported (JSON, to stdout or --json PATH):
+    - throughput: messages sent, deliveries and delivered bytes per second
+    - fanout_latency_ms: p50/p95/p99/max of every single delivery
+    - broadcast_complete_ms: same, until the last recipient got it
+    - server_usage: CPU seconds and % of one core, RSS, threads
+      (in-process runs measure the whole process, load generator included)
+
+--transport unix runs the same load over the server's Unix domain
+socket instead of loopback TCP.
+
+Usage:
+    python bench_load.py [--engine threaded|selectors]
+                         [--mode subprocess|inprocess] [--clients N]
+                         [--transport tcp|unix]
+                         [--rate MSGS_PER_S] [--size BYTES]
+                         [--seconds S] [--json PATH]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Dict, List
+
+from latency import percentiles
+from loadgen import (
+    LoadDriver, free_port, git_commit, parse_args, parse_body,
+    process_usage, raise_fd_limit, start_subprocess, write_json
+)
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SERVER_SCRIPT = """
+import sys
+from server_logic import ChatServer
+
+def log(msg):
+    if msg.startswith("[SERVER]: Listening"):
+        print(msg, flush=True)
+
+ChatServer(
+    engine=sys.argv[1], backlog=1024, queue_size=100000, log_sample=0,
+    unix_path=sys.argv[3] or None
+).start("127.0.0.1", int(sys.argv[2]), log)
+"""
+
+DEFAULTS = {
+    "engine": "threaded",
+    "mode": "subprocess",
+    "clients": 50,
+    "transport": "tcp",
+    "rate": 200.0,
+    "size": 64,
+    "seconds": 5.0,
+    "json": None,
+}
+
+
+def main(argv: List[str]) -> None:
+    opts = parse_args(argv, DEFAULTS)
+    raise_fd_limit()
+    port = free_port()
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "chat.sock") if opts["transport"] == "unix" else ""
+    host = f"unix:{path}" if path else "127.0.0.1"
+
+    server = proc = None
+    if opts["mode"] == "inprocess":
+        from server_logic import ChatServer
+        server = ChatServer(
+            engine=opts["engine"], backlog=1024,
+            queue_size=100000, log_sample=0, unix_path=path or None
+        )
+        threading.Thread(
+            target=server.start,
+            args=("127.0.0.1", port, lambda msg: None),
+            daemon=True
+        ).start()
+        time.sleep(0.3)
+        pid = os.getpid()
+    else:
+        proc = start_subprocess(
+            SERVER_SCRIPT, HERE, opts["engine"], str(port), path
+        )
+        pid = proc.pid
+
+    latencies: List[float] = []
+    complete: Dict[int, int] = defaultdict(int)
+    sent_ns: Dict[int, int] = {}
+    delivered_bytes = [0]
+
+    def on_message(index: int, text: str, recv_ns: int) -> None:
+        # "[load3]: <seq> <send_ns> <padding>"
+        _, sep, body = text.partition("]: ")
+        parsed = parse_body(body) if sep else None
+        if not parsed:
+            return
+        seq, send_ns = parsed
+        latencies.append((recv_ns - send_ns) / 1e6)
+        sent_ns[seq] = send_ns
+        complete[seq] = max(complete[seq], recv_ns)
+        delivered_bytes[0] += len(text)
+
+    driver = LoadDriver(host, port, opts["clients"], on_message)
+    try:
+        connect_s = driver.connect()
+        driver.wait_quiet()  # let the O(N^2) join notices drain
+
+        before = process_usage(pid)
+        t0 = time.perf_counter()
+        driver.run(opts["rate"], opts["size"], opts["seconds"])
+        driver.wait_quiet()
+        elapsed = max(driver.last_rx - t0, 1e-9)
+        after = process_usage(pid)
+    finally:
+        driver.close()
+        if server:
+            server.stop()
+        if proc:
+            proc.kill()
+            proc.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    cpu_s = after["cpu_s"] - before["cpu_s"]
+    expected = driver.sent * (opts["clients"] - 1)
+    write_json({
+        "bench": "chat_fanout",
+        "commit": git_commit(HERE),
+        "engine": opts["engine"],
+        "mode": opts["mode"],
+        "transport": opts["transport"],
+        "clients": opts["clients"],
+        "rate": opts["rate"],
+        "size": opts["size"],
+        "seconds": opts["seconds"],
+        "connect_s": round(connect_s, 3),
+        "sent": driver.sent,
+        "deliveries": len(latencies),
+        "expected_deliveries": expected,
+        "throughput": {
+            "msgs_per_s": round(driver.sent / elapsed, 1),
+            "deliveries_per_s": round(len(latencies) / elapsed, 1),
+            "bytes_per_s": round(delivered_bytes[0] / elapsed, 1),
+        },
+        "fanout_latency_ms": percentiles(latencies),
+        "broadcast_complete_ms": percentiles([
+            (done - sent_ns[seq]) / 1e6 for seq, done in complete.items()
+        ]),
+        "server_usage": {
+            "scope": "process" if server else "server",
+            "cpu_s": round(cpu_s, 3),
+            "cpu_pct": round(100 * cpu_s / elapsed, 1),
+            "rss_kb": after["rss_kb"],
+            "threads": after["threads"],
+        },
+    }, opts["json"])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark: ClientRegistry vs the old List[Tuple[str, socket]].
+
+Measures, at N users (default 10,000):
+    - join/leave churn: every user leaves and rejoins once, random order
+    - private-message lookup: find a random target by username
+    - broadcast iteration: walk all clients, 100 times
+
+Usage:
+    python bench_registry.py [users] [lookups]
+"""
+import sys
+import time
+import random
+from typing import Callable, List, Tuple
+
+from registry import ClientRegistry
+
+
+class FakeSocket:
+    """
+    Stands in for socket.socket: the registry only needs fileno().
+    """
+
+    __slots__ = ("fd",)
+
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+
+    def fileno(self) -> int:
+        return self.fd
+
+
+def timed(fn: Callable[[], None]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def bench_list(
+    users: List[Tuple[str, FakeSocket]],
+    churn_order: List[Tuple[str, FakeSocket]],
+    targets: List[str]
+) -> Tuple:
+    clients: List[Tuple[str, FakeSocket]] = list(users)
+
+    def churn() -> None:
+        for user in churn_order:
+            if user in clients:
+                clients.remove(user)
+            clients.append(user)
+
+    def lookup() -> None:
+        for target in targets:
+            for name, _ in clients:
+                if name == target:
+                    break
+
+    def iterate() -> None:
+        for _ in range(100):
+            for _, sock in clients:
+                pass
+
+    return timed(churn), timed(lookup), timed(iterate)
+
+
+def bench_registry(
+    users: List[Tuple[str, FakeSocket]],
+    churn_order: List[Tuple[str, FakeSocket]],
+    targets: List[str]
+) -> Tuple:
+    clients = ClientRegistry()
+    for name, sock in users:
+        clients.add(name, sock)
+
+    def churn() -> None:
+        for name, sock in churn_order:
+            clients.remove(sock)
+            clients.add(name, sock)
+
+    def lookup() -> None:
+        for target in targets:
+            clients.get(target)
+
+    def iterate() -> None:
+        for _ in range(100):
+            for entry in clients.snapshot():
+                pass
+
+    return timed(churn), timed(lookup), timed(iterate)
+
+
+def main(argv: List[str]) -> None:
+    n = int(argv[0]) if argv else 10_000
+    lookups = int(argv[1]) if len(argv) > 1 else 10_000
+
+    users = [(f"user{i}", FakeSocket(i + 10)) for i in range(n)]
+    churn_order = random.sample(users, len(users))
+    targets = [random.choice(users)[0] for _ in range(lookups)]
+
+    print(f"{n} users, {lookups} lookups, 100 broadcast walks")
+    print(f"{'':<10} {'churn_s':>9} {'lookup_s':>9} {'iterate_s':>9}")
+    for label, bench in (("list", bench_list), ("registry", bench_registry)):
+        churn, lookup, iterate = bench(users, churn_order, targets)
+        print(f"{label:<10} {churn:>9.4f} {lookup:>9.4f} {iterate:>9.4f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,403 @@
+"""
+Local pub/sub bus for sharded ChatServer processes.
+
+A broker process listens on a Unix-domain socket; every ChatServer shard
+connects to it with a BusClient. Events are JSON objects carried in the
+same length-prefixed frames as the chat protocol.
+
+Event types (shard → broker):
+    hello     {"shard"}                     first event on a connection
+    join      {"user", "message"}           user joined the publishing shard
+    leave     {"user", "message"}           user left the publishing shard
+    broadcast {"message"}                   deliver to everyone on other shards
+    private   {"to", "from", "message"}     deliver to the shard owning "to"
+    private_failed {"to", "from", "shard"}  target vanished, tell origin shard
+
+Broker → shard:
+    directory {"users": {user: shard}}      snapshot sent after hello
+    join / leave / broadcast / private / private_failed, with "shard" set
+    to the publishing shard
+
+The broker owns the username directory; shards keep a mirror of it from
+the directory snapshot and the join/leave events. An event missing one
+of its fields is logged and skipped, on either side.
+
+Neither side waits on the other: a shard's publish() only queues, and
+the broker buffers at most max_outbuf bytes for a shard that is not
+reading before it drops that shard (its users then leave, as when a
+shard dies).
+
+Usage:
+    python bus.py /tmp/chat.bus
+"""
+import os
+import sys
+import json
+import socket
+import selectors
+import threading
+from typing import Callable, Dict, Optional
+
+from outbound import OutboundQueue, flatten, sendall_buffers
+from protocol import FrameDecoder, encode
+from transport import close_stream
+
+
+# String fields each event type must carry to be routed
+REQUIRED = {
+    "join": ("user", "message"),
+    "leave": ("user", "message"),
+    "broadcast": ("message",),
+    "private": ("to", "from", "message"),
+    "private_failed": ("to", "from", "origin"),
+}
+
+
+def encode_event(event: Dict) -> bytes:
+    return encode(json.dumps(event), framed=True)
+
+
+class _Shard:
+    """
+    Broker-side state of one connected shard.
+    """
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock: socket.socket = sock
+        self.shard: Optional[str] = None
+        self.decoder: FrameDecoder = FrameDecoder()
+        self.outbuf: bytearray = bytearray()
+
+
+class BusBroker:
+    """
+    Relays events between shards and keeps the username directory.
+    Single-threaded selectors loop; stop() may be called from any thread.
+    A shard with more than max_outbuf bytes waiting for it is dropped.
+    """
+
+    def __init__(self, path: str, max_outbuf: int = 16 << 20) -> None:
+        self.path: str = path
+        self.max_outbuf: int = max_outbuf
+        self.server: Optional[socket.socket] = None
+        self.selector: Optional[selectors.BaseSelector] = None
+        self.shards: Dict[str, _Shard] = {}
+        self.directory: Dict[str, str] = {}
+        self.running: bool = False
+        self._log: Callable[[str], None] = print
+        self._wakeup = socket.socketpair()
+
+    def start(self, log_callback: Callable[[str], None] = print) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        self.server.listen(16)
+        self.server.setblocking(False)
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.server, selectors.EVENT_READ, "accept")
+        self.selector.register(self._wakeup[0], selectors.EVENT_READ, "wakeup")
+
+        self.running = True
+        self._log = log_callback
+        log_callback(f"[BUS]: Listening on {self.path}")
+
+        try:
+            while self.running:
+                for key, mask in self.selector.select():
+                    if key.data == "accept":
+                        self._accept()
+                    elif key.data == "wakeup":
+                        self._wakeup[0].recv(1024)
+                    else:
+                        if mask & selectors.EVENT_WRITE:
+                            self._flush(key.data)
+                        if mask & selectors.EVENT_READ:
+                            self._read(key.data, log_callback)
+        finally:
+            for key in list(self.selector.get_map().values()):
+                key.fileobj.close()
+            self.selector.close()
+            self.selector = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def stop(self) -> None:
+        self.running = False
+        try:
+            self._wakeup[1].send(b"\0")
+        except OSError:
+            pass
+
+    # ---------------- Connections ----------------
+
+    def _accept(self) -> None:
+        try:
+            sock, _ = self.server.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        self.selector.register(sock, selectors.EVENT_READ, _Shard(sock))
+
+    def _read(self, shard: _Shard, log_callback: Callable[[str], None]) -> None:
+        try:
+            frames = shard.decoder.recv_from(shard.sock)
+        except BlockingIOError:
+            return
+        except (OSError, ValueError):
+            frames = None
+
+        if frames is None:
+            self._drop(shard, log_callback)
+            return
+
+        for frame in frames:
+            if shard.sock.fileno() == -1:
+                return  # dropped while routing an earlier frame
+            try:
+                event = json.loads(frame)
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                self._route(shard, event, log_callback)
+
+    def _drop(self, shard: _Shard, log_callback: Callable[[str], None]) -> None:
+        if shard.sock.fileno() == -1:
+            return  # already dropped earlier in this loop pass
+        self.selector.unregister(shard.sock)
+        shard.sock.close()
+        shard.outbuf.clear()
+
+        if shard.shard is None or self.shards.get(shard.shard) is not shard:
+            return
+        del self.shards[shard.shard]
+        log_callback(f"[BUS]: shard {shard.shard} disconnected")
+
+        # Users of a dead shard are gone for everyone else too
+        for user, owner in list(self.directory.items()):
+            if owner == shard.shard:
+                del self.directory[user]
+                self._publish(None, {
+                    "type": "leave",
+                    "shard": shard.shard,
+                    "user": user,
+                    "message": f"[SYSTEM]: {user} left the chat.",
+                })
+
+    # ---------------- Routing ----------------
+
+    def _route(
+        self,
+        shard: _Shard,
+        event: Dict,
+        log_callback: Callable[[str], None]
+    ) -> None:
+        kind = event.get("type")
+
+        if kind == "hello":
+            shard.shard = str(event.get("shard"))
+            self.shards[shard.shard] = shard
+            log_callback(f"[BUS]: shard {shard.shard} connected")
+            self._send(shard, {"type": "directory", "users": self.directory})
+            return
+
+        if shard.shard is None:
+            return
+        missing = [
+            field for field in REQUIRED.get(kind, ())
+            if not isinstance(event.get(field), str)
+        ]
+        if missing:
+            log_callback(
+                f"[BUS]: shard {shard.shard} sent {kind} without "
+                f"{', '.join(missing)}; skipped"
+            )
+            return
+        event["shard"] = shard.shard
+
+        if kind == "join":
+            self.directory[event["user"]] = shard.shard
+            self._publish(shard, event)
+        elif kind == "leave":
+            if self.directory.get(event["user"]) == shard.shard:
+                del self.directory[event["user"]]
+            self._publish(shard, event)
+        elif kind == "broadcast":
+            self._publish(shard, event)
+        elif kind == "private":
+            owner = self.shards.get(self.directory.get(event["to"], ""))
+            if owner:
+                self._send(owner, event)
+            else:
+                self._send(shard, {
+                    "type": "private_failed",
+                    "to": event["to"],
+                    "from": event["from"],
+                    "shard": shard.shard,
+                })
+        elif kind == "private_failed":
+            origin = self.shards.get(event["origin"])
+            if origin:
+                self._send(origin, event)
+
+    def _publish(self, source: Optional[_Shard], event: Dict) -> None:
+        data = encode_event(event)
+        # A send may drop a shard, which changes self.shards
+        for shard in list(self.shards.values()):
+            if shard is not source:
+                self._send_bytes(shard, data)
+
+    def _send(self, shard: _Shard, event: Dict) -> None:
+        self._send_bytes(shard, encode_event(event))
+
+    def _send_bytes(self, shard: _Shard, data: bytes) -> None:
+        if shard.sock.fileno() == -1:
+            return
+        if len(shard.outbuf) + len(data) > self.max_outbuf:
+            self._log(
+                f"[BUS]: shard {shard.shard} is not reading, "
+                f"{len(shard.outbuf)} bytes buffered; dropping it"
+            )
+            self._drop(shard, self._log)
+            return
+        if not shard.outbuf:
+            try:
+                sent = shard.sock.send(data)
+            except BlockingIOError:
+                sent = 0
+            except OSError:
+                return
+            data = data[sent:]
+            if not data:
+                return
+            self.selector.modify(
+                shard.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, shard
+            )
+        shard.outbuf += data
+
+    def _flush(self, shard: _Shard) -> None:
+        try:
+            sent = shard.sock.send(shard.outbuf)
+        except BlockingIOError:
+            return
+        except OSError:
+            shard.outbuf.clear()
+            sent = 0
+        del shard.outbuf[:sent]
+        if not shard.outbuf:
+            self.selector.modify(shard.sock, selectors.EVENT_READ, shard)
+
+
+class BusClient:
+    """
+    Shard-side connection to the broker.
+    publish() is thread-safe and never blocks: events go into a bounded
+    queue drained by a writer thread, so a stalled broker cannot stall
+    the shard's event loop. If queue_size events pile up the broker is
+    considered gone and the connection is closed. Incoming events are
+    handed to on_event from a background reader thread; an exception
+    there is logged and the event skipped. on_disconnect runs once on
+    that thread when the connection ends, for whatever reason.
+    """
+
+    def __init__(self, path: str, shard: str, queue_size: int = 65536) -> None:
+        self.path: str = path
+        self.shard: str = shard
+        self.sock: Optional[socket.socket] = None
+        self.connected: bool = False
+        self.queue_size: int = queue_size
+        self.outbox: Optional[OutboundQueue] = None
+
+    def connect(
+        self,
+        on_event: Callable[[Dict], None],
+        on_disconnect: Optional[Callable[[], None]] = None,
+        log_callback: Callable[[str], None] = print
+    ) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+        self.connected = True
+        # "disconnect": a lost event would corrupt the directory mirror
+        self.outbox = OutboundQueue(self.queue_size, "disconnect")
+        self.publish({"type": "hello", "shard": self.shard})
+
+        threading.Thread(
+            target=self._writer_loop, args=(self.sock, self.outbox), daemon=True
+        ).start()
+        threading.Thread(
+            target=self._listen,
+            args=(on_event, on_disconnect, log_callback),
+            daemon=True
+        ).start()
+
+    def publish(self, event: Dict) -> None:
+        outbox = self.outbox
+        if not self.connected or outbox is None:
+            return
+        if not outbox.put((encode_event(event),)):
+            self.close()
+
+    def _writer_loop(self, sock: socket.socket, outbox: OutboundQueue) -> None:
+        while True:
+            batch = outbox.get_batch()
+            if batch is None:
+                return
+            try:
+                sendall_buffers(sock, flatten(batch))
+            except OSError:
+                # _listen notices the dead socket
+                self.connected = False
+                outbox.close()
+                return
+
+    def _listen(
+        self,
+        on_event: Callable[[Dict], None],
+        on_disconnect: Optional[Callable[[], None]],
+        log_callback: Callable[[str], None]
+    ) -> None:
+        sock = self.sock
+        decoder = FrameDecoder()
+        while self.connected:
+            try:
+                frames = decoder.recv_from(sock)
+            except (OSError, ValueError):
+                frames = None
+            if frames is None:
+                break
+            for frame in frames:
+                try:
+                    event = json.loads(frame)
+                except ValueError:
+                    continue
+                try:
+                    on_event(event)
+                except Exception as e:
+                    log_callback(f"[BUS]: bad event {event!r:.200}: {e!r}")
+        self.connected = False
+        if on_disconnect is not None:
+            on_disconnect()
+
+    def close(self) -> None:
+        self.connected = False
+        if self.outbox is not None:
+            self.outbox.close()
+            self.outbox = None
+        if self.sock:
+            close_stream(self.sock)
+            self.sock = None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python bus.py <socket path>")
+        raise SystemExit(1)
+
+    broker = BusBroker(sys.argv[1])
+    try:
+        broker.start()
+    except KeyboardInterrupt:
+        print("\n[BUS]: Shutting down")
+        broker.stop()
@@ -0,0 +1,29 @@
+"""
+Harness shared by the check scripts (check_idle.py, e2e_shards.py, ...).
+
+Each check prints one "ok   ..." line; the first failure prints
+"FAIL: ..." and exits with status 1.
+"""
+import time
+from typing import Callable
+
+
+def fail(reason: str) -> None:
+    print(f"FAIL: {reason}")
+    raise SystemExit(1)
+
+
+def ok(check: str) -> None:
+    print(f"ok   {check}")
+
+
+def wait_for(predicate: Callable[[], bool], timeout: float) -> bool:
+    """
+    Poll predicate until it holds or timeout seconds pass.
+    """
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
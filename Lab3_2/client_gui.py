@@ -1,6 +1,11 @@
 import tkinter as tk
 from tkinter import messagebox
 import threading
+from logview import LogView, session_log_path
+
+
+# How often the outbound queue depth is shown
+SEND_STATUS_MS: int = 250
 
 
 class ClientGUI:
@@ -19,6 +24,7 @@ class ClientGUI:
 
         self.root = tk.Tk()
         self.root.title("Chat Client")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.configure(bg=BG)
 
         frame = tk.Frame(self.root, bg=PANEL)
@@ -49,6 +55,13 @@ class ClientGUI:
             self.root, height=15, width=60, state="disabled", bg="#FFFDF6"
         )
         self.output.pack(padx=10, pady=5)
+        self.output_view = LogView(
+            self.root,
+            self.output,
+            spill_path=session_log_path("chat_client"),
+            classify=self.route_tag
+        )
+        self.output_view.toolbar(self.root, BG, FG, BTN).pack(fill="x", padx=10)
 
         # ---- COLOR TAGS ----
         self.output.tag_config(
@@ -74,29 +87,57 @@ class ClientGUI:
         )
         self.send_btn.pack()
 
+        # ---- Outbound queue status ----
+        self.queue_label = tk.Label(self.root, bg=BG, fg=FG)
+        self.queue_label.pack(pady=(0, 5))
+        self.root.after(SEND_STATUS_MS, self.update_send_status)
+
     # ----------------- UI helpers -----------------
 
     def write_log(self, msg: str, tag: str) -> None:
-        self.output.config(state="normal")
-        self.output.insert("end", msg + "\n", tag)
-        self.output.see("end")
-        self.output.config(state="disabled")
+        self.output_view.write(msg, tag)
+
+    @staticmethod
+    def route_tag(msg: str) -> str:
+        # ---- COLOR ROUTING (FIXED) ----
+        if msg.startswith("[PRIVATE]"):
+            return "private"
+        if msg.startswith("[SYSTEM]"):
+            return "system"
+        return "others"
 
     def listen_loop(self) -> None:
+        """
+        Background thread: no Tk calls here. Messages are queued on
+        the output view, which tags and renders them in batches.
+        """
+        session = self.client.sock
+        write = self.output_view.write
         while self.connected:
-            msg = self.client.receive()
-            if msg is None:
+            messages = self.client.receive_batch()
+            if messages is None:
                 break
+            for msg in messages:
+                write(msg)
 
-            # ---- COLOR ROUTING (FIXED) ----
-            if msg.startswith("[PRIVATE]"):
-                self.write_log(msg, "private")
-            elif msg.startswith("[SYSTEM]"):
-                self.write_log(msg, "system")
-            else:
-                self.write_log(msg, "others")
+        self.output_view.call_soon(lambda: self._listener_done(session))
 
-        self.on_disconnect()
+    def _listener_done(self, session) -> None:
+        # Ignore a listener from an earlier connection
+        if self.client.sock is session:
+            self.on_disconnect()
+
+    def update_send_status(self) -> None:
+        depth = self.client.queue_depth() if self.connected else 0
+        if self.connected and self.client.congested:
+            self.queue_label.config(
+                text=f"Server is slow: {depth} messages waiting", fg="#B00020"
+            )
+        else:
+            self.queue_label.config(
+                text=f"Queued: {depth}" if depth else "", fg="#4A3F2A"
+            )
+        self.root.after(SEND_STATUS_MS, self.update_send_status)
 
     # ----------------- Actions -----------------
 
@@ -122,7 +163,10 @@ class ClientGUI:
             self.write_log(f"[Me]: {msg}", "me")
 
         try:
-            self.client.send(msg)
+            if not self.client.send(msg):
+                self.write_log(
+                    "[SYSTEM]: Send queue full, message not sent", "system"
+                )
         except:
             self.on_disconnect()
 
@@ -152,7 +196,6 @@ class ClientGUI:
             except Exception as e:
                 messagebox.showerror("Error", str(e))
         else:
-            self.client.close()
             self.on_disconnect()
 
     def on_disconnect(self) -> None:
@@ -160,10 +203,20 @@ class ClientGUI:
             return
 
         self.connected = False
+        # Don't wait for the writer on the Tk thread
+        self.client.close(timeout=None)
         self.connect_btn.config(text="Connect")
         self.msg_entry.config(state="disabled")
         self.send_btn.config(state="disabled")
         self.write_log("[SYSTEM]: Disconnected", "system")
 
+    def on_close(self) -> None:
+        """
+        Window closed: shut down and delete this session's spill file.
+        """
+        self.client.close(timeout=None)
+        self.output_view.close(remove_spill=True)
+        self.root.destroy()
+
     def start(self) -> None:
         self.root.mainloop()
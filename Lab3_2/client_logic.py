@@ -1,36 +1,152 @@
 import socket
-from typing import Optional
+import threading
+from collections import deque
+from typing import Deque, List, Optional
+from outbound import OutboundQueue, flatten, sendall_buffers
+from protocol import RawDecoder, StreamDecoder, encode, client_handshake
+from transport import close_stream, connect_stream
 
 
 class ChatClient:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        framed: bool = True,
+        queue_size: int = 4096,
+        high_water: int = 64
+    ) -> None:
+        """
+        framed selects the length-prefixed protocol (False for old servers)
+
+        send() only queues; a writer thread drains the queue, so a full
+        server receive window never blocks the caller. queue_size caps
+        the queue, and more than high_water queued messages means the
+        server is not keeping up (see congested).
+        """
         self.sock: Optional[socket.socket] = None
         self.connected = False
+        self.framed = framed
+        self.decoder: StreamDecoder = RawDecoder()
+        self.pending: Deque[str] = deque()
+        self.queue_size: int = queue_size
+        self.high_water: int = high_water
+        self.outbox: Optional[OutboundQueue] = None
+        self._writer: Optional[threading.Thread] = None
 
     def connect(self, host: str, port: int, username: str) -> None:
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.connect((host, port))
-        self.sock.sendall(username.encode())
+        # host may be "unix:/path" for the server's Unix domain socket
+        self.sock = connect_stream(host, port)
+        self.pending.clear()
+
+        if self.framed:
+            try:
+                self.decoder, messages = client_handshake(self.sock, username)
+            except:
+                self.sock.close()
+                self.sock = None
+                raise
+            self.pending.extend(messages)
+        else:
+            self.sock.sendall(username.encode())
+            self.decoder = RawDecoder()
+
         self.connected = True
 
-    def send(self, msg: str) -> None:
-        if not self.sock:
-            return
-        self.sock.sendall(msg.encode())
+        # "disconnect" policy: a full queue refuses new messages
+        # instead of dropping ones already accepted
+        self.outbox = OutboundQueue(self.queue_size, "disconnect")
+        self._writer = threading.Thread(
+            target=self._writer_loop,
+            args=(self.sock, self.outbox),
+            daemon=True
+        )
+        self._writer.start()
+
+    def send(self, msg: str) -> bool:
+        """
+        Queue msg for the writer thread; never blocks.
+        Returns False if the queue is full and msg was not sent.
+        """
+        if not self.sock or self.outbox is None:
+            return False
+        return self.outbox.put((encode(msg, self.framed),))
+
+    def queue_depth(self) -> int:
+        return len(self.outbox) if self.outbox is not None else 0
+
+    @property
+    def congested(self) -> bool:
+        return self.queue_depth() > self.high_water
+
+    def _writer_loop(self, sock: socket.socket, outbox: OutboundQueue) -> None:
+        """
+        Everything queued since the last write goes out in one send.
+        """
+        while True:
+            batch = outbox.get_batch()
+            if batch is None:
+                break
+            try:
+                sendall_buffers(sock, flatten(batch))
+            except OSError:
+                # receive() notices the dead socket
+                outbox.close()
+                return
+        if outbox.finishing:
+            # close() may not have waited for the queue to drain
+            close_stream(sock)
 
     def receive(self) -> Optional[str]:
         if not self.sock:
             return None
         try:
-            data = self.sock.recv(1024)
-            if not data:
-                return None
-            return data.decode()
+            while not self.pending:
+                messages = self.decoder.recv_from(self.sock)
+                if messages is None:
+                    return None
+                self.pending.extend(messages)
+            return self.pending.popleft()
+        except:
+            return None
+
+    def receive_batch(self) -> Optional[List[str]]:
+        """
+        Every message available after one read (at least one).
+        Returns None once the server disconnects.
+        """
+        if not self.sock:
+            return None
+        try:
+            while not self.pending:
+                messages = self.decoder.recv_from(self.sock)
+                if messages is None:
+                    return None
+                self.pending.extend(messages)
+            batch = list(self.pending)
+            self.pending.clear()
+            return batch
         except:
             return None
 
-    def close(self) -> None:
+    def close(self, timeout: Optional[float] = 2.0) -> None:
+        """
+        Messages already queued by send() are still written; the writer
+        gets up to timeout seconds to drain before the socket closes.
+        With timeout=None close() returns at once (for the Tk thread):
+        the writer drains in the background and closes the socket.
+        """
         self.connected = False
+        if self.outbox is not None:
+            self.outbox.finish()
+            if timeout is None and self._writer is not None:
+                self._writer = None
+                self.outbox = None
+                self.sock = None
+                return
+            if self._writer is not None:
+                self._writer.join(timeout)
+                self._writer = None
+            self.outbox.close()
+            self.outbox = None
         if self.sock:
-            self.sock.close()
+            close_stream(self.sock)
             self.sock = None
@@ -0,0 +1,218 @@
+"""
+End-to-end check: one chat room sharded over 3 ChatServer processes.
+
+Starts a BusBroker and three shards on localhost (mixed engines), puts
+one client on each shard and checks that:
+    - join notices reach users on the other shards
+    - a broadcast reaches every other shard
+    - @user private messages route to the target's shard only
+    - @user for an unknown user answers "not found" to the sender
+    - leave notices propagate, also when a whole shard dies
+    - the broker skips malformed events instead of dying
+    - a shard that loses the broker says so and stops routing remotely
+
+Exits non-zero on the first failed check.
+
+Usage:
+    python e2e_shards.py
+"""
+import os
+import sys
+import time
+import queue
+import select
+import socket
+import tempfile
+import threading
+import subprocess
+from typing import Dict, List
+
+from bus import BusClient
+from checks import fail, ok
+from client_logic import ChatClient
+from loadgen import free_port
+
+
+BROKER_SCRIPT = """
+import sys
+from bus import BusBroker
+
+BusBroker(sys.argv[1]).start(lambda msg: print(msg, flush=True))
+"""
+
+SHARD_SCRIPT = """
+import sys
+from server_logic import ChatServer
+
+def log(msg):
+    if msg.startswith(("[SERVER]: Shard", "[ERROR]")):
+        print(msg, flush=True)
+
+ChatServer(engine=sys.argv[1], bus_path=sys.argv[3]).start(
+    "127.0.0.1", int(sys.argv[2]), log
+)
+"""
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TIMEOUT: float = 5.0
+
+
+class Inbox:
+    """
+    A connected ChatClient whose messages are collected on a thread.
+    """
+
+    def __init__(self, port: int, username: str) -> None:
+        self.username = username
+        self.client = ChatClient()
+        self.client.connect("127.0.0.1", port, username)
+        self.messages: "queue.Queue[str]" = queue.Queue()
+        threading.Thread(target=self._listen, daemon=True).start()
+
+    def _listen(self) -> None:
+        while True:
+            msg = self.client.receive()
+            if msg is None:
+                return
+            self.messages.put(msg)
+
+    def expect(self, text: str) -> None:
+        deadline = time.monotonic() + TIMEOUT
+        seen: List[str] = []
+        while time.monotonic() < deadline:
+            try:
+                msg = self.messages.get(timeout=deadline - time.monotonic())
+            except queue.Empty:
+                break
+            if msg == text:
+                return
+            seen.append(msg)
+        fail(f"{self.username} never got {text!r} (got {seen})")
+
+    def expect_nothing(self, wait: float = 0.5) -> None:
+        try:
+            msg = self.messages.get(timeout=wait)
+        except queue.Empty:
+            return
+        fail(f"{self.username} got unexpected {msg!r}")
+
+
+def expect_line(proc: subprocess.Popen, prefix: str) -> None:
+    deadline = time.monotonic() + TIMEOUT
+    while time.monotonic() < deadline:
+        ready, _, _ = select.select(
+            [proc.stdout], [], [], deadline - time.monotonic()
+        )
+        if not ready:
+            break
+        line = proc.stdout.readline()
+        if not line:
+            break
+        if line.startswith(prefix):
+            return
+    fail(f"process never printed {prefix!r}")
+
+
+def spawn(script: str, *args: str) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-c", script, *args],
+        cwd=HERE,
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    proc.stdout.readline()  # wait for the ready line
+    return proc
+
+
+def main() -> None:
+    bus_path = os.path.join(tempfile.mkdtemp(), "chat.bus")
+    procs: List[subprocess.Popen] = []
+    inboxes: Dict[str, Inbox] = {}
+
+    try:
+        procs.append(spawn(BROKER_SCRIPT, bus_path))
+
+        ports: List[int] = []
+        for engine in ("threaded", "selectors", "threaded"):
+            port = free_port()
+            procs.append(spawn(SHARD_SCRIPT, engine, str(port), bus_path))
+            ports.append(port)
+
+        alice = inboxes["alice"] = Inbox(ports[0], "alice")
+        time.sleep(0.2)
+        bob = inboxes["bob"] = Inbox(ports[1], "bob")
+        alice.expect("[SYSTEM]: bob joined the chat.")
+        time.sleep(0.2)
+        carol = inboxes["carol"] = Inbox(ports[2], "carol")
+        alice.expect("[SYSTEM]: carol joined the chat.")
+        bob.expect("[SYSTEM]: carol joined the chat.")
+        ok("join notices cross shards")
+
+        alice.client.send("hello everyone")
+        bob.expect("[alice]: hello everyone")
+        carol.expect("[alice]: hello everyone")
+        alice.expect_nothing()
+        ok("broadcast reaches every other shard")
+
+        bob.client.send("@carol psst")
+        carol.expect("[PRIVATE] bob → carol: psst")
+        alice.expect_nothing()
+        ok("private message routed to the target's shard")
+
+        carol.client.send("@alice hi back")
+        alice.expect("[PRIVATE] carol → alice: hi back")
+        bob.expect_nothing()
+        ok("private message routed back")
+
+        alice.client.send("@nobody hello?")
+        alice.expect("[SYSTEM]: User 'nobody' not found or offline.")
+        ok("unknown user reported to sender")
+
+        # shutdown() first: the listener thread is blocked in recv()
+        carol.client.sock.shutdown(socket.SHUT_RDWR)
+        carol.client.close()
+        alice.expect("[SYSTEM]: carol left the chat.")
+        bob.expect("[SYSTEM]: carol left the chat.")
+        alice.client.send("@carol still there?")
+        alice.expect("[SYSTEM]: User 'carol' not found or offline.")
+        ok("leave notice and directory update cross shards")
+
+        procs[2].kill()  # bob's shard
+        procs[2].wait()
+        alice.expect("[SYSTEM]: bob left the chat.")
+        ok("users of a dead shard leave the directory")
+
+        dave = inboxes["dave"] = Inbox(ports[2], "dave")
+        alice.expect("[SYSTEM]: dave joined the chat.")
+        dave.expect("[SYSTEM]: dave joined the chat.")
+        rogue = BusClient(bus_path, "rogue")
+        rogue.connect(lambda event: None)
+        rogue.publish({"type": "join"})
+        rogue.publish({"type": "private", "to": "dave"})
+        rogue.publish({"type": "leave", "user": None, "message": "x"})
+        time.sleep(0.2)  # close() discards what is still queued
+        rogue.close()
+        dave.client.send("still routing?")
+        alice.expect("[dave]: still routing?")
+        ok("broker skips malformed events")
+
+        procs[0].kill()  # the broker
+        procs[0].wait()
+        expect_line(procs[1], "[ERROR]: Shard")
+        alice.client.send("@dave are you there?")
+        alice.expect("[SYSTEM]: User 'dave' not found or offline.")
+        dave.expect_nothing()
+        ok("lost bus reported, remote users unreachable")
+
+        print("All checks passed")
+
+    finally:
+        for inbox in inboxes.values():
+            inbox.client.close()
+        for proc in procs:
+            proc.kill()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
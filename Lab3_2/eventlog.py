@@ -0,0 +1,266 @@
+import os
+import sys
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+from typing import (
+    Callable, Deque, List, NamedTuple, Optional, Sequence, TextIO, Tuple
+)
+
+
+# ---------------- Event types ----------------
+
+SERVER = "server"            # lifecycle: listening, stopped, shard joined
+CONNECT = "connect"
+DISCONNECT = "disconnect"
+MESSAGE = "message"          # client → server
+REPLY = "reply"              # server → client (echo)
+PRIVATE = "private"          # @user routing, detail is the target
+ERROR = "error"
+EVICT = "evict"              # slow consumer disconnected, detail is why
+
+# Never sampled or dropped, whatever the load
+ALWAYS_KEEP = frozenset((SERVER, CONNECT, DISCONNECT, ERROR, EVICT))
+
+FORMATS = {
+    SERVER: "[SERVER]: {detail}",
+    CONNECT: "[SERVER]: {user} connected from {detail}",
+    DISCONNECT: "[SERVER]: {user} disconnected",
+    MESSAGE: "[{user}]: {detail}",
+    REPLY: "[SERVER → {user}]: {detail}",
+    PRIVATE: "[LOG]: {user} → {detail}",
+    ERROR: "[ERROR]: {detail}",
+    EVICT: "[SERVER]: {user} evicted: {detail}",
+}
+
+
+class Record(NamedTuple):
+    ts: float
+    event: str
+    user: str
+    nbytes: int
+    detail: str
+
+
+def format_record(record: Record) -> str:
+    return FORMATS.get(record.event, "{detail}").format(
+        user=record.user, detail=record.detail
+    )
+
+
+# ---------------- Sinks ----------------
+
+Batch = List[Tuple[Record, str]]
+
+
+class ConsoleSink:
+    """
+    Formatted lines to stdout, one write per batch.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self.stream: TextIO = stream or sys.stdout
+
+    def write(self, batch: Batch) -> None:
+        self.stream.write("".join(line + "\n" for _, line in batch))
+        self.stream.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class CallbackSink:
+    """
+    Formatted lines to a callable, e.g. a GUI's thread-safe write_log.
+    """
+
+    def __init__(self, callback: Callable[[str], None]) -> None:
+        self.callback = callback
+
+    def write(self, batch: Batch) -> None:
+        for _, line in batch:
+            self.callback(line)
+
+    def close(self) -> None:
+        pass
+
+
+class RotatingFileSink:
+    """
+    Timestamped records appended to path. Once the file passes
+    max_bytes it becomes path.1 (path.1 becomes path.2, ...) and
+    a fresh file is started; at most backups old files are kept.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 3
+    ) -> None:
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.backups: int = backups
+        self.file = open(path, "a", encoding="utf-8")
+        self.size: int = self.file.tell()
+
+    def write(self, batch: Batch) -> None:
+        chunk = "".join(
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(r.ts))
+            + f".{int(r.ts * 1000) % 1000:03d} {r.event} user={r.user} "
+            f"bytes={r.nbytes} {line}\n"
+            for r, line in batch
+        )
+        self.file.write(chunk)
+        self.file.flush()
+        self.size += len(chunk.encode())
+        if self.size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.size = 0
+
+    def close(self) -> None:
+        self.file.close()
+
+
+# ---------------- Pipeline ----------------
+
+class EventLog:
+    """
+    Asynchronous structured log for the servers' hot paths.
+
+    emit() only appends a small tuple to a deque: no formatting, no
+    I/O, and no lock unless the consumer is asleep and has to be woken.
+    The background thread sleeps until something is emitted, gives a
+    burst interval seconds to gather, then formats everything pending
+    and hands it to each sink in one batch. An idle log costs nothing.
+
+    sample_every keeps one in N per-message events (1 keeps all, 0
+    none), and at most max_pending of them wait for the consumer; past
+    that the oldest are dropped. Events in ALWAYS_KEEP bypass both.
+    """
+
+    def __init__(
+        self,
+        sinks: Sequence = (),
+        sample_every: int = 1,
+        max_pending: int = 100_000,
+        interval: float = 0.05
+    ) -> None:
+        self.sinks: List = list(sinks)
+        self.sample_every: int = sample_every
+        self.max_pending: int = max_pending
+        self.interval: float = interval
+        self.dropped: int = 0
+        self.sampled_out: int = 0
+
+        # (seq, ts, event, user, nbytes, detail); seq merges the queues
+        self._seq = itertools.count()
+        self._sample = itertools.count()
+        self._kept: Deque[Tuple] = deque()
+        self._pending: Deque[Tuple] = deque(maxlen=max_pending)
+
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        # Set while there is work the consumer has not taken yet
+        self._wake = threading.Event()
+
+    def emit(
+        self,
+        event: str,
+        user: str = "",
+        nbytes: int = 0,
+        detail: str = ""
+    ) -> None:
+        """
+        Hot path; safe from any thread.
+        """
+        if event in ALWAYS_KEEP:
+            self._kept.append(
+                (next(self._seq), time.time(), event, user, nbytes, detail)
+            )
+            self._notify()
+            return
+
+        every = self.sample_every
+        if every != 1 and (not every or next(self._sample) % every):
+            self.sampled_out += 1
+            return
+
+        pending = self._pending
+        if len(pending) >= self.max_pending:
+            self.dropped += 1
+        pending.append((next(self._seq), time.time(), event, user, nbytes, detail))
+        self._notify()
+
+    def _notify(self) -> None:
+        # is_set() is a plain read; only the first event after the
+        # consumer's clear() pays for set(). The consumer clears before
+        # it drains, so an append it might miss always finds it clear.
+        wake = self._wake
+        if not wake.is_set():
+            wake.set()
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._consume, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Flush whatever is pending and stop the consumer.
+        The sinks stay open; whoever created them closes them.
+        """
+        if not self._thread:
+            return
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def _consume(self) -> None:
+        wake = self._wake
+        while True:
+            wake.wait()
+            if self._stopped.is_set():
+                break
+            # Let a burst gather into one batch
+            self._stopped.wait(self.interval)
+            wake.clear()
+            self._flush()
+        self._flush()
+
+    def _drain(self, queue: Deque[Tuple]) -> List[Tuple]:
+        items = []
+        while queue:
+            items.append(queue.popleft())
+        return items
+
+    def _flush(self) -> None:
+        kept = self._drain(self._kept)
+        pending = self._drain(self._pending)
+        if not kept and not pending:
+            return
+
+        batch: Batch = []
+        for item in heapq.merge(kept, pending):
+            record = Record(*item[1:])
+            batch.append((record, format_record(record)))
+
+        for sink in self.sinks:
+            try:
+                sink.write(batch)
+            except Exception:
+                pass
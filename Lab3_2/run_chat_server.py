@@ -1,8 +1,77 @@
+import sys
 from server_gui import ServerGUI
 from server_logic import ChatServer
+from eventlog import RotatingFileSink
+
+
+USAGE = """\
+Usage: python run_chat_server.py [engine] [--unix PATH]
+                                 [--bus PATH [--shard ID]]
+                                 [--log-file PATH] [--sample N]
+                                 [--admin-port PORT]
+                                 [--policy drop_oldest|skip|disconnect]
+                                 [--high-water BYTES] [--stall-timeout S]
+                                 [--send-timeout S] [--handshake-timeout S]"""
+
+
+def take_option(args, name):
+    if name not in args:
+        return None
+    i = args.index(name)
+    if i + 1 == len(args) or args[i + 1].startswith("--"):
+        print(f"{name} needs a value")
+        print(USAGE)
+        raise SystemExit(1)
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
 
 
 if __name__ == "__main__":
-    server = ChatServer()
+    # engine is threaded (default) or selectors; --unix also listens on
+    # a Unix domain socket (clients connect to unix:PATH); --bus joins
+    # a sharded room through a broker started with: python bus.py PATH
+    # --log-file adds a size-rotated log file, --sample N logs one in N
+    # chat messages (0: none); connects/disconnects are always logged
+    # --admin-port serves live counters on 127.0.0.1:PORT/metrics
+    # --policy picks what a full send queue does; clients with more than
+    # --high-water bytes buffered for --stall-timeout seconds, or a write
+    # stuck for --send-timeout seconds, are disconnected (0 disables)
+    # --handshake-timeout closes clients that have not sent a username
+    args = sys.argv[1:]
+    unix_path = take_option(args, "--unix")
+    bus_path = take_option(args, "--bus")
+    shard_id = take_option(args, "--shard")
+    log_file = take_option(args, "--log-file")
+    sample = take_option(args, "--sample")
+    admin_port = take_option(args, "--admin-port")
+    policy = take_option(args, "--policy")
+    high_water = take_option(args, "--high-water")
+    stall_timeout = take_option(args, "--stall-timeout")
+    send_timeout = take_option(args, "--send-timeout")
+    handshake_timeout = take_option(args, "--handshake-timeout")
+    engine = args[0] if args else "threaded"
+
+    slow_consumers = {}
+    if policy:
+        slow_consumers["queue_policy"] = policy
+    if high_water:
+        slow_consumers["high_water"] = int(high_water)
+    if stall_timeout:
+        slow_consumers["stall_timeout"] = float(stall_timeout) or None
+    if send_timeout:
+        slow_consumers["send_timeout"] = float(send_timeout) or None
+
+    server = ChatServer(
+        engine=engine,
+        unix_path=unix_path,
+        bus_path=bus_path,
+        shard_id=shard_id,
+        log_sinks=[RotatingFileSink(log_file)] if log_file else [],
+        log_sample=int(sample) if sample else 1,
+        admin_port=int(admin_port) if admin_port else None,
+        handshake_timeout=float(handshake_timeout) if handshake_timeout else 5.0,
+        **slow_consumers
+    )
     gui = ServerGUI(server)
     gui.start()
@@ -1,6 +1,17 @@
 import tkinter as tk
 import threading
-from typing import Optional
+from typing import Dict, Optional
+from dashboard import Dashboard
+from logview import LogView, session_log_path
+
+
+# Dashboard charts: (title, metrics key, per-second rate)
+DASHBOARD_SERIES = (
+    ("Users", "connections", False),
+    ("Msgs/s", "msgs_in", True),
+    ("Bytes out/s", "bytes_out", True),
+    ("Queue depth", "queue_depth_total", False),
+)
 
 
 class ServerGUI:
@@ -24,6 +35,7 @@ class ServerGUI:
 
         self.root = tk.Tk()
         self.root.title("Chat Server")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.configure(bg=BG)
 
         frame = tk.Frame(self.root, bg=PANEL)
@@ -54,6 +66,25 @@ class ServerGUI:
         )
         self.start_btn.pack(side="left", padx=20)
 
+        # Per-message logging can be turned off; the dashboard stays live
+        self.log_messages = tk.BooleanVar(value=self.server.log_sample != 0)
+        tk.Checkbutton(
+            frame,
+            text="Log messages",
+            variable=self.log_messages,
+            command=self.set_message_logging,
+            bg=PANEL,
+            fg=FG,
+            selectcolor=ENTRY_BG,
+            activebackground=PANEL,
+            activeforeground=FG
+        ).pack(side="left", padx=5)
+
+        self.dashboard = Dashboard(
+            self.root, self.sample_metrics, DASHBOARD_SERIES, PANEL, FG
+        )
+        self.dashboard.frame.pack(fill="x", padx=10)
+
         self.log = tk.Text(
             self.root,
             height=20,
@@ -63,18 +94,31 @@ class ServerGUI:
             insertbackground="white",
             state="disabled"
         )
-        self.log.pack(padx=10, pady=10)
+        self.log.pack(padx=10, pady=(10, 4))
+        self.log_view = LogView(
+            self.root, self.log, spill_path=session_log_path("chat_server")
+        )
+        self.log_view.toolbar(self.root, BG, FG, BTN).pack(
+            fill="x", padx=10, pady=(0, 10)
+        )
 
     # ---------------- Logging ----------------
 
     def write_log(self, msg: str) -> None:
-        self.root.after(0, self._append_log, msg)
+        # Safe from the server threads; rendered in batches
+        self.log_view.write(msg)
 
-    def _append_log(self, msg: str) -> None:
-        self.log.config(state="normal")
-        self.log.insert("end", msg + "\n")
-        self.log.see("end")
-        self.log.config(state="disabled")
+    def set_message_logging(self) -> None:
+        every = 1 if self.log_messages.get() else 0
+        self.server.log_sample = every
+        self.server.events.sample_every = every
+
+    # ---------------- Dashboard ----------------
+
+    def sample_metrics(self) -> Optional[Dict]:
+        if not self.running:
+            return None
+        return self.server.metrics.snapshot()
 
     # ---------------- Control ----------------
 
@@ -102,5 +146,14 @@ class ServerGUI:
             self.start_btn.config(text="Start Server", bg="#0e639c")
             self.write_log("[SERVER]: Stopped")
 
+    def on_close(self) -> None:
+        """
+        Window closed: shut down and delete this session's spill file.
+        """
+        if self.running:
+            self.server.stop()
+        self.log_view.close(remove_spill=True)
+        self.root.destroy()
+
     def start(self) -> None:
         self.root.mainloop()
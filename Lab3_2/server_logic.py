@@ -1,18 +1,187 @@
+import time
 import socket
+import selectors
 import threading
-from typing import Callable, List, Tuple, Optional
+from collections import deque
+from typing import (
+    Callable, Deque, Dict, Iterable, List, Sequence, Tuple, Optional
+)
+from bus import BusClient
+from metrics import AdminServer, Metrics, UserStats
+from eventlog import (
+    CONNECT, DISCONNECT, ERROR, EVICT, MESSAGE, PRIVATE, SERVER,
+    CallbackSink, EventLog
+)
+from outbound import (
+    POLICIES, OutboundQueue, Buffer, Payload,
+    advance, flatten, head, send_buffers
+)
+from registry import ClientRegistry
+from protocol import (
+    MAGIC, RAW_RECV_SIZE, Handshake, RawDecoder, StreamDecoder,
+    frame_parts, read_handshake
+)
+from transport import UNIX_PREFIX, listen_unix, remove_unix, set_nodelay
+
+
+ENGINES: Tuple[str, ...] = ("threaded", "selectors")
+
+# Largest blocking send in the threaded writer: a send returns once
+# this much has fit, so a client that keeps reading shows progress
+WRITE_STEP: int = 65536
+
+# How often slow consumers are looked for, and how long an evicted
+# client gets to receive its notice before the socket is shut down
+SWEEP_INTERVAL: float = 0.5
+EVICT_GRACE: float = 1.0
+
+
+class _Connection:
+    """
+    Per-socket state for the selectors engine.
+    username stays None until the handshake completes.
+    """
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        addr: Tuple,
+        outbox: OutboundQueue
+    ) -> None:
+        self.sock: socket.socket = sock
+        self.addr: Tuple = addr
+        self.username: Optional[str] = None
+        self.handshake: Handshake = Handshake()
+        self.decoder: Optional[StreamDecoder] = None
+        self.outbox: OutboundQueue = outbox
+        self.deadline: float = 0.0
+        self.stats: Optional[UserStats] = None
+        self.framed: bool = False
+        # Taken from the outbox but not yet in pending (raw clients)
+        self.queued: Deque[Payload] = deque()
+        self.pending: List[Buffer] = []
+        self.writing: bool = False
 
 
 class ChatServer:
     """
     Handles chat networking and routing logic.
     No GUI knowledge.
+
+    engine selects how client sockets are serviced:
+        - "threaded":  one daemon thread per client (default)
+        - "selectors": all sockets multiplexed on a single
+                       selectors loop (epoll on Linux)
+
+    backlog is the listen() queue length; raise it when many
+    clients connect at once. unix_path also listens on a Unix domain
+    socket for same-host clients ("unix:/path" addresses); they join
+    the same room and registry as the TCP ones.
+
+    Accepting never waits for a client: the username handshake runs on
+    the client's own thread (threaded) or in the event loop (selectors),
+    and a client that has not sent its username within
+    handshake_timeout seconds is disconnected.
+
+    Every client owns a bounded OutboundQueue (queue_size payloads)
+    drained by its own writer, so a slow receiver never blocks the
+    sender. When a queue is full queue_policy decides: "drop_oldest",
+    "skip" (drop the new message) or "disconnect".
+
+    Slow consumers are also evicted, whatever the policy, when one
+    write makes no progress for send_timeout seconds, or when more
+    than high_water bytes stay buffered for stall_timeout seconds
+    (until they drain to low_water, high_water / 4 by default). The
+    client gets a [SYSTEM] notice, an EVICT record is logged and
+    queue_evicted counts it. None disables either check.
+
+    With bus_path set the server runs as one shard of a larger room:
+    broadcasts, join/leave notices and private messages for users on
+    other shards go through the BusBroker listening at bus_path (see
+    bus.py). shard_id defaults to "host:port".
+
+    Logging goes through an EventLog: the hot path only queues a
+    record, and a background thread formats it for log_callback and
+    any extra log_sinks (e.g. eventlog.RotatingFileSink). log_sample
+    keeps one in N per-message records; connects and disconnects are
+    always logged.
+
+    Live counters are kept in self.metrics (see metrics.py); with
+    admin_port set they are also served on 127.0.0.1:admin_port as
+    /metrics (Prometheus text) and /metrics.json.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        engine: str = "threaded",
+        backlog: int = 5,
+        unix_path: Optional[str] = None,
+        queue_size: int = 1024,
+        queue_policy: str = "drop_oldest",
+        send_timeout: Optional[float] = 10.0,
+        high_water: int = 1 << 20,
+        low_water: Optional[int] = None,
+        stall_timeout: Optional[float] = 5.0,
+        handshake_timeout: float = 5.0,
+        bus_path: Optional[str] = None,
+        shard_id: Optional[str] = None,
+        log_sinks: Sequence = (),
+        log_sample: int = 1,
+        admin_port: Optional[int] = None
+    ) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+        if queue_policy not in POLICIES:
+            raise ValueError(
+                f"Unknown queue policy '{queue_policy}', expected one of {POLICIES}"
+            )
+
+        self.engine: str = engine
+        self.backlog: int = backlog
         self.server: Optional[socket.socket] = None
-        self.clients: List[Tuple[str, socket.socket]] = []
+        self.unix_path: Optional[str] = unix_path
+        self.unix_server: Optional[socket.socket] = None
+        self.clients: ClientRegistry = ClientRegistry()
         self.running = False
+        self.handshake_timeout: float = handshake_timeout
+        self.handshake_timeouts: int = 0
+
+        # ---- logging ----
+        self.log_sinks: List = list(log_sinks)
+        self.log_sample: int = log_sample
+        self.events: EventLog = EventLog()
+
+        # ---- metrics ----
+        self.metrics: Metrics = Metrics(self._gauges)
+        self.admin_port: Optional[int] = admin_port
+        self.admin: Optional[AdminServer] = None
+
+        # ---- outbound queues ----
+        self.queue_size: int = queue_size
+        self.queue_policy: str = queue_policy
+        self.outboxes: Dict[socket.socket, OutboundQueue] = {}
+        self.dropped_total: int = 0
+        self.evicted_total: int = 0
+
+        # ---- slow consumers ----
+        self.send_timeout: Optional[float] = send_timeout
+        self.high_water: int = high_water
+        self.low_water: int = high_water // 4 if low_water is None else low_water
+        self.stall_timeout: Optional[float] = stall_timeout
+
+        # ---- selectors engine only ----
+        self.selector: Optional[selectors.BaseSelector] = None
+        self._wakeup: Optional[Tuple[socket.socket, socket.socket]] = None
+        self._dirty: Dict[_Connection, None] = {}
+        self._handshaking: Dict[_Connection, None] = {}
+
+        # ---- sharding ----
+        self.bus_path: Optional[str] = bus_path
+        self.shard_id: Optional[str] = shard_id
+        self.bus: Optional[BusClient] = None
+        # Users on other shards: username -> shard id
+        self.directory: Dict[str, str] = {}
+        self._bus_events: Deque[Dict] = deque()
 
     def start(
         self,
@@ -20,93 +189,552 @@ class ChatServer:
         port: int,
         log_callback: Callable[[str], None] = print
     ) -> None:
+        self.events = EventLog(
+            [CallbackSink(log_callback), *self.log_sinks], self.log_sample
+        )
+        self.events.start()
+        try:
+            self._start(host, port)
+        finally:
+            self.events.stop()
+
+    def _start(self, host: str, port: int) -> None:
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server.bind((host, port))
-        self.server.listen(5)
+        self.server.listen(self.backlog)
+        if self.unix_path:
+            self.unix_server = listen_unix(self.unix_path, self.backlog)
         self.running = True
 
-        log_callback(f"[SERVER]: Listening on {host}:{port}")
+        self.events.emit(SERVER, detail=f"Listening on {host}:{port}")
+        if self.unix_path:
+            self.events.emit(SERVER, detail=f"Listening on {UNIX_PREFIX}{self.unix_path}")
 
-        while self.running:
-            try:
-                conn, addr = self.server.accept()
+        if self.admin_port is not None:
+            self.admin = AdminServer(
+                self.metrics.snapshot, self.admin_port, prefix="chat"
+            )
+            self.admin.start()
+            self.events.emit(
+                SERVER,
+                detail=f"Metrics on http://127.0.0.1:{self.admin.address[1]}/metrics"
+            )
 
-                try:
-                    username = conn.recv(1024).decode()
-                except:
-                    conn.close()
-                    continue
+        if self.bus_path:
+            self.shard_id = self.shard_id or f"{host}:{port}"
+            self.bus = BusClient(self.bus_path, self.shard_id)
+            self.bus.connect(
+                self._on_bus_event,
+                self._on_bus_lost,
+                lambda msg: self.events.emit(ERROR, detail=msg)
+            )
+            self.events.emit(
+                SERVER,
+                detail=f"Shard {self.shard_id} joined bus {self.bus_path}"
+            )
 
-                self.clients.append((username, conn))
-                self.broadcast(
-                    f"[SYSTEM]: {username} joined the chat.",
-                    sender_socket=None
-                )
+        if self.engine == "selectors":
+            self._serve_selectors()
+        else:
+            self._serve_threaded()
 
-                log_callback(f"[SERVER]: {username} connected from {addr}")
+    # ---------------- Threaded engine ----------------
 
-                threading.Thread(
-                    target=self.handle_client,
-                    args=(username, conn, log_callback),
-                    daemon=True
-                ).start()
+    def _serve_threaded(self) -> None:
+        threading.Thread(target=self._watchdog, daemon=True).start()
+        if self.unix_server:
+            threading.Thread(
+                target=self._accept_threaded,
+                args=(self.unix_server,),
+                daemon=True
+            ).start()
+        self._accept_threaded(self.server)
 
+    def _accept_threaded(self, listener: socket.socket) -> None:
+        while self.running:
+            try:
+                conn, addr = listener.accept()
             except OSError:
                 break
 
+            self.metrics.accepted()
+            set_nodelay(conn)
+            # Unix domain peers have no address of their own
+            addr = addr or f"{UNIX_PREFIX}{self.unix_path}"
+            threading.Thread(
+                target=self._client_thread,
+                args=(conn, addr),
+                daemon=True
+            ).start()
+
+    def _client_thread(self, conn: socket.socket, addr: Tuple) -> None:
+        """
+        Handshake, then serve one client; runs off the accept loop.
+        """
+        try:
+            handshake = read_handshake(conn, self.handshake_timeout)
+        except socket.timeout:
+            self.handshake_timeouts += 1
+            conn.close()
+            return
+        except:
+            conn.close()
+            return
+
+        username = handshake.username
+        if not username or not self.running:
+            conn.close()
+            return
+
+        outbox = self._open_outbox(conn)
+        self.add_client(
+            username, conn, addr, handshake.framed
+        )
+
+        threading.Thread(
+            target=self._writer_loop,
+            args=(conn, outbox, handshake.framed),
+            daemon=True
+        ).start()
+        self.handle_client(
+            username, conn,
+            handshake.decoder, handshake.pending
+        )
+
     def handle_client(
         self,
         username: str,
         conn: socket.socket,
-        log_callback: Callable[[str], None]
+        decoder: Optional[StreamDecoder] = None,
+        pending: Iterable[str] = ()
     ) -> None:
+        decoder = decoder or RawDecoder()
+        stats = self.metrics.user(conn) or UserStats(username)
+
+        messages = list(pending)
         while self.running:
             try:
-                data = conn.recv(1024)
-                if not data:
+                stats.msgs_in += len(messages)
+                for msg in messages:
+                    self.handle_message(username, conn, msg)
+
+                messages = decoder.recv_from(conn)
+                if messages is None:
                     break
+                stats.bytes_in = decoder.received
+
+            except:
+                break
+
+        self.remove_client(username, conn)
+
+    def _writer_loop(
+        self,
+        conn: socket.socket,
+        outbox: OutboundQueue,
+        framed: bool
+    ) -> None:
+        """
+        Drains one client's queue; everything queued since the last
+        write goes out in scatter/gather sends. blocked_since is set
+        while one send waits and cleared whenever bytes move, so
+        send_timeout measures time without progress, not batch time.
+        Raw clients have no framing and take one recv() as one
+        message, so they get each payload in sends of its own.
+        """
+        stats = self.metrics.user(conn) or UserStats("")
+        while True:
+            batch = outbox.get_batch()
+            if batch is None:
+                break
+            groups = [flatten(batch)] if framed else [list(p) for p in batch]
+            size = sum(len(b) for buffers in groups for b in buffers)
+            outbox.inflight = size
+            try:
+                for buffers in groups:
+                    while buffers:
+                        outbox.blocked_since = time.monotonic()
+                        sent = send_buffers(conn, head(buffers, WRITE_STEP))
+                        outbox.blocked_since = None
+                        outbox.inflight -= sent
+                        buffers = advance(buffers, sent)
+            except OSError:
+                # Reader thread notices the dead socket and cleans up
+                self.metrics.send_error()
+                outbox.close()
+                return
+            stats.msgs_out += len(batch)
+            stats.bytes_out += size
+
+        # The eviction notice is out; shutting down wakes the reader
+        if outbox.evicted_at is not None:
+            self._shutdown(conn)
+
+    def _watchdog(self) -> None:
+        while self.running:
+            time.sleep(SWEEP_INTERVAL)
+            self._check_consumers()
+
+    # ---------------- Selectors engine ----------------
+
+    def _serve_selectors(self) -> None:
+        self.selector = selectors.DefaultSelector()
+        self._wakeup = socket.socketpair()
+        self._wakeup[0].setblocking(False)
+        self.server.setblocking(False)
+
+        self.selector.register(self.server, selectors.EVENT_READ, "accept")
+        self.selector.register(self._wakeup[0], selectors.EVENT_READ, "wakeup")
+        if self.unix_server:
+            self.unix_server.setblocking(False)
+            self.selector.register(self.unix_server, selectors.EVENT_READ, "accept")
 
-                msg = data.decode()
-
-                if msg.startswith("@"):
-                    parts = msg.split(" ", 1)
-                    if len(parts) > 1:
-                        target = parts[0][1:]
-                        content = parts[1]
-                        log_callback(
-                            f"[LOG]: {username} → {target}"
-                        )
-                        self.send_private(target, username, content, conn)
+        try:
+            self._drain_bus_events()
+            next_sweep = time.monotonic() + SWEEP_INTERVAL
+            while self.running:
+                # Only poll while there are clients to watch
+                timeout = SWEEP_INTERVAL if self.outboxes else None
+                for key, mask in self.selector.select(timeout):
+                    if key.data == "accept":
+                        if not self._accept_ready(key.fileobj):
+                            return
+                    elif key.data == "wakeup":
+                        try:
+                            self._wakeup[0].recv(1024)
+                        except OSError:
+                            pass
                     else:
-                        self.send_system_msg(
-                            conn,
-                            "Usage: @username message"
-                        )
-                else:
-                    log_callback(f"[{username}]: {msg}")
-                    self.broadcast(
-                        f"[{username}]: {msg}",
-                        sender_socket=conn
+                        if mask & selectors.EVENT_WRITE:
+                            self._write_ready(key.data)
+                        if mask & selectors.EVENT_READ:
+                            self._read_ready(key.data)
+
+                # Everything routed this iteration goes out now, one
+                # sendmsg per recipient, without an extra select round
+                self._drain_bus_events()
+                if self.outboxes and time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + SWEEP_INTERVAL
+                    self._expire_handshakes()
+                    self._check_consumers()
+                self._flush_dirty()
+        finally:
+            self._dirty.clear()
+            self._handshaking.clear()
+            for key in list(self.selector.get_map().values()):
+                if isinstance(key.data, _Connection):
+                    try:
+                        key.fileobj.close()
+                    except OSError:
+                        pass
+            self.selector.close()
+            for sock in self._wakeup:
+                sock.close()
+            self.selector = None
+            self._wakeup = None
+
+    def _accept_ready(self, listener: socket.socket) -> bool:
+        """
+        Accept every pending connection on listener.
+        Returns False once the listening socket is gone.
+        """
+        while True:
+            try:
+                conn, addr = listener.accept()
+            except BlockingIOError:
+                return True
+            except OSError:
+                return False
+
+            self.metrics.accepted()
+            set_nodelay(conn)
+            addr = addr or f"{UNIX_PREFIX}{self.unix_path}"
+            conn.setblocking(False)
+            outbox = self._open_outbox(conn)
+            state = _Connection(conn, addr, outbox)
+            state.deadline = time.monotonic() + self.handshake_timeout
+            self._handshaking[state] = None
+            self.selector.register(conn, selectors.EVENT_READ, state)
+
+    def _expire_handshakes(self) -> None:
+        """
+        Close connections that are still silent past their deadline.
+        """
+        now = time.monotonic()
+        for state in list(self._handshaking):
+            if state.deadline <= now:
+                self.handshake_timeouts += 1
+                self._drop_handshake(state)
+
+    def _drop_handshake(self, state: _Connection) -> None:
+        self._handshaking.pop(state, None)
+        self._unregister(state.sock)
+        self._close_outbox(state.sock)
+        state.sock.close()
+
+    def _read_ready(
+        self,
+        state: _Connection
+    ) -> None:
+        if state.username is None:
+            self._handshake_ready(state)
+            return
+
+        try:
+            messages = state.decoder.recv_from(state.sock)
+        except BlockingIOError:
+            return
+        except (OSError, ValueError):
+            messages = None
+
+        if messages is None:
+            self.remove_client(state.username, state.sock)
+            return
+
+        state.stats.msgs_in += len(messages)
+        state.stats.bytes_in = state.decoder.received
+        for msg in messages:
+            self.handle_message(state.username, state.sock, msg)
+
+    def _handshake_ready(
+        self,
+        state: _Connection
+    ) -> None:
+        handshake = state.handshake
+        try:
+            data = state.sock.recv(RAW_RECV_SIZE)
+            done = bool(data) and handshake.feed(data)
+        except BlockingIOError:
+            return
+        except (OSError, ValueError):
+            data, done = b"", False
+
+        if not data or (done and not handshake.username):
+            self._drop_handshake(state)
+            return
+        if not done:
+            return
+
+        self._handshaking.pop(state, None)
+        state.username = handshake.username
+        state.decoder = handshake.decoder
+        state.framed = handshake.framed
+        if handshake.framed:
+            try:
+                self.send_to(state.sock, (MAGIC,))
+            except OSError:
+                pass
+        self.add_client(
+            state.username, state.sock, state.addr, handshake.framed
+        )
+        state.stats = self.metrics.user(state.sock)
+        state.stats.msgs_in += len(handshake.pending)
+
+        for msg in handshake.pending:
+            self.handle_message(state.username, state.sock, msg)
+
+    def _write_ready(self, state: _Connection) -> None:
+        """
+        Drains the client's queue with scatter/gather sends until it is
+        empty or the kernel buffer is full; only in the latter case does
+        the socket stay registered for EVENT_WRITE. Raw clients get one
+        payload per send, as in the threaded writer.
+        """
+        stats = state.stats
+        outbox = state.outbox
+        while True:
+            if not state.pending:
+                if not state.queued:
+                    batch = outbox.pop_all()
+                    if not batch:
+                        outbox.inflight = 0
+                        outbox.blocked_since = None
+                        self._set_writing(state, False)
+                        if outbox.evicted_at is not None:
+                            # Notice delivered, EOF on the read side cleans up
+                            self._shutdown(state.sock)
+                        return
+                    state.queued.extend(batch)
+                    outbox.inflight = sum(
+                        len(b) for payload in batch for b in payload
                     )
+                    if stats:
+                        stats.msgs_out += len(batch)
+                if state.framed:
+                    state.pending = flatten(state.queued)
+                    state.queued.clear()
+                else:
+                    state.pending = list(state.queued.popleft())
 
-            except:
-                break
+            try:
+                sent = send_buffers(state.sock, state.pending)
+            except BlockingIOError:
+                if outbox.blocked_since is None:
+                    outbox.blocked_since = time.monotonic()
+                self._set_writing(state, True)
+                return
+            except OSError:
+                # Peer is gone, the read side will notice and clean up
+                self.metrics.send_error()
+                outbox.close()
+                state.pending = []
+                state.queued.clear()
+                self._set_writing(state, False)
+                return
 
-        self.remove_client(username, conn, log_callback)
+            # A partial send just loops: the next attempt raises
+            # BlockingIOError if the kernel buffer is really full
+            state.pending = advance(state.pending, sent)
+            outbox.inflight -= sent
+            outbox.blocked_since = None
+            if stats:
+                stats.bytes_out += sent
+
+    def _flush_dirty(self) -> None:
+        dirty = self._dirty
+        self._dirty = {}
+        for state in dirty:
+            self._write_ready(state)
+
+    def _set_writing(self, state: _Connection, writing: bool) -> None:
+        if state.writing == writing:
+            return
+        events = selectors.EVENT_READ
+        if writing:
+            events |= selectors.EVENT_WRITE
+        try:
+            self.selector.modify(state.sock, events, state)
+            state.writing = writing
+        except (KeyError, ValueError, OSError):
+            pass
+
+    def _unregister(self, conn: socket.socket) -> None:
+        if not self.selector:
+            return
+        try:
+            self.selector.unregister(conn)
+        except (KeyError, ValueError):
+            pass
+
+    # ---------------- Routing ----------------
+
+    def handle_message(
+        self,
+        username: str,
+        conn: socket.socket,
+        msg: str
+    ) -> None:
+        if msg.startswith("@"):
+            parts = msg.split(" ", 1)
+            if len(parts) > 1:
+                target = parts[0][1:]
+                content = parts[1]
+                self.events.emit(PRIVATE, username, len(content), target)
+                self.send_private(target, username, content, conn)
+            else:
+                self.send_system_msg(
+                    conn,
+                    "Usage: @username message"
+                )
+        else:
+            self.events.emit(MESSAGE, username, len(msg), msg)
+            self.broadcast(
+                f"[{username}]: {msg}",
+                sender_socket=conn
+            )
+            self._publish({
+                "type": "broadcast",
+                "message": f"[{username}]: {msg}",
+            })
 
     # ---------------- Messaging ----------------
 
+    def send_to(self, conn: socket.socket, data: Payload) -> None:
+        """
+        Queue one encoded message for one client; never blocks on the
+        network. The payload is shared, not copied, across recipients.
+        Raises OSError if the client has no queue (not connected).
+        """
+        outbox = self.outboxes.get(conn)
+        if outbox is None:
+            raise OSError("Client is not registered")
+
+        dropped = outbox.dropped
+        accepted = outbox.put(data)
+        self.dropped_total += outbox.dropped - dropped
+
+        if not accepted:
+            self._evict(conn, "send queue full")
+            return
+
+        self._mark_dirty(conn)
+
+    def _mark_dirty(self, conn: socket.socket) -> None:
+        """
+        Selectors engine: have the loop flush conn's queue this
+        iteration. Thread writers wake up on their own.
+        """
+        if self.selector:
+            try:
+                state: _Connection = self.selector.get_key(conn).data
+            except (KeyError, ValueError):
+                return
+            if not state.writing:
+                self._dirty[state] = None
+
+    def queue_stats(self) -> Dict[str, int]:
+        """
+        Snapshot of outbound queue counters.
+        """
+        depths = [len(q) for q in list(self.outboxes.values())]
+        return {
+            "queues": len(depths),
+            "depth_total": sum(depths),
+            "depth_max": max(depths, default=0),
+            "dropped": self.dropped_total,
+            "evicted": self.evicted_total,
+        }
+
+    def _gauges(self) -> Dict[str, int]:
+        """
+        Server-specific values added to every metrics snapshot.
+        """
+        queues = self.queue_stats()
+        return {
+            "queue_depth_total": queues["depth_total"],
+            "queue_depth_max": queues["depth_max"],
+            "queue_dropped": queues["dropped"],
+            "queue_evicted": queues["evicted"],
+            "remote_users": len(self.directory),
+            "handshaking": len(self._handshaking),
+            "handshake_timeouts": self.handshake_timeouts,
+        }
+
     def broadcast(
         self,
         message: str,
         sender_socket: Optional[socket.socket]
     ) -> None:
-        for _, sock in self.clients:
-            if sock != sender_socket:
+        # Encoded exactly once; every recipient queues the same tuples
+        raw, framed = self.encode_payload(message)
+
+        recipients = 0
+        for entry in self.clients.snapshot():
+            if entry.conn is not sender_socket:
+                recipients += 1
                 try:
-                    sock.sendall(message.encode())
+                    self.send_to(entry.conn, framed if entry.framed else raw)
                 except:
-                    pass
+                    self.metrics.send_error()
+        self.metrics.broadcast(recipients)
+
+    @staticmethod
+    def encode_payload(message: str) -> Tuple[Payload, Payload]:
+        """
+        Raw and framed wire forms of message, sharing one encoded buffer.
+        """
+        data = message.encode()
+        return (data,), frame_parts(data)
 
     def send_private(
             self,
@@ -115,16 +743,27 @@ class ChatServer:
             msg: str,
             sender_sock: socket.socket
     ) -> None:
-        for user, sock in self.clients:
-            if user == target_user:
-                try:
-                    # Canonical private message format
-                    sock.sendall(
-                        f"[PRIVATE] {sender_user} → {target_user}: {msg}".encode()
-                    )
-                except:
-                    pass
-                return
+        # Canonical private message format
+        text = f"[PRIVATE] {sender_user} → {target_user}: {msg}"
+
+        entry = self.clients.get(target_user)
+        if entry:
+            try:
+                raw, framed = self.encode_payload(text)
+                self.send_to(entry.conn, framed if entry.framed else raw)
+            except:
+                self.metrics.send_error()
+            return
+
+        # Connected to another shard: the broker forwards it there
+        if self.bus and self.bus.connected and target_user in self.directory:
+            self._publish({
+                "type": "private",
+                "to": target_user,
+                "from": sender_user,
+                "message": text,
+            })
+            return
 
         # Target user not found
         self.send_system_msg(
@@ -133,26 +772,210 @@ class ChatServer:
         )
 
     def send_system_msg(self, conn: socket.socket, msg: str) -> None:
+        entry = self.clients.get_conn(conn)
+        raw, framed = self.encode_payload(f"[SYSTEM]: {msg}")
         try:
-            conn.sendall(f"[SYSTEM]: {msg}".encode())
+            self.send_to(conn, framed if entry and entry.framed else raw)
         except:
+            self.metrics.send_error()
+
+    # ---------------- Slow consumers ----------------
+
+    def _check_consumers(self) -> None:
+        """
+        Evict clients whose writes are stuck or whose backlog stays
+        over the high watermark; shut down evicted clients that did not
+        take their notice within EVICT_GRACE.
+        """
+        now = time.monotonic()
+        for conn, outbox in list(self.outboxes.items()):
+            if outbox.evicted_at is not None:
+                if now - outbox.evicted_at > EVICT_GRACE:
+                    self._shutdown(conn)
+                continue
+
+            blocked = outbox.blocked_since
+            over = outbox.time_over(now, self.high_water, self.low_water)
+            if (self.send_timeout is not None and blocked is not None
+                    and now - blocked > self.send_timeout):
+                self._evict(
+                    conn, f"no send progress for {self.send_timeout:g}s"
+                )
+            elif self.stall_timeout is not None and over > self.stall_timeout:
+                self._evict(
+                    conn,
+                    f"over {self.high_water} bytes buffered "
+                    f"for {self.stall_timeout:g}s"
+                )
+
+    def _evict(self, conn: socket.socket, reason: str) -> None:
+        """
+        Disconnect a slow consumer. Its backlog is replaced by a
+        [SYSTEM] notice; once the writer has sent it (or EVICT_GRACE
+        has passed) the socket is shut down, which wakes the reader
+        and runs the normal remove_client path.
+        """
+        outbox = self.outboxes.get(conn)
+        if outbox is None or outbox.evicted_at is not None:
+            return
+
+        entry = self.clients.get_conn(conn)
+        username = entry.username if entry else "?"
+        self.evicted_total += 1
+        self.metrics.send_error()
+        self.events.emit(EVICT, username, outbox.buffered(), reason)
+
+        raw, framed = self.encode_payload(
+            f"[SYSTEM]: Disconnected by the server: {reason}."
+        )
+        outbox.evict(framed if entry and entry.framed else raw)
+        self._mark_dirty(conn)
+
+    @staticmethod
+    def _shutdown(conn: socket.socket) -> None:
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
             pass
 
+    # ---------------- Sharding ----------------
+
+    def _publish(self, event: Dict) -> None:
+        if self.bus:
+            self.bus.publish(event)
+
+    def _on_bus_event(self, event: Dict) -> None:
+        """
+        Called on the bus reader thread. The selectors engine owns its
+        routing state, so there the event is handed to the loop.
+        """
+        if self.engine != "selectors":
+            self._handle_bus_event(event)
+            return
+
+        self._bus_events.append(event)
+        if self._wakeup:
+            try:
+                self._wakeup[1].send(b"\0")
+            except OSError:
+                pass
+
+    def _on_bus_lost(self) -> None:
+        # Goes through _on_bus_event so the selectors loop handles it
+        self._on_bus_event({"type": "lost"})
+
+    def _drain_bus_events(self) -> None:
+        while self._bus_events:
+            event = self._bus_events.popleft()
+            try:
+                self._handle_bus_event(event)
+            except Exception as e:
+                self.events.emit(
+                    ERROR, detail=f"[BUS]: bad event {event!r:.200}: {e!r}"
+                )
+
+    def _handle_bus_event(self, event: Dict) -> None:
+        kind = event.get("type")
+
+        if kind == "directory":
+            self.directory = dict(event["users"])
+        elif kind == "join":
+            self.directory[event["user"]] = event["shard"]
+            self.broadcast(event["message"], sender_socket=None)
+        elif kind == "leave":
+            if self.directory.get(event["user"]) == event["shard"]:
+                del self.directory[event["user"]]
+            self.broadcast(event["message"], sender_socket=None)
+        elif kind == "broadcast":
+            self.broadcast(event["message"], sender_socket=None)
+        elif kind == "private":
+            entry = self.clients.get(event["to"])
+            if entry:
+                raw, framed = self.encode_payload(event["message"])
+                try:
+                    self.send_to(entry.conn, framed if entry.framed else raw)
+                except:
+                    self.metrics.send_error()
+            else:
+                # Left between the directory update and delivery
+                self._publish({
+                    "type": "private_failed",
+                    "to": event["to"],
+                    "from": event["from"],
+                    "origin": event["shard"],
+                })
+        elif kind == "lost":
+            # Only local users are reachable until the shard restarts
+            self.directory = {}
+            if self.running:
+                self.events.emit(
+                    ERROR,
+                    detail=f"Shard {self.shard_id} lost bus {self.bus_path}, "
+                           "remote users are unreachable"
+                )
+        elif kind == "private_failed":
+            entry = self.clients.get(event["from"])
+            if entry:
+                self.send_system_msg(
+                    entry.conn,
+                    f"User '{event['to']}' not found or offline."
+                )
+
+    # ---------------- Membership ----------------
+
+    def _open_outbox(self, conn: socket.socket) -> OutboundQueue:
+        outbox = OutboundQueue(self.queue_size, self.queue_policy)
+        self.outboxes[conn] = outbox
+        return outbox
+
+    def _close_outbox(self, conn: socket.socket) -> None:
+        outbox = self.outboxes.pop(conn, None)
+        if outbox:
+            outbox.close()
+
+    def add_client(
+        self,
+        username: str,
+        conn: socket.socket,
+        addr: Tuple,
+        framed: bool = False
+    ) -> None:
+        self.clients.add(username, conn, framed)
+        self.metrics.connect(conn, username)
+        self.broadcast(
+            f"[SYSTEM]: {username} joined the chat.",
+            sender_socket=None
+        )
+        self._publish({
+            "type": "join",
+            "user": username,
+            "message": f"[SYSTEM]: {username} joined the chat.",
+        })
+
+        self.events.emit(CONNECT, username, detail=str(addr))
+
     # ---------------- Cleanup ----------------
 
     def remove_client(
         self,
         username: str,
-        conn: socket.socket,
-        log_callback: Callable[[str], None]
+        conn: socket.socket
     ) -> None:
-        if (username, conn) in self.clients:
-            self.clients.remove((username, conn))
-            log_callback(f"[SERVER]: {username} disconnected")
+        self._unregister(conn)
+        self._close_outbox(conn)
+        self.metrics.disconnect(conn)
+
+        if self.clients.remove(conn):
+            self.events.emit(DISCONNECT, username)
             self.broadcast(
                 f"[SYSTEM]: {username} left the chat.",
                 sender_socket=conn
             )
+            self._publish({
+                "type": "leave",
+                "user": username,
+                "message": f"[SYSTEM]: {username} left the chat.",
+            })
 
         try:
             conn.close()
@@ -162,17 +985,47 @@ class ChatServer:
     def stop(self) -> None:
         self.running = False
 
+        # Wake the selectors loop so it notices running is False
+        if self._wakeup:
+            try:
+                self._wakeup[1].send(b"\0")
+            except OSError:
+                pass
+
+        # shutdown() also wakes a thread blocked in accept()
         if self.server:
+            try:
+                self.server.shutdown(socket.SHUT_RDWR)
+            except:
+                pass
             try:
                 self.server.close()
             except:
                 pass
 
-        for _, conn in self.clients[:]:
+        if self.unix_server:
             try:
-                conn.shutdown(socket.SHUT_RDWR)
-                conn.close()
+                self.unix_server.shutdown(socket.SHUT_RDWR)
             except:
                 pass
+            self.unix_server.close()
+            self.unix_server = None
+            remove_unix(self.unix_path)
+
+        for entry in self.clients.clear():
+            try:
+                entry.conn.shutdown(socket.SHUT_RDWR)
+                entry.conn.close()
+            except:
+                pass
+
+        for conn in list(self.outboxes):
+            self._close_outbox(conn)
+
+        if self.bus:
+            self.bus.close()
+            self.bus = None
 
-        self.clients.clear()
+        if self.admin:
+            self.admin.stop()
+            self.admin = None
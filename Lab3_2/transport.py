@@ -0,0 +1,99 @@
+"""
+Stream socket helpers shared by the clients and servers.
+
+A server address is a host and port for TCP, or "unix:/path/to.sock"
+for a Unix domain socket on the same host (the port is then ignored).
+The protocol on top is the same; same-host clients just skip the
+TCP/IP loopback stack.
+"""
+import os
+import socket
+from typing import Optional
+
+
+UNIX_PREFIX: str = "unix:"
+
+
+def unix_path(host: str) -> Optional[str]:
+    """
+    The socket path of a "unix:/path" address, None for a TCP host.
+    """
+    if host.startswith(UNIX_PREFIX):
+        return host[len(UNIX_PREFIX):]
+    return None
+
+
+def connect_stream(
+    host: str,
+    port: int,
+    timeout: Optional[float] = None
+) -> socket.socket:
+    """
+    Connected stream socket to host:port or to a "unix:/path" address.
+    timeout only applies to connecting; the socket is returned blocking.
+    """
+    path = unix_path(host)
+    if path is None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        target = (host, port)
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        target = path
+
+    try:
+        sock.settimeout(timeout)
+        sock.connect(target)
+        sock.settimeout(None)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def listen_unix(path: str, backlog: int) -> socket.socket:
+    """
+    Listening Unix domain socket at path; a stale socket file left by
+    an earlier run is replaced.
+    """
+    remove_unix(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(path)
+        sock.listen(backlog)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def remove_unix(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def is_tcp(sock: socket.socket) -> bool:
+    return sock.family in (socket.AF_INET, socket.AF_INET6)
+
+
+def set_nodelay(sock: socket.socket) -> None:
+    """
+    Turn Nagle's algorithm off on a TCP socket, so a small message is
+    not held back waiting for the ACK of the previous one (which the
+    peer may itself delay). Unix domain sockets have nothing to turn off.
+    """
+    if is_tcp(sock):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def close_stream(sock: socket.socket) -> None:
+    """
+    Shut down both directions, which wakes a thread blocked in recv()
+    on sock, then close it.
+    """
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    sock.close()